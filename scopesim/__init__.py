@@ -39,6 +39,7 @@ from .utils import bug_report
 from .optics.optical_train import OpticalTrain
 from .commands.user_commands import UserCommands
 from .source.source import Source
+from .source.streaming_source import StreamingSource
 
 from .server.database import list_packages, download_package
 
@@ -2,12 +2,15 @@ from .effects import *
 
 from .apertures import *
 from .psfs import *
+from . import psf_utils
 from .shifts import *
 
 from .spectral_trace_list import *
 from .surface_list import *
 from .ter_curves import *
 from . import ter_curves_utils
+from . import filter_store
+from . import skycalc_cache
 
 from .detector_list import *
 from .electronic import *
@@ -29,6 +29,41 @@ def combine_surface_effects(surface_effects):
     return new_surflist
 
 
+def combine_psf_effects(effects):
+    """
+    Replaces runs of consecutive shift-invariant PSFs with a single FusedPSF
+
+    The order of all other effects is kept. Runs containing only one PSF are
+    left untouched.
+
+    Parameters
+    ----------
+    effects : list of Effect objects
+
+    Returns
+    -------
+    new_effects : list of Effect objects
+
+    """
+    new_effects = []
+    psf_run = []
+    for eff in effects + [None]:
+        if isinstance(eff, efs.PSF) and eff.is_shift_invariant:
+            psf_run += [eff]
+            continue
+
+        if len(psf_run) > 1:
+            new_effects += [efs.FusedPSF(psf_effects=psf_run)]
+        else:
+            new_effects += psf_run
+        psf_run = []
+
+        if eff is not None:
+            new_effects += [eff]
+
+    return new_effects
+
+
 def get_all_effects(effects, effect_class):
     if isinstance(effect_class, (list, tuple)):
         my_effects = []
@@ -0,0 +1,303 @@
+"""
+A local store for filter transmission curves
+
+``ter_curves_utils.get_filter`` used to parse an ASCII file or query the
+Spanish-VO filter service every time a filter was needed. A ``FilterStore``
+looks filters up in this order:
+
+1. an in-process LRU cache of ``synphot.SpectralElement`` objects,
+2. ASCII files in ``rc.__search_path__`` (e.g. from instrument packages),
+3. a directory of binary ``.npy`` curves, each with a small JSON file holding
+   the filter name, found in the ``filters`` folder of
+   ``!SIM.file.cache_path``,
+4. the list of ``fetchers``, by default only the SVO service.
+
+Curves from a fetcher are written to the directory, so that each filter is
+only downloaded once, also across sessions and worker processes. For machines
+without internet access the fetchers can be replaced by a local stand-in, or
+the directory can be filled in advance with ``FilterStore.populate``.
+"""
+
+import os
+import json
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+from astropy import units as u
+from astropy.io import ascii as ioascii
+from synphot import SpectralElement, Empirical1D
+
+from .. import utils
+
+
+def svo_fetcher(filter_name):
+    """
+    Downloads a filter from the Spanish-VO filter service
+
+    Parameters
+    ----------
+    filter_name : str
+        e.g. ``Paranal/HAWKI.Ks``
+
+    Returns
+    -------
+    wave, trans : np.ndarray
+        [Angstrom], [0..1]
+
+    """
+    from .ter_curves_utils import download_svo_filter
+    return download_svo_filter(filter_name, return_style="array")
+
+
+class FilterStore:
+    """
+    A directory-backed database of filter curves with an in-memory LRU cache
+
+    Parameters
+    ----------
+    path : str, optional
+        Directory for the binary curves and the name index. Default is the
+        ``filters`` folder of ``!SIM.file.cache_path``. If both are None,
+        filters are only kept in memory
+    fetchers : list of callable, optional
+        Functions which take a filter name and return the arrays
+        ``(wave [Angstrom], transmission)``. They are tried in order. Default
+        is ``[svo_fetcher]``. Pass an empty list to work offline
+    cache_size : int, optional
+        Number of ``SpectralElement`` objects kept in memory. Default is 32
+    aliases : dict, optional
+        Short names for filters, e.g. ``{"Ks": "2MASS/2MASS.Ks"}``. Default is
+        ``ter_curves_utils.FILTER_DEFAULTS``
+
+    Examples
+    --------
+    ::
+
+        >>> store = FilterStore(fetchers=[])        # offline
+        >>> store.add("Lab/MyFilter.J", wave, trans)
+        >>> filt = store.get("Lab/MyFilter.J")
+
+    """
+    def __init__(self, path=None, fetchers=None, cache_size=32, aliases=None):
+        if aliases is None:
+            from .ter_curves_utils import FILTER_DEFAULTS
+            aliases = FILTER_DEFAULTS
+
+        self.path = path
+        self.fetchers = [svo_fetcher] if fetchers is None else list(fetchers)
+        self.cache_size = cache_size
+        self.aliases = aliases
+        self._cache = OrderedDict()
+
+    def get(self, filter_name):
+        """
+        Returns a filter curve
+
+        Parameters
+        ----------
+        filter_name : str
+            A filename in ``rc.__search_path__``, an alias (e.g. "Ks"), or a
+            filter name known to one of the fetchers
+
+        Returns
+        -------
+        filt : synphot.SpectralElement, None
+            None if the filter could not be found
+
+        """
+        # names which are not files are served from memory without searching
+        # ``rc.__search_path__`` for a file first
+        key = (filter_name, None, None)
+        if key not in self._cache:
+            path = utils.find_file(filter_name, silent=True)
+            if path is not None:
+                key = (filter_name, path, os.path.getmtime(path))
+
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        path = key[1]
+        if path is not None:
+            tbl = ioascii.read(path)
+            wave = utils.quantity_from_table("wavelength", tbl, u.um).to(u.um)
+            filt = SpectralElement(Empirical1D, points=wave,
+                                   lookup_table=tbl["transmission"])
+        else:
+            filt = self._get_stored(self.aliases.get(filter_name, filter_name))
+
+        if filt is not None:
+            self._cache[key] = filt
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return filt
+
+    def add(self, filter_name, wave, trans):
+        """
+        Adds a filter curve to the store directory
+
+        Parameters
+        ----------
+        filter_name : str
+        wave : array-like, u.Quantity
+            [Angstrom]
+        trans : array-like
+
+        Returns
+        -------
+        filt : synphot.SpectralElement
+
+        """
+        wave = utils.quantify(wave, u.Angstrom).to(u.Angstrom).value
+        arr = np.array([wave, np.asarray(trans, dtype=float)])
+
+        filename = self._filename(filter_name)
+        if filename is not None:
+            # write to uniquely named temporary files first, so that parallel
+            # processes and threads never read half-written curves. Each curve
+            # has its own name file, so there is no shared index to update
+            tmp_name = "{}.{}.tmp.npy".format(filename[:-4], uuid.uuid4().hex)
+            np.save(tmp_name, arr)
+            os.replace(tmp_name, filename)
+
+            name_file = filename[:-4] + ".json"
+            tmp_name = "{}.{}.tmp".format(name_file, uuid.uuid4().hex)
+            with open(tmp_name, "w") as f:
+                json.dump({"name": filter_name}, f)
+            os.replace(tmp_name, name_file)
+
+        return SpectralElement(Empirical1D, points=arr[0] * u.Angstrom,
+                               lookup_table=arr[1])
+
+    def populate(self, filter_names=None):
+        """
+        Fetches filters into the store directory, e.g. before going offline
+
+        Parameters
+        ----------
+        filter_names : list of str, optional
+            Default is all aliases, i.e. ``FILTER_DEFAULTS``
+
+        Returns
+        -------
+        missing : list of str
+            Names which could not be fetched
+
+        """
+        if filter_names is None:
+            filter_names = list(self.aliases)
+
+        return [name for name in filter_names if self.get(name) is None]
+
+    def index(self):
+        """
+        Returns the {filter_name: filename} index of the store directory
+
+        The index is built from the name files next to the curves, so filters
+        added by other processes are always included
+
+        Returns
+        -------
+        index : dict
+
+        """
+        path = self._directory()
+        if path is None or not os.path.exists(path):
+            return {}
+
+        index = {}
+        for name_file in os.listdir(path):
+            filename = name_file[:-5] + ".npy"
+            if not name_file.endswith(".json") or \
+                    not os.path.exists(os.path.join(path, filename)):
+                continue
+            try:
+                with open(os.path.join(path, name_file)) as f:
+                    index[json.load(f)["name"]] = filename
+            except (ValueError, KeyError, OSError):
+                continue
+
+        return index
+
+    def names(self):
+        """Returns the names of all filters in the store directory"""
+        return sorted(self.index())
+
+    def clear_cache(self):
+        """Empties the in-memory cache. Files on disk are kept"""
+        self._cache = OrderedDict()
+
+    def _get_stored(self, filter_name):
+        filename = self._filename(filter_name)
+        if filename is not None and os.path.exists(filename):
+            wave, trans = np.load(filename)
+            return SpectralElement(Empirical1D, points=wave * u.Angstrom,
+                                   lookup_table=trans)
+
+        for fetcher in self.fetchers:
+            try:
+                wave, trans = fetcher(filter_name)
+            except Exception:
+                continue
+            return self.add(filter_name, wave, trans)
+
+        return None
+
+    def _directory(self):
+        if self.path is not None:
+            path = os.path.expanduser(self.path)
+            os.makedirs(path, exist_ok=True)
+        else:
+            index_name = utils.cache_file_path("index", subdir="filters",
+                                               suffix=".json")
+            path = None if index_name is None else os.path.dirname(index_name)
+
+        return path
+
+    def _filename(self, filter_name):
+        path = self._directory()
+        if path is None:
+            return None
+
+        key = utils.content_hash("filter", filter_name)
+        return os.path.join(path, key + ".npy")
+
+    def __repr__(self):
+        return "FilterStore at {} with {} filters ({} in memory)" \
+               "".format(self._directory(), len(self.index()),
+                         len(self._cache))
+
+
+_FILTER_STORE = None
+
+
+def get_filter_store():
+    """
+    Returns the FilterStore used by ``ter_curves_utils.get_filter``
+
+    Returns
+    -------
+    store : FilterStore
+
+    """
+    global _FILTER_STORE
+    if _FILTER_STORE is None:
+        _FILTER_STORE = FilterStore()
+
+    return _FILTER_STORE
+
+
+def set_filter_store(store):
+    """
+    Replaces the FilterStore used by ``ter_curves_utils.get_filter``
+
+    Parameters
+    ----------
+    store : FilterStore, None
+        None resets the default store
+
+    """
+    global _FILTER_STORE
+    _FILTER_STORE = store
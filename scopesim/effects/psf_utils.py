@@ -0,0 +1,773 @@
+"""
+Helper functions for building, caching and applying PSF kernels
+
+Analytic kernels (Gaussian, Moffat, Airy, ...) are generated through
+``get_analytic_kernel``, which keeps the most recently used kernels in memory.
+Kernels are identified by their type and the parameters (in units of pixels)
+used to generate them, so that e.g. a ``SeeingPSF`` only builds a new kernel
+when the FOV pixel scale actually changes.
+
+Any new analytic kernel shape can be made available by adding a generator
+function to ``KERNEL_FUNCTIONS`` via ``register_kernel``.
+
+``convolve_kernel`` checks whether a kernel is separable (i.e. it is the outer
+product of two 1D profiles) and, if so, applies it as two sequential 1D
+convolutions, reducing the cost from O(N k^2) to O(N k). ``combine_kernels``
+pre-convolves several small kernels so that an image only needs to be
+convolved once.
+
+Large tabulated kernels are cropped with ``truncate_kernel`` to the smallest
+box which contains ``1 - flux_accuracy`` of the flux. The cropped wings can be
+kept as a low resolution halo (``make_halo_kernel``, ``convolve_halo``).
+
+``pupil_psf_cube`` generates PSF kernels from a telescope pupil mask (plus an
+optional phase screen) for many wavelengths at once. ``get_pupil_psf_cube``
+keeps the results in a content-addressed cache on disk.
+
+``LayerMapIndex`` gives fast access to which layers of a field-varying PSF
+cube cover a given field of view.
+"""
+
+import os
+from collections import OrderedDict
+
+import numpy as np
+from scipy.signal import convolve
+from scipy.special import erfcinv
+
+from astropy.convolution import Gaussian2DKernel, Moffat2DKernel, \
+    AiryDisk2DKernel
+
+from ..optics import image_plane_utils as imp_utils
+from .. import utils
+
+
+KERNEL_CACHE_SIZE = 64
+SEPARABLE_KERNEL_TOLERANCE = 1e-7
+
+_kernel_cache = OrderedDict()
+
+
+################################################################################
+# Analytic kernel generators - all parameters are in units of pixels
+
+
+def gaussian_kernel(sigma, x_size=None, y_size=None, mode="center"):
+    """
+    Returns a normalised 2D Gaussian kernel
+
+    Parameters
+    ----------
+    sigma : float
+        [pixel] Standard deviation of the gaussian
+    x_size, y_size : int, optional
+        [pixel] Dimensions of the kernel. Default is 8 * sigma
+    mode : str, optional
+        See ``astropy.convolution.Gaussian2DKernel``
+
+    Returns
+    -------
+    kernel : np.ndarray
+
+    """
+    kernel = Gaussian2DKernel(sigma, x_size=x_size, y_size=y_size,
+                              mode=mode).array
+    kernel /= np.sum(kernel)
+    return kernel
+
+
+def moffat_kernel(alpha, beta, x_size=None, y_size=None, mode="center"):
+    """
+    Returns a normalised 2D Moffat kernel
+
+    Parameters
+    ----------
+    alpha : float
+        [pixel] Core width of the Moffat profile
+    beta : float
+        Power index of the Moffat profile
+    x_size, y_size : int, optional
+        [pixel] Dimensions of the kernel.
+    mode : str, optional
+        See ``astropy.convolution.Moffat2DKernel``
+
+    Returns
+    -------
+    kernel : np.ndarray
+
+    """
+    kernel = Moffat2DKernel(alpha, beta, x_size=x_size, y_size=y_size,
+                            mode=mode).array
+    kernel /= np.sum(kernel)
+    return kernel
+
+
+def airy_kernel(radius, x_size=None, y_size=None, mode="center"):
+    """
+    Returns a normalised 2D Airy disk kernel
+
+    Parameters
+    ----------
+    radius : float
+        [pixel] Radius of the first zero of the Airy disk
+    x_size, y_size : int, optional
+        [pixel] Dimensions of the kernel.
+    mode : str, optional
+        See ``astropy.convolution.AiryDisk2DKernel``
+
+    Returns
+    -------
+    kernel : np.ndarray
+
+    """
+    kernel = AiryDisk2DKernel(radius, x_size=x_size, y_size=y_size,
+                              mode=mode).array
+    kernel /= np.sum(kernel)
+    return kernel
+
+
+KERNEL_FUNCTIONS = {"gaussian": gaussian_kernel,
+                    "moffat": moffat_kernel,
+                    "airy": airy_kernel}
+
+
+def register_kernel(kind, func):
+    """
+    Makes a new analytic kernel generator available to ``get_analytic_kernel``
+
+    Parameters
+    ----------
+    kind : str
+        Name under which the kernel type is known, e.g. ``"gaussian"``
+    func : callable
+        A function which accepts only keyword arguments (in units of pixels)
+        and returns a 2D ``np.ndarray``
+
+    """
+    if not callable(func):
+        raise ValueError("func must be callable: {}".format(func))
+    KERNEL_FUNCTIONS[kind] = func
+
+
+################################################################################
+# Kernel cache
+
+
+def get_analytic_kernel(kind, **kwargs):
+    """
+    Returns an analytic kernel, building it only if it is not in the cache
+
+    The returned array is shared with the cache and is therefore read-only.
+    Use ``.copy()`` (or ``.astype(float)``) before altering it.
+
+    Parameters
+    ----------
+    kind : str
+        One of the keys in ``KERNEL_FUNCTIONS``: gaussian, moffat, airy
+    kwargs
+        The parameters passed to the kernel generator function, e.g. ``sigma``,
+        ``x_size``, ``y_size``, ``mode``
+
+    Returns
+    -------
+    kernel : np.ndarray
+
+    """
+    if kind not in KERNEL_FUNCTIONS:
+        raise ValueError("Kernel type {} not found in KERNEL_FUNCTIONS: {}"
+                         "".format(kind, list(KERNEL_FUNCTIONS.keys())))
+
+    key = _kernel_cache_key(kind, kwargs)
+    if key in _kernel_cache:
+        _kernel_cache.move_to_end(key)
+    else:
+        kernel = np.asarray(KERNEL_FUNCTIONS[kind](**kwargs), dtype=float)
+        kernel.flags.writeable = False
+        _kernel_cache[key] = kernel
+        while len(_kernel_cache) > KERNEL_CACHE_SIZE:
+            _kernel_cache.popitem(last=False)
+
+    return _kernel_cache[key]
+
+
+def clear_kernel_cache():
+    """Removes all kernels from the analytic kernel cache"""
+    _kernel_cache.clear()
+
+
+def _kernel_cache_key(kind, kwargs):
+    key = [kind]
+    for name in sorted(kwargs):
+        val = kwargs[name]
+        if isinstance(val, float):
+            val = float("{:.10g}".format(val))
+        key += [(name, val)]
+
+    return tuple(key)
+
+
+################################################################################
+# Kernel truncation
+
+
+def gaussian_kernel_width(sigma, flux_accuracy=1e-3):
+    """
+    Returns the (odd) width of a gaussian kernel which contains enough flux
+
+    The width is chosen so that the flux in the truncated wings is less than
+    ``flux_accuracy``. Each axis is allowed to lose half of ``flux_accuracy``.
+
+    Parameters
+    ----------
+    sigma : float
+        [pixel]
+    flux_accuracy : float
+        Fraction of the total flux which may be lost in the wings
+
+    Returns
+    -------
+    width : int
+        [pixel]
+
+    """
+    flux_accuracy = min(max(flux_accuracy, 1e-15), 1.)
+    half_width = np.sqrt(2) * sigma * erfcinv(0.5 * flux_accuracy)
+    width = 2 * int(np.ceil(half_width)) + 1
+
+    return width
+
+
+def encircled_energy_box(kernel, flux_accuracy=1e-3):
+    """
+    Returns the smallest centred box containing ``1 - flux_accuracy`` of a kernel
+
+    The box is centred on the middle of the kernel array (not on the peak), so
+    that cropping does not shift the centre of the PSF.
+
+    Parameters
+    ----------
+    kernel : np.ndarray
+        2D kernel
+    flux_accuracy : float
+        Fraction of the total flux which may be lost outside the box
+
+    Returns
+    -------
+    y0, y1, x0, x1 : int
+        Pixel range, suitable for slicing ``kernel[y0:y1, x0:x1]``
+
+    """
+    kernel = np.asarray(kernel, dtype=float)
+    h, w = kernel.shape
+    total = np.sum(kernel)
+    if total <= 0:
+        return 0, h, 0, w
+
+    # Chebyshev distance of each pixel from the kernel centre. For even sized
+    # axes the two central pixels both have distance 0
+    dy = np.floor(np.abs(np.arange(h) - 0.5 * (h - 1))).astype(int)
+    dx = np.floor(np.abs(np.arange(w) - 0.5 * (w - 1))).astype(int)
+    dist = np.maximum(dy[:, None], dx[None, :])
+
+    ring_flux = np.bincount(dist.ravel(), weights=kernel.ravel())
+    enclosed = np.cumsum(ring_flux) / total
+    radius = int(np.argmax(enclosed >= 1 - flux_accuracy))
+
+    y0, y1 = _centred_range(h, radius)
+    x0, x1 = _centred_range(w, radius)
+
+    return y0, y1, x0, x1
+
+
+def _centred_range(n, radius):
+    """Returns the index range of all pixels within ``radius`` of the centre"""
+    i0 = max(0, (n - 1) // 2 - radius)
+    i1 = min(n, n // 2 + radius + 1)
+    return i0, i1
+
+
+def truncate_kernel(kernel, flux_accuracy=1e-3):
+    """
+    Crops a kernel to the smallest centred box holding 1 - flux_accuracy
+
+    Parameters
+    ----------
+    kernel : np.ndarray
+        2D kernel
+    flux_accuracy : float
+        Fraction of the total flux which may be lost in the cropped wings
+
+    Returns
+    -------
+    core : np.ndarray
+        The cropped kernel. The flux is not re-normalised
+
+    """
+    y0, y1, x0, x1 = encircled_energy_box(kernel, flux_accuracy)
+    return kernel[y0:y1, x0:x1]
+
+
+def make_halo_kernel(kernel, flux_accuracy=1e-3, binning=4):
+    """
+    Returns the wings outside the core of a kernel, binned to a lower resolution
+
+    The wings are everything outside ``encircled_energy_box``. They are summed
+    in blocks of ``binning`` x ``binning`` pixels, after padding the kernel
+    symmetrically so that the centre of the kernel stays (as close as possible
+    to) the centre of the binned halo.
+
+    Parameters
+    ----------
+    kernel : np.ndarray
+    flux_accuracy : float
+        See ``encircled_energy_box``
+    binning : int
+        Number of kernel pixels per halo pixel along each axis
+
+    Returns
+    -------
+    halo : np.ndarray, None
+        None if there is no flux outside the core
+
+    """
+    y0, y1, x0, x1 = encircled_energy_box(kernel, flux_accuracy)
+    h, w = np.shape(kernel)
+    if (y0, y1, x0, x1) == (0, h, 0, w):
+        return None
+
+    wings = np.array(kernel, dtype=float)
+    wings[y0:y1, x0:x1] = 0
+    if not np.any(wings):
+        return None
+
+    pads = []
+    for n in (h, w):
+        m = int(np.ceil(n / binning))
+        m += 1 - m % 2                          # odd number of halo pixels
+        pad = m * binning - n
+        pads += [(pad // 2, pad - pad // 2)]
+    wings = np.pad(wings, pads, mode="constant")
+
+    hh, ww = wings.shape
+    halo = wings.reshape(hh // binning, binning,
+                         ww // binning, binning).sum(axis=(1, 3))
+
+    return halo
+
+
+def convolve_halo(image, halo, binning=4, shape=None):
+    """
+    Convolves an image with a low resolution halo kernel
+
+    The image is binned by ``binning``, convolved with ``halo`` and the result
+    is spread evenly back over the original pixels.
+
+    Parameters
+    ----------
+    image : np.ndarray
+        2D image
+    halo : np.ndarray
+        Binned halo kernel, see ``make_halo_kernel``
+    binning : int
+        Binning factor used to make ``halo``
+    shape : tuple of int, optional
+        Shape of the returned array. The halo image is placed in the centre,
+        e.g. to match the output of a "full" convolution with the kernel core.
+        Default is ``image.shape``
+
+    Returns
+    -------
+    halo_image : np.ndarray
+
+    """
+    h, w = image.shape
+    hb, wb = int(np.ceil(h / binning)), int(np.ceil(w / binning))
+    binned = np.pad(image, [(0, hb * binning - h), (0, wb * binning - w)],
+                    mode="constant")
+    binned = binned.reshape(hb, binning, wb, binning).sum(axis=(1, 3))
+
+    binned = convolve(binned, halo, mode="same")
+    halo_image = np.repeat(np.repeat(binned, binning, axis=0), binning, axis=1)
+    halo_image = halo_image[:h, :w] / binning**2
+
+    if shape is not None and tuple(shape) != (h, w):
+        dy, dx = (shape[0] - h) // 2, (shape[1] - w) // 2
+        canvas = np.zeros(shape)
+        canvas[dy:dy + h, dx:dx + w] = halo_image
+        halo_image = canvas
+
+    return halo_image
+
+
+################################################################################
+# Kernel application
+
+
+def separate_kernel(kernel, rtol=SEPARABLE_KERNEL_TOLERANCE):
+    """
+    Splits a 2D kernel into two 1D profiles, if the kernel is separable
+
+    A kernel ``K`` is separable if ``K = outer(y, x)``. In this case the row
+    and column sums of ``K`` are proportional to ``x`` and ``y``, so that
+    ``K * sum(K) == outer(K.sum(axis=1), K.sum(axis=0))``.
+
+    Parameters
+    ----------
+    kernel : np.ndarray
+        2D kernel
+    rtol : float
+        Maximum allowed deviation from the separable approximation, relative
+        to the peak value of the kernel
+
+    Returns
+    -------
+    profiles : tuple of np.ndarray, None
+        ``(y_profile, x_profile)`` if the kernel is separable, otherwise None
+
+    """
+    kernel = np.asarray(kernel, dtype=float)
+    if kernel.ndim != 2 or min(kernel.shape) < 2:
+        return None
+
+    total = np.sum(kernel)
+    peak = np.max(np.abs(kernel))
+    if total == 0 or peak == 0:
+        return None
+
+    y_profile = np.sum(kernel, axis=1)
+    x_profile = np.sum(kernel, axis=0) / total
+    residual = np.max(np.abs(np.outer(y_profile, x_profile) - kernel))
+    if residual > rtol * peak:
+        return None
+
+    return y_profile, x_profile
+
+
+def convolve_kernel(image, kernel, mode="full",
+                    rtol=SEPARABLE_KERNEL_TOLERANCE):
+    """
+    Convolves an image with a kernel, using 1D passes for separable kernels
+
+    Parameters
+    ----------
+    image : np.ndarray
+        2D image
+    kernel : np.ndarray
+        2D kernel
+    mode : str
+        ["full", "same", "valid"] See ``scipy.signal.convolve``
+    rtol : float
+        See ``separate_kernel``
+
+    Returns
+    -------
+    new_image : np.ndarray
+
+    """
+    profiles = None
+    if np.ndim(image) == 2:
+        profiles = separate_kernel(kernel, rtol=rtol)
+
+    if profiles is None:
+        new_image = convolve(image, kernel, mode=mode)
+    else:
+        y_profile, x_profile = profiles
+        new_image = convolve(image, y_profile[:, None], mode=mode)
+        new_image = convolve(new_image, x_profile[None, :], mode=mode)
+
+    return new_image
+
+
+def combine_kernels(kernels):
+    """
+    Convolves a list of kernels with each other
+
+    Convolving an image successively with each kernel in ``kernels`` (in
+    "full" mode) is equivalent to a single convolution with the combined
+    kernel. The kernels are not re-normalised.
+
+    Parameters
+    ----------
+    kernels : list of np.ndarray
+        2D kernels
+
+    Returns
+    -------
+    kernel : np.ndarray
+        Shape is ``sum(k.shape) - (len(kernels) - 1)`` along each axis
+
+    """
+    combined = np.ones((1, 1))
+    for kernel in kernels:
+        combined = convolve_kernel(combined, np.asarray(kernel, dtype=float),
+                                   mode="full")
+
+    return combined
+
+
+################################################################################
+# Pupil based PSFs
+
+
+def make_pupil_mask(n_pix, diameter, inner_diameter=0., n_spiders=0,
+                    spider_width=0., spider_angle=0.):
+    """
+    Returns a pupil transmission mask for a circular telescope aperture
+
+    Parameters
+    ----------
+    n_pix : int
+        Number of pixels across the pupil. The mask spans exactly ``diameter``
+    diameter : float
+        [m] Outer diameter of the primary mirror
+    inner_diameter : float, optional
+        [m] Diameter of the central obscuration
+    n_spiders : int, optional
+        Number of spider arms holding the secondary mirror
+    spider_width : float, optional
+        [m] Width of each spider arm
+    spider_angle : float, optional
+        [deg] Position angle of the first spider arm
+
+    Returns
+    -------
+    pupil : np.ndarray
+        2D array of shape (n_pix, n_pix) with values 0 or 1
+
+    """
+    dx = diameter / n_pix
+    coords = (np.arange(n_pix) - 0.5 * (n_pix - 1)) * dx
+    x, y = np.meshgrid(coords, coords)
+    r = np.sqrt(x**2 + y**2)
+
+    pupil = (r <= 0.5 * diameter) * (r >= 0.5 * inner_diameter)
+    for i in range(n_spiders):
+        ang = np.deg2rad(spider_angle + i * 360. / n_spiders)
+        along = x * np.cos(ang) + y * np.sin(ang)
+        across = -x * np.sin(ang) + y * np.cos(ang)
+        pupil *= ~((along >= 0) * (np.abs(across) <= 0.5 * spider_width))
+
+    return pupil.astype(float)
+
+
+def pupil_psf_cube(pupil, pupil_pixel_size, waves, pixel_scale, kernel_size,
+                   opd=None, chunk_size=16):
+    """
+    Returns normalised PSF kernels for a pupil at a list of wavelengths
+
+    The focal plane electric field is calculated with a matrix Fourier
+    transform, which allows the PSF to be sampled directly at ``pixel_scale``
+    for every wavelength. All wavelengths in a chunk are computed with a
+    single batched matrix product.
+
+    Parameters
+    ----------
+    pupil : np.ndarray
+        2D pupil transmission mask, see ``make_pupil_mask``
+    pupil_pixel_size : float
+        [m] Size of a pupil pixel
+    waves : array-like
+        [um] Wavelengths
+    pixel_scale : float
+        [arcsec] Pixel scale of the kernels
+    kernel_size : int
+        [pixel] Width and height of the kernels
+    opd : np.ndarray, optional
+        [um] Optical path difference map (phase screen) with the same shape as
+        ``pupil``
+    chunk_size : int, optional
+        Number of wavelengths computed at the same time. Limits memory use
+
+    Returns
+    -------
+    cube : np.ndarray
+        Array of shape (len(waves), kernel_size, kernel_size). Each layer sums
+        to 1
+
+    """
+    pupil = np.asarray(pupil, dtype=float)
+    waves = np.atleast_1d(np.asarray(waves, dtype=float))
+    ny, nx = pupil.shape
+    ys = (np.arange(ny) - 0.5 * (ny - 1)) * pupil_pixel_size
+    xs = (np.arange(nx) - 0.5 * (nx - 1)) * pupil_pixel_size
+    theta = (np.arange(kernel_size) - 0.5 * (kernel_size - 1)) * \
+        np.deg2rad(pixel_scale / 3600.)
+
+    cube = np.zeros((len(waves), kernel_size, kernel_size))
+    for i0 in range(0, len(waves), chunk_size):
+        lam = waves[i0:i0 + chunk_size, None, None] * 1e-6        # [m]
+        field = pupil[None, :, :].astype(complex)
+        if opd is not None:
+            field = field * np.exp(2j * np.pi * opd[None, :, :] * 1e-6 / lam)
+
+        mft_y = np.exp(-2j * np.pi * theta[None, :, None] * ys[None, None, :]
+                       / lam)
+        mft_x = np.exp(-2j * np.pi * xs[None, :, None] * theta[None, None, :]
+                       / lam)
+        e_field = np.matmul(np.matmul(mft_y, field), mft_x)
+        psf = np.abs(e_field)**2
+        psf /= np.sum(psf, axis=(1, 2))[:, None, None]
+        cube[i0:i0 + chunk_size] = psf
+
+    return cube
+
+
+def get_pupil_psf_cube(pupil, pupil_pixel_size, waves, pixel_scale,
+                       kernel_size, opd=None):
+    """
+    Returns a PSF cube from ``pupil_psf_cube``, using the disk cache if possible
+
+    Cubes are stored as ``.npy`` files named by a hash of all the input
+    parameters in the ``psfs`` folder of ``!SIM.file.cache_path``. A cube is
+    therefore only calculated once for any given configuration, even across
+    separate python sessions and worker processes. If ``!SIM.file.cache_path``
+    is None, the cube is always calculated.
+
+    Parameters
+    ----------
+    See ``pupil_psf_cube``
+
+    Returns
+    -------
+    cube : np.ndarray
+
+    """
+    waves = np.atleast_1d(np.asarray(waves, dtype=float))
+    key = utils.content_hash("pupil_psf_cube", pupil, pupil_pixel_size, waves,
+                             float(pixel_scale), int(kernel_size), opd)
+    filename = utils.cache_file_path(key, subdir="psfs", suffix=".npy")
+
+    if filename is not None and os.path.exists(filename):
+        cube = np.load(filename)
+    else:
+        cube = pupil_psf_cube(pupil, pupil_pixel_size, waves, pixel_scale,
+                              kernel_size, opd=opd)
+        if filename is not None:
+            # write to a temporary file first, so that parallel processes
+            # never read a half-written cube
+            tmp_name = "{}.{}.tmp.npy".format(filename[:-4], os.getpid())
+            np.save(tmp_name, cube)
+            os.replace(tmp_name, filename)
+
+    return cube
+
+
+################################################################################
+# Field varying PSF layer lookup
+
+
+class LayerMapIndex:
+    """
+    Spatial lookup table for the layer map of a field-varying PSF cube
+
+    Answers the question "which PSF layer applies to each pixel of a header
+    grid" with a nearest-neighbour lookup in the layer map, instead of
+    reprojecting the map onto the header grid. Results are cached per header
+    geometry.
+
+    Parameters
+    ----------
+    layer_map_hdu : fits.ImageHDU
+        An image with a sky WCS where the pixel values are the layer indices
+        of the PSF cube
+
+    """
+    def __init__(self, layer_map_hdu, cache_size=128):
+        self.header = layer_map_hdu.header.copy()
+        self.data = np.round(layer_map_hdu.data).astype(int)
+        self.layer_ids = np.unique(self.data)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def pixel_bounds(self, header, margin=0):
+        """
+        Returns the layer map pixel range covered by the footprint of a header
+
+        Parameters
+        ----------
+        header : fits.Header
+            Must contain a sky WCS (no suffix)
+        margin : int
+            [pixel] Number of layer map pixels to add around the footprint
+
+        Returns
+        -------
+        x0, x1, y0, y1 : int
+            Pixel range, suitable for slicing ``data[y0:y1, x0:x1]``. Values
+            are not clipped to the layer map dimensions
+
+        """
+        xsky, ysky = imp_utils.calc_footprint(header)
+        xpix, ypix = imp_utils.val2pix(self.header, xsky, ysky)
+        x0 = int(np.floor(np.min(xpix))) - margin
+        x1 = int(np.ceil(np.max(xpix))) + margin
+        y0 = int(np.floor(np.min(ypix))) - margin
+        y1 = int(np.ceil(np.max(ypix))) + margin
+
+        return x0, x1, y0, y1
+
+    def layer_cutout(self, header):
+        """
+        Returns the layer index for each pixel of the header grid
+
+        Each pixel gets the layer of the layer map pixel under its centre.
+        Pixels outside the layer map get the layer of the nearest layer map
+        pixel, i.e. the layers at the edge of the map are extended outwards.
+
+        Parameters
+        ----------
+        header : fits.Header
+            Must contain a sky WCS (no suffix)
+
+        Returns
+        -------
+        layer_cutout : np.ndarray
+            Integer array with the shape (NAXIS2, NAXIS1) of the header
+
+        """
+        key = imp_utils.header_geometry_key(header)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        h, w = self.data.shape
+        xpix, ypix = np.meshgrid(np.arange(header["NAXIS1"]) + 0.5,
+                                 np.arange(header["NAXIS2"]) + 0.5)
+        xsky, ysky = imp_utils.pix2val(header, xpix, ypix)
+        xmap, ymap = imp_utils.val2pix(self.header, xsky, ysky)
+        xmap = np.clip(np.floor(xmap).astype(int), 0, w - 1)
+        ymap = np.clip(np.floor(ymap).astype(int), 0, h - 1)
+
+        self._cache[key] = self.data[ymap, xmap]
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+        return self._cache[key]
+
+    def single_layer(self, header):
+        """
+        Returns the layer index if only one layer covers the header footprint
+
+        A margin of one layer map pixel is included so that rounding in a
+        later reprojection can't introduce a neighbouring layer.
+
+        Parameters
+        ----------
+        header : fits.Header
+
+        Returns
+        -------
+        layer_id : int, None
+            None if the footprint is not completely inside the layer map, or
+            if more than one layer is found
+
+        """
+        h, w = self.data.shape
+        x0, x1, y0, y1 = self.pixel_bounds(header, margin=1)
+        layer_id = None
+        if x0 >= 0 and y0 >= 0 and x1 <= w and y1 <= h:
+            cutout = self.data[y0:y1, x0:x1]
+            if cutout.size > 0 and np.all(cutout == cutout.flat[0]):
+                layer_id = int(cutout.flat[0])
+
+        return layer_id
@@ -1,13 +1,14 @@
+from collections import OrderedDict
+
 import numpy as np
-from scipy.signal import convolve
 from scipy.ndimage import zoom
-from scipy.interpolate import griddata
+from scipy.spatial import cKDTree
 
 from astropy import units as u
 from astropy.io import fits
-from astropy.convolution import Gaussian2DKernel
 
 from .effects import Effect
+from . import psf_utils as pu
 from ..optics import image_plane_utils as imp_utils
 from ..base_classes import ImagePlaneBase, FieldOfViewBase
 from .. import utils
@@ -17,6 +18,7 @@ from .. import rc
 class PSF(Effect):
     def __init__(self, **kwargs):
         self.kernel = None
+        self.halo = None
         self.valid_waverange = None
         self._waveset = None
         super(PSF, self).__init__(**kwargs)
@@ -42,7 +44,11 @@ class PSF(Effect):
                 mode = self.meta["convolve_mode"]
                 kernel = self.get_kernel(obj).astype(float)
                 image = obj.hdu.data.astype(float)
-                new_image = convolve(image, kernel, mode=mode)
+                new_image = pu.convolve_kernel(image, kernel, mode=mode)
+                if self.halo is not None:
+                    new_image += pu.convolve_halo(image, self.halo,
+                                                  self.meta["halo_binning"],
+                                                  new_image.shape)
                 new_shape = new_image.shape
 
                 obj.hdu.data = new_image
@@ -74,6 +80,68 @@ class PSF(Effect):
         self.kernel = np.ones((1, 1))
         return self.kernel
 
+    @property
+    def is_shift_invariant(self):
+        """
+        True if the effect is a single full convolution with one kernel
+
+        Only these PSFs can be combined into a ``FusedPSF``. Subclasses which
+        override ``apply_to`` (e.g. ``FieldVaryingPSF``) and PSFs with a
+        low resolution halo are excluded.
+        """
+        return self.meta["convolve_mode"] == "full" and \
+            not self.meta.get("kernel_halo", False) and \
+            type(self).apply_to is PSF.apply_to
+
+
+class FusedPSF(PSF):
+    """
+    Applies several shift-invariant PSF effects with a single convolution
+
+    The kernels of all member effects which apply to an object are convolved
+    with each other before being applied to the image. As convolution is
+    associative, the result (image and CRPIX shift) is identical to applying
+    the member effects one after the other, but the image is only convolved
+    once.
+
+    Instances are generally created by
+    ``effects_utils.combine_psf_effects`` and not by the user.
+
+    Parameters
+    ----------
+    psf_effects : list of PSF
+        Effects for which ``is_shift_invariant`` is True. The ``include``
+        flags must already have been checked.
+
+    """
+    def __init__(self, psf_effects, **kwargs):
+        super(FusedPSF, self).__init__(**kwargs)
+        self.psf_effects = list(psf_effects)
+        self.meta["name"] = " + ".join([str(eff.meta.get("name", ""))
+                                        for eff in self.psf_effects])
+        self.meta["z_order"] = []
+        classes = []
+        for eff in self.psf_effects:
+            eff_classes = eff.apply_to_classes
+            if not isinstance(eff_classes, tuple):
+                eff_classes = (eff_classes,)
+            classes += [cls for cls in eff_classes if cls not in classes]
+        self.apply_to_classes = tuple(classes)
+
+    def apply_to(self, obj):
+        if any(isinstance(obj, eff.apply_to_classes)
+               for eff in self.psf_effects):
+            obj = super(FusedPSF, self).apply_to(obj)
+
+        return obj
+
+    def get_kernel(self, obj):
+        kernels = [eff.get_kernel(obj) for eff in self.psf_effects
+                   if isinstance(obj, eff.apply_to_classes)]
+        self.kernel = pu.combine_kernels(kernels)
+
+        return self.kernel
+
 
 ################################################################################
 # Analytical PSFs - Vibration, Seeing, NCPAs
@@ -105,8 +173,9 @@ class Vibration(AnalyticalPSF):
             fwhm_pix = self.meta["fwhm"] / self.meta["pixel_scale"]
             sigma = fwhm_pix / 2.35
             width = int(fwhm_pix * self.meta["width_n_fwhms"])
-            self.kernel = Gaussian2DKernel(sigma, x_size=width, y_size=width,
-                                           mode="center").array
+            self.kernel = pu.get_analytic_kernel("gaussian", sigma=sigma,
+                                                 x_size=width, y_size=width,
+                                                 mode="center")
 
         return self.kernel.astype(float)
 
@@ -207,7 +276,9 @@ class SeeingPSF(AnalyticalPSF):
         fwhm = self.meta["fwhm"] * u.arcsec / pixel_scale
 
         sigma = fwhm.value / 2.35
-        kernel = Gaussian2DKernel(sigma, mode="center").array
+        width = pu.gaussian_kernel_width(sigma, self.meta["flux_accuracy"])
+        kernel = pu.get_analytic_kernel("gaussian", sigma=sigma, x_size=width,
+                                        y_size=width, mode="center")
 
         return kernel
 
@@ -252,7 +323,9 @@ class GaussianDiffractionPSF(AnalyticalPSF):
         fwhm = 1.22 * (wave / diameter) * u.rad.to(u.arcsec) / pixel_scale
 
         sigma = fwhm.value / 2.35
-        kernel = Gaussian2DKernel(sigma, mode="center").array
+        width = pu.gaussian_kernel_width(sigma, self.meta["flux_accuracy"])
+        kernel = pu.get_analytic_kernel("gaussian", sigma=sigma, x_size=width,
+                                        y_size=width, mode="center")
 
         return kernel
 
@@ -274,9 +347,107 @@ class PoppyFieldVaryingPSF(SemiAnalyticalPSF):
 
 
 class PoppyFieldConstantPSF(SemiAnalyticalPSF):
+    """
+    A field constant PSF generated from the telescope pupil
+
+    The PSF is the Fourier transform of a circular pupil with an optional
+    central obscuration, spider arms and phase screen. Kernels are generated
+    for all wavelengths in a geometric grid between ``wave_min`` and
+    ``wave_max`` at once, and are kept in the disk cache (see
+    ``psf_utils.get_pupil_psf_cube``), so that each configuration is only
+    calculated once.
+
+    Needed: diameter
+
+    kwargs
+    ------
+    diameter : float
+        [m] Outer diameter of the primary mirror
+    inner_diameter : float
+        [m] Default 0. Diameter of the central obscuration
+    n_spiders, spider_width, spider_angle : int, float [m], float [deg]
+        Default 0, 0, 0. Spider arms holding the secondary mirror
+    pupil_size : int
+        [pixel] Default 256. Sampling of the pupil
+    opd_filename : str
+        Default None. FITS image with an optical path difference map in [um]
+        across the pupil. Resampled to ``pupil_size`` if needed
+    kernel_size : int
+        [pixel] Default 127. Width of the kernels
+    wave_drift : float
+        Default 0.05. Relative wavelength step between kernel layers
+    wave_min, wave_max : float
+        [um] Default ``!SIM.spectral.wave_min``, ``!SIM.spectral.wave_max``
+
+    """
     def __init__(self, **kwargs):
         super(PoppyFieldConstantPSF, self).__init__(**kwargs)
-        self.meta["z_order"] = [252, 652]
+        params = {"z_order": [252, 652],
+                  "inner_diameter": 0.,
+                  "n_spiders": 0,
+                  "spider_width": 0.,
+                  "spider_angle": 0.,
+                  "pupil_size": 256,
+                  "opd_filename": None,
+                  "kernel_size": 127,
+                  "wave_drift": 0.05,
+                  "wave_min": "!SIM.spectral.wave_min",
+                  "wave_max": "!SIM.spectral.wave_max"}
+        params.update(kwargs)
+        self.meta.update(params)
+        self.meta = utils.from_currsys(self.meta)
+        self.apply_to_classes = FieldOfViewBase
+
+        self.required_keys = ["diameter"]
+        utils.check_keys(self.meta, self.required_keys, action="error")
+
+        wmin, wmax = self.meta["wave_min"], self.meta["wave_max"]
+        n_waves = int(np.ceil(np.log(wmax / wmin) /
+                              np.log(1 + self.meta["wave_drift"]))) + 1
+        self._waveset = np.geomspace(wmin, wmax, max(n_waves, 2))
+        self._pupil = None
+        self._opd = None
+        self._cube = None
+        self._cube_pixel_scale = None
+
+    def get_kernel(self, fov):
+        pixel_scale = fov.hdu.header["CDELT1"] * 3600      # [deg] --> [arcsec]
+        if self._cube is None or \
+                abs(pixel_scale / self._cube_pixel_scale - 1) > 1e-6:
+            pupil_pixel_size = self.meta["diameter"] / self.meta["pupil_size"]
+            self._cube = pu.get_pupil_psf_cube(self.pupil, pupil_pixel_size,
+                                               self._waveset, pixel_scale,
+                                               self.meta["kernel_size"],
+                                               opd=self.opd)
+            self._cube_pixel_scale = pixel_scale
+
+        fov_wave = utils.quantify(fov.wavelength, u.um).value
+        ii = nearest_index(fov_wave, self._waveset)
+        self.kernel = self._cube[ii]
+
+        return self.kernel
+
+    @property
+    def pupil(self):
+        if self._pupil is None:
+            self._pupil = pu.make_pupil_mask(
+                self.meta["pupil_size"], self.meta["diameter"],
+                inner_diameter=self.meta["inner_diameter"],
+                n_spiders=self.meta["n_spiders"],
+                spider_width=self.meta["spider_width"],
+                spider_angle=self.meta["spider_angle"])
+        return self._pupil
+
+    @property
+    def opd(self):
+        if self._opd is None and self.meta["opd_filename"] is not None:
+            fname = utils.find_file(self.meta["opd_filename"])
+            opd = fits.getdata(fname).astype(float)
+            n = self.meta["pupil_size"]
+            if opd.shape != (n, n):
+                opd = zoom(opd, (n / opd.shape[0], n / opd.shape[1]), order=1)
+            self._opd = opd
+        return self._opd
 
 
 ################################################################################
@@ -284,10 +455,68 @@ class PoppyFieldConstantPSF(SemiAnalyticalPSF):
 
 
 class DiscretePSF(PSF):
+    """
+    Base class for PSFs read from kernel images in a FITS file
+
+    Kernels are cropped to the smallest box which contains
+    ``1 - flux_accuracy`` of the kernel flux. The cropped kernel (plus halo)
+    is then renormalised to a total flux of 1.
+
+    kwargs
+    ------
+    truncate_kernel : bool
+        Default True. Crop the kernel wings which hold less than
+        ``flux_accuracy`` of the flux
+    kernel_halo : bool
+        Default False. Add the flux in the cropped wings back as a low
+        resolution convolution
+    halo_binning : int
+        Default 4. Number of kernel pixels per halo pixel
+    """
     def __init__(self, **kwargs):
-        super(DiscretePSF, self).__init__(**kwargs)
+        params = {"truncate_kernel": True,
+                  "kernel_halo": False,
+                  "halo_binning": 4}
+        params.update(kwargs)
+        super(DiscretePSF, self).__init__(**params)
         self.meta["z_order"] = [43]
 
+    def truncate_kernel(self, kernel):
+        """
+        Returns the cropped kernel and (if requested) the halo of the wings
+
+        Core and halo are renormalised together if the kernel was cropped, or
+        if their sum differs from 1 by more than ``flux_accuracy``. The kernel
+        itself is never changed
+
+        Parameters
+        ----------
+        kernel : np.ndarray
+
+        Returns
+        -------
+        core : np.ndarray
+        halo : np.ndarray, None
+
+        """
+        core, halo = kernel, None
+        if self.meta["truncate_kernel"]:
+            fa = self.meta["flux_accuracy"]
+            core = pu.truncate_kernel(kernel, fa)
+            if self.meta["kernel_halo"]:
+                halo = pu.make_halo_kernel(kernel, fa,
+                                           self.meta["halo_binning"])
+
+        # never renormalise in place, as the core may be a view of the kernel
+        # data in the PSF file
+        total = np.sum(core) + (0 if halo is None else np.sum(halo))
+        if total > 0 and (core.shape != np.shape(kernel) or
+                          abs(total - 1) > self.meta["flux_accuracy"]):
+            core = core / total
+            halo = None if halo is None else halo / total
+
+        return core, halo
+
 
 class FieldConstantPSF(DiscretePSF):
     def __init__(self, **kwargs):
@@ -333,8 +562,10 @@ class FieldConstantPSF(DiscretePSF):
             if abs(pix_ratio - 1) > self.meta["flux_accuracy"]:
                 self.kernel = rescale_kernel(self.kernel, pix_ratio)
 
-            if fov.header["NAXIS1"] < hdr["NAXIS1"] or \
-                    fov.header["NAXIS2"] < hdr["NAXIS2"]:
+            self.kernel, self.halo = self.truncate_kernel(self.kernel)
+
+            if fov.header["NAXIS1"] < self.kernel.shape[1] or \
+                    fov.header["NAXIS2"] < self.kernel.shape[0]:
                 self.kernel = cutout_kernel(self.kernel, fov.header)
 
         return self.kernel
@@ -347,6 +578,11 @@ class FieldVaryingPSF(DiscretePSF):
     sub_pixel_flag
     flux_accuracy : float
         Default 1e-3. Level of flux conservation during rescaling of kernel
+    layer_cache_size : int
+        Default 32. Number of FOV footprints for which the kernel layer masks
+        are kept in memory
+    truncate_kernel, kernel_halo, halo_binning
+        See ``DiscretePSF``
     """
     def __init__(self, **kwargs):
         # sub_pixel_flag and flux_accuracy are taken care of in PSF base class
@@ -356,10 +592,15 @@ class FieldVaryingPSF(DiscretePSF):
         utils.check_keys(self.meta, self.required_keys, action="error")
 
         self.meta["z_order"] = [261, 661]
+        self.meta["layer_cache_size"] = kwargs["layer_cache_size"] \
+            if "layer_cache_size" in kwargs else 32
         self._waveset, self.kernel_indexes = get_psf_wave_exts(self._file)
         self.current_ext = None
         self.current_data = None
         self._strehl_imagehdu = None
+        self._strehl_index = None
+        self._layer_masks = OrderedDict()
+        self._truncated_layers = {}
 
     def apply_to(self, fov):
         # .. todo: add in field rotation
@@ -376,23 +617,21 @@ class FieldVaryingPSF(DiscretePSF):
             # kernels and masks are returned by .get_kernel as a list of tuples
             canvas = None
             kernels_masks = self.get_kernel(fov)
-            for kernel, mask in kernels_masks:
-
-                # renormalise the kernel if needs be
-                sum_kernel = np.sum(kernel)
-                if abs(sum_kernel - 1) > self.meta["flux_accuracy"]:
-                    kernel /= sum_kernel
+            for (kernel, mask), halo in zip(kernels_masks, self.halo):
 
                 # image convolution
                 image = fov.hdu.data.astype(float)
                 kernel = kernel.astype(float)
-                new_image = convolve(image, kernel, mode="same")
+                new_image = pu.convolve_kernel(image, kernel, mode="same")
+                if halo is not None:
+                    new_image += pu.convolve_halo(image, halo,
+                                                  self.meta["halo_binning"])
                 if canvas is None:
                     canvas = np.zeros(new_image.shape)
 
                 # mask convolution + combine with convolved image
                 if mask is not None:
-                    new_mask = convolve(mask, kernel, mode="same")
+                    new_mask = pu.convolve_kernel(mask, kernel, mode="same")
                     canvas += new_image * new_mask
                 else:
                     canvas = new_image
@@ -430,36 +669,81 @@ class FieldVaryingPSF(DiscretePSF):
         if ext != self.current_ext:
             self.current_ext = ext
             self.current_data = self._file[ext].data
+            self._truncated_layers = {}
 
         # compare the fov and psf pixel scales
         kernel_pixel_scale = self._file[ext].header["CDELT1"]
         fov_pixel_scale = fov.hdu.header["CDELT1"]
 
-        # get the spatial map of the kernel cube layers
-        strl_hdu = self.strehl_imagehdu
-        strl_cutout = get_strehl_cutout(fov.hdu.header, strl_hdu)
-
         # get the kernels and mask that fit inside the fov boundaries
-        layer_ids = np.round(np.unique(strl_cutout.data)).astype(int)
-        if len(layer_ids) > 1:
-            kernels = [self.current_data[ii] for ii in layer_ids]
-            # .. todo:: investigate. There's a .T in here that I don't like
-            masks = [strl_cutout.data.T == ii for ii in layer_ids]
-            self.kernel = [[krnl, msk] for krnl, msk in zip(kernels, masks)]
-        else:
-            self.kernel = [[self.current_data[layer_ids[0]], None]]
+        layer_ids, masks = self.get_layer_masks(fov.hdu.header)
 
-        # .. todo: re-scale kernel and masks to pixel_scale of FOV
-        # .. todo: can this be put somewhere else to save on iterations?
         # .. todo: should the mask also be rescaled?
-        # rescale the pixel scale of the kernel to match the fov images
+        # rescale the pixel scale of the kernel to match the fov images.
+        # Rescaled and truncated layers are kept until the extension changes
         pix_ratio = fov_pixel_scale / kernel_pixel_scale
-        if abs(pix_ratio - 1) > self.meta["flux_accuracy"]:
-            for ii in range(len(self.kernel)):
-                self.kernel[ii][0] = rescale_kernel(self.kernel[ii][0], pix_ratio)
+        keys = [(ii, float("{:.10g}".format(pix_ratio))) for ii in layer_ids]
+        for key in keys:
+            if key not in self._truncated_layers:
+                kernel = self.current_data[key[0]]
+                if abs(pix_ratio - 1) > self.meta["flux_accuracy"]:
+                    kernel = rescale_kernel(kernel, pix_ratio)
+                self._truncated_layers[key] = self.truncate_kernel(kernel)
+
+        self.kernel = [[self._truncated_layers[key][0], msk]
+                       for key, msk in zip(keys, masks)]
+        self.halo = [self._truncated_layers[key][1] for key in keys]
 
         return self.kernel
 
+    def get_layer_masks(self, fov_header):
+        """
+        Returns the kernel layers covering a FOV and their masks on the FOV grid
+
+        If the FOV lies inside a single layer, the layer map is not reprojected
+        and the mask is None. Results are cached by FOV header geometry, as
+        FOVs for different wavelengths often share the same footprint.
+
+        Parameters
+        ----------
+        fov_header : fits.Header
+
+        Returns
+        -------
+        layer_ids : list of int
+        masks : list of np.ndarray, None
+
+        """
+        key = imp_utils.header_geometry_key(fov_header)
+        if key in self._layer_masks:
+            self._layer_masks.move_to_end(key)
+            return self._layer_masks[key]
+
+        layer_id = self.strehl_index.single_layer(fov_header)
+        if layer_id is not None:
+            layer_ids, masks = [layer_id], [None]
+        else:
+            # get the spatial map of the kernel cube layers
+            strl_cutout = self.strehl_index.layer_cutout(fov_header)
+            layer_ids = np.unique(strl_cutout)
+            if len(layer_ids) > 1:
+                masks = [strl_cutout == ii for ii in layer_ids]
+            else:
+                masks = [None]
+
+        self._layer_masks[key] = (list(layer_ids), masks)
+        while len(self._layer_masks) > self.meta["layer_cache_size"]:
+            self._layer_masks.popitem(last=False)
+
+        return self._layer_masks[key]
+
+    @property
+    def strehl_index(self):
+        """ Spatial lookup table for the positions of the kernel layers """
+        if self._strehl_index is None:
+            self._strehl_index = pu.LayerMapIndex(self.strehl_imagehdu)
+        return self._strehl_index
+
     @property
     def strehl_imagehdu(self):
         """ The HDU containing the positional info for kernel layers """
@@ -480,29 +764,44 @@ class FieldVaryingPSF(DiscretePSF):
 # Helper functions
 
 def make_strehl_map_from_table(tbl, pixel_scale=1*u.arcsec):
+    """
+    Makes a layer map ImageHDU from a catalogue of PSF layer positions
 
+    Each pixel in the map is assigned the layer of the nearest catalogue entry.
+    The map covers the extent of the catalogue at the given pixel scale.
 
-    # pixel_scale = utils.quantify(pixel_scale, u.um).to(u.deg)
-    # coords = np.array([tbl["x"], tbl["y"]]).T
-    #
-    # xmin, xmax = np.min(tbl["x"]), np.max(tbl["x"])
-    # ymin, ymax = np.min(tbl["y"]), np.max(tbl["y"])
-    # mesh = np.array(np.meshgrid(np.arange(xmin, xmax, pixel_scale),
-    #                             np.arange(np.min(tbl["y"]), np.max(tbl["y"]))))
-    # map = griddata(coords, tbl["layer"], mesh, method="nearest")
-    #
-
-    map = griddata(np.array([tbl.data["x"], tbl.data["y"]]).T,
-                   tbl.data["layer"],
-                   np.array(np.meshgrid(np.arange(-25, 26),
-                                        np.arange(-25, 26))).T,
-                   method="nearest")
+    Parameters
+    ----------
+    tbl : fits.BinTableHDU, Table
+        Must contain the columns ``x``, ``y`` [arcsec] and ``layer``
+    pixel_scale : float, Quantity
+        [arcsec] Pixel scale of the layer map
 
-    hdr = imp_utils.header_from_list_of_xy(np.array([-25, 25]) / 3600.,
-                                           np.array([-25, 25]) / 3600.,
-                                           pixel_scale=1/3600)
+    Returns
+    -------
+    map_hdu : fits.ImageHDU
 
-    map_hdu = fits.ImageHDU(header=hdr, data=map)
+    """
+    data = tbl.data if isinstance(tbl, fits.BinTableHDU) else tbl
+    x = np.array(data["x"], dtype=float) / 3600.      # [arcsec] -> [deg]
+    y = np.array(data["y"], dtype=float) / 3600.
+    layers = np.array(data["layer"])
+
+    pixel_scale = utils.quantify(pixel_scale, u.arcsec).to(u.deg).value
+    hdr = imp_utils.header_from_list_of_xy([x.min(), x.max() + pixel_scale],
+                                           [y.min(), y.max() + pixel_scale],
+                                           pixel_scale=pixel_scale)
+    hdr["NAXIS1"] = max(hdr["NAXIS1"], 1)
+    hdr["NAXIS2"] = max(hdr["NAXIS2"], 1)
+
+    xpix, ypix = np.meshgrid(np.arange(hdr["NAXIS1"]) + 0.5,
+                             np.arange(hdr["NAXIS2"]) + 0.5)
+    xsky, ysky = imp_utils.pix2val(hdr, xpix, ypix)
+    tree = cKDTree(np.array([x, y]).T)
+    _, nearest = tree.query(np.array([xsky.ravel(), ysky.ravel()]).T)
+    layer_map = layers[nearest].reshape(xpix.shape)
+
+    map_hdu = fits.ImageHDU(header=hdr, data=layer_map)
 
     return map_hdu
 
@@ -525,20 +824,30 @@ def cutout_kernel(image, fov_header):
     dx = 0.5 * fov_header["NAXIS1"]
     dy = 0.5 * fov_header["NAXIS2"]
     x0, x1 = max(0, int(xcen-dx)), min(w, int(xcen+dx)) 
-    y0, y1 = max(0, int(ycen-dy)), min(w, int(ycen+dy))
+    y0, y1 = max(0, int(ycen-dy)), min(h, int(ycen+dy))
     image_cutout = image[y0:y1, x0:x1]
 
     return image_cutout
 
 
 def get_strehl_cutout(fov_header, strehl_imagehdu):
+    """
+    Returns the layer map on the FOV grid
 
-    image = np.zeros((fov_header["NAXIS2"], fov_header["NAXIS1"]))
-    canvas_hdu = fits.ImageHDU(header=fov_header, data=image)
-    canvas_hdu = imp_utils.add_imagehdu_to_imagehdu(strehl_imagehdu,
-                                                    canvas_hdu, order=0,
-                                                    conserve_flux=False)
-    canvas_hdu.data = canvas_hdu.data.astype(int)
+    FOV pixels outside the layer map get the nearest layer, not layer 0
+
+    Parameters
+    ----------
+    fov_header : fits.Header
+    strehl_imagehdu : fits.ImageHDU
+
+    Returns
+    -------
+    canvas_hdu : fits.ImageHDU
+
+    """
+    layer_cutout = pu.LayerMapIndex(strehl_imagehdu).layer_cutout(fov_header)
+    canvas_hdu = fits.ImageHDU(header=fov_header, data=layer_cutout)
 
     return canvas_hdu
 
@@ -617,7 +926,6 @@ def strehl2sigma(strehl):
 
 
 def sigma2gauss(sigma, x_size=15, y_size=15):
-    kernel = Gaussian2DKernel(sigma, x_size=x_size, y_size=y_size,
-                              mode="oversample").array
-    kernel /= np.sum(kernel)
+    kernel = pu.get_analytic_kernel("gaussian", sigma=sigma, x_size=x_size,
+                                    y_size=y_size, mode="oversample")
     return kernel
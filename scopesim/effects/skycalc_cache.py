@@ -0,0 +1,205 @@
+"""
+A disk cache for spectra from ESO's SkyCalc service
+
+``SkycalcTERCurve`` used to query the SkyCalc server for every new object and
+write each response to the same ``skycalc_temp.fits`` file. A
+``SkycalcCache`` stores each response under a name derived from the query
+parameters, in the ``skycalc`` folder of ``!SIM.file.cache_path``. A parameter
+sweep therefore only queries each airmass/PWV/etc. combination once, also
+across sessions and parallel processes.
+
+The server is reached through a ``backend`` function. For tests, or for
+machines without internet access, this can be replaced by a local stand-in.
+In ``offline`` mode a query that is not in the cache raises an error instead
+of contacting the server.
+"""
+
+import os
+import uuid
+
+import numpy as np
+from astropy.table import Table
+
+from .. import utils
+
+
+def skycalc_ipy_backend(query):
+    """
+    Queries the SkyCalc server via ``skycalc_ipy``
+
+    Parameters
+    ----------
+    query : dict
+        SkyCalc parameters, see ``skycalc_ipy.SkyCalc().keys``
+
+    Returns
+    -------
+    tbl : astropy.Table
+        The first three columns are wavelength, transmission and emission
+
+    """
+    import skycalc_ipy
+
+    conn = skycalc_ipy.SkyCalc()
+    conn.values.update(query)
+    return conn.get_sky_spectrum(return_type="table")
+
+
+def normalise_query(query):
+    """
+    Returns a sorted copy of the SkyCalc query with plain python values
+
+    Bang-strings are resolved and numbers are converted to float, so that
+    e.g. ``airmass=1`` and ``airmass=np.float32(1.0)`` give the same cache
+    entry
+
+    Parameters
+    ----------
+    query : dict
+
+    Returns
+    -------
+    query : dict
+
+    """
+    new_query = {}
+    for key in sorted(query):
+        value = utils.from_currsys(query[key])
+        if isinstance(value, (bool, np.bool_)) or value is None:
+            pass
+        elif isinstance(value, (int, float, np.number)):
+            value = float(value)
+        elif isinstance(value, str):
+            value = value.strip()
+        new_query[key] = value
+
+    return new_query
+
+
+class SkycalcCache:
+    """
+    A content-addressed directory of SkyCalc responses
+
+    Parameters
+    ----------
+    path : str, optional
+        Directory for the cached FITS tables. Default is the ``skycalc``
+        folder of ``!SIM.file.cache_path``. If both are None, nothing is cached
+    backend : callable, optional
+        Function which takes a query dict and returns an astropy Table.
+        Default is ``skycalc_ipy_backend``
+    offline : bool, optional
+        If True, raise a ``ValueError`` when a query is not in the cache.
+        Default is False
+
+    Examples
+    --------
+    ::
+
+        >>> cache = SkycalcCache(offline=True)
+        >>> tbl = cache.get({"airmass": 1.2, "pwv": 2.5})
+
+    """
+    def __init__(self, path=None, backend=None, offline=False):
+        self.path = path
+        self.backend = skycalc_ipy_backend if backend is None else backend
+        self.offline = offline
+
+    def get(self, query, offline=None):
+        """
+        Returns the SkyCalc table for a query, from the cache if possible
+
+        Parameters
+        ----------
+        query : dict
+            SkyCalc parameters
+        offline : bool, optional
+            Overrides ``self.offline`` for this query
+
+        Returns
+        -------
+        tbl : astropy.Table
+
+        """
+        offline = self.offline if offline is None else offline
+
+        # the normalised query is only used for the file name. The backend
+        # gets the values as they were given
+        filename = self.filename(query)
+        if filename is not None and os.path.exists(filename):
+            return Table.read(filename, format="fits")
+
+        if offline:
+            raise ValueError("SkyCalc query is not in the cache ({}) and "
+                             "offline mode is on: {}"
+                             "".format(filename, normalise_query(query)))
+
+        tbl = Table(self.backend(dict(query)))
+        if filename is not None:
+            # write to a temporary file first, so that parallel processes and
+            # threads never read a half-written table
+            tmp_name = "{}.{}.tmp.fits".format(filename[:-5], uuid.uuid4().hex)
+            tbl.write(tmp_name, format="fits", overwrite=True)
+            os.replace(tmp_name, filename)
+
+        return tbl
+
+    def filename(self, query):
+        """
+        Returns the path of the cache file for a query
+
+        Parameters
+        ----------
+        query : dict
+
+        Returns
+        -------
+        filename : str, None
+            None if disk caching is turned off
+
+        """
+        key = utils.content_hash("skycalc", normalise_query(query))
+        if self.path is not None:
+            path = os.path.expanduser(self.path)
+            os.makedirs(path, exist_ok=True)
+            return os.path.join(path, key + ".fits")
+
+        return utils.cache_file_path(key, subdir="skycalc", suffix=".fits")
+
+    def __repr__(self):
+        return "SkycalcCache at {} (offline={})".format(
+            self.path or utils.cache_file_path("", subdir="skycalc"),
+            self.offline)
+
+
+_SKYCALC_CACHE = None
+
+
+def get_skycalc_cache():
+    """
+    Returns the SkycalcCache used by ``SkycalcTERCurve``
+
+    Returns
+    -------
+    cache : SkycalcCache
+
+    """
+    global _SKYCALC_CACHE
+    if _SKYCALC_CACHE is None:
+        _SKYCALC_CACHE = SkycalcCache()
+
+    return _SKYCALC_CACHE
+
+
+def set_skycalc_cache(cache):
+    """
+    Replaces the SkycalcCache used by ``SkycalcTERCurve``
+
+    Parameters
+    ----------
+    cache : SkycalcCache, None
+        None resets the default cache
+
+    """
+    global _SKYCALC_CACHE
+    _SKYCALC_CACHE = cache
@@ -1,9 +1,11 @@
 
+import warnings
+
 import numpy as np
 
 from astropy import units as u
 
-from synphot import SourceSpectrum, SpectralElement
+from synphot import SourceSpectrum
 from synphot.models import Empirical1D
 
 from .. import rc
@@ -11,6 +13,7 @@ from .. import utils
 from ..utils import quantify
 from ..base_classes import SourceBase, ImagePlaneBase, FieldOfViewBase
 from ..optics.radiometry import RadiometryTable
+from ..source.spectral_library import SpectralLibrary
 from .effects import Effect
 from .ter_curves import TERCurve
 
@@ -32,6 +35,18 @@ class SurfaceList(Effect):
 
     array_dict : dict
 
+    throughput_sampling : str, int, optional
+        How the throughput is applied to a list of source spectra. Default is
+        ``!SIM.computing.throughput_sampling``
+        - "native" : each spectrum keeps its own wavelength points
+        - "union" : all spectra are sampled on the union of their wavelength
+          points and scaled at once as a ``SpectralLibrary``
+        - int : as "union", but on this many geometrically spaced points
+    max_library_size : int, optional
+        Maximum number of elements (spectra x wavelength points) of the
+        "union" grid. Larger grids fall back to geometrically spaced points
+        with a warning. Default is ``!SIM.computing.max_library_size``
+
 
     Input format
     ------------
@@ -43,12 +58,14 @@ class SurfaceList(Effect):
         self.meta["minimum_throughput"] = "!SIM.spectral.minimum_throughput"
         self.meta["wave_min"] = "!SIM.spectral.wave_min"
         self.meta["wave_max"] = "!SIM.spectral.wave_max"
+        self.meta["throughput_sampling"] = "!SIM.computing.throughput_sampling"
+        self.meta["max_library_size"] = "!SIM.computing.max_library_size"
         self.meta.update(kwargs)
 
         self.radiometry_table = RadiometryTable()
         self.radiometry_table.meta.update(self.meta)
-        self._emission = None
-        self._throughput = None
+        self._sampled = {}
+        self._fov_emission = {}
 
         data = self.get_data()
         if data is not None:
@@ -63,6 +80,34 @@ class SurfaceList(Effect):
         """
         if isinstance(obj, SourceBase) and not self.is_empty:
             self.meta = utils.from_currsys(self.meta)
+            sampled = self._sampled_throughput()
+
+            # cube fields don't reference spectra, so the throughput is
+            # applied slice by slice when the cube is extracted
+            thru_wave, thru = sampled["wave"], sampled["throughput"]
+            if getattr(obj, "cube_throughput", None) is not None:
+                old_wave, old_thru = obj.cube_throughput
+                new_wave = np.union1d(thru_wave, old_wave)
+                thru = np.interp(new_wave, thru_wave, thru) * \
+                    np.interp(new_wave, old_wave, old_thru)
+                thru_wave = new_wave
+            obj.cube_throughput = (thru_wave, thru)
+            sampling = self.meta["throughput_sampling"]
+            if sampling != "native" and not \
+                    isinstance(obj.spectra, SpectralLibrary) and \
+                    len(obj.spectra) > 0:
+                obj.spectra = self._spectra_to_library(obj.spectra, sampling)
+
+            if isinstance(obj.spectra, SpectralLibrary):
+                def throughput(wave):
+                    return np.interp(wave.to(u.AA).value, sampled["wave"],
+                                     sampled["throughput"])
+
+                obj.spectra.apply_throughput(throughput,
+                                             self.meta["wave_min"],
+                                             self.meta["wave_max"])
+                return obj
+
             for ii in range(len(obj.spectra)):
                 spec = obj.spectra[ii]
                 wave_val = spec.waveset.value
@@ -73,7 +118,8 @@ class SurfaceList(Effect):
 
                 wave = ([wave_min.value] + list(wave_val[mask]) +
                         [wave_max.value]) * wave_unit
-                thru = self.throughput(wave)
+                thru = np.interp(wave.to(u.AA).value, sampled["wave"],
+                                 sampled["throughput"])
                 flux = spec(wave)
                 flux *= thru
                 new_source = SourceSpectrum(Empirical1D, points=wave,
@@ -81,39 +127,118 @@ class SurfaceList(Effect):
                 obj.spectra[ii] = new_source
 
         elif isinstance(obj, ImagePlaneBase) and not self.is_empty:
-            # by calling use_area, the surface area is taken into account, but
-            # the units are stuck in PHOTLAM for synphot
-            emission = self.get_emission(use_area=True)  # --> PHOTLAM * area
-            if emission is not None:
-                wave = emission.waveset  # angstrom
-                flux = emission(wave)    # PHOTLAM --> ph s-1 cm-2 AA-1 * cm2
-                phs = (np.trapz(flux, wave) * u.cm**2).to(u.Unit("ph s-1"))
-            else:
-                phs = 0 * (u.ph / u.s)
+            # the sampled emission includes the surface area --> [ph s-1 AA-1]
+            sampled = self._sampled_emission()
+            phs = sampled["cum_emission"][-1] * u.Unit("ph s-1")
 
             obj.hdu.data += phs.value
 
         elif isinstance(obj, FieldOfViewBase) and not self.is_empty:
-            # ..todo:: Super hacky, FIX THIS!!
-            emission = self.get_emission(use_area=True)  # --> PHOTLAM * area
-            if emission is not None:
-                wave_val = emission.waveset.value
-                wave_unit = emission.waveset.unit   # angstrom
-                wave_min = quantify(obj.meta["wave_min"], u.um).to(wave_unit)
-                wave_max = quantify(obj.meta["wave_max"], u.um).to(wave_unit)
-                mask = (wave_val > wave_min.value) * (wave_val < wave_max.value)
-
-                wave = ([wave_min.value] + list(wave_val[mask]) +
-                        [wave_max.value]) * wave_unit
-                flux = emission(wave)    # PHOTLAM --> ph s-1 cm-2 AA-1 * cm2
-                phs = (np.trapz(flux, wave) * u.cm**2).to(u.Unit("ph s-1"))
+            wave_range = _fov_wave_range(obj)
+            if wave_range in self._fov_emission:
+                phs = self._fov_emission[wave_range]
             else:
-                phs = 0 * (u.ph / u.s)
-
-            obj.hdu.data += phs.value
+                phs = self.emission_in_range(*wave_range).value
+            obj.hdu.data += phs
 
         return obj
 
+    def _spectra_to_library(self, spectra, sampling):
+        """
+        Samples a list of spectra onto one grid, so that they can be scaled
+        by the throughput in a single array operation
+
+        Parameters
+        ----------
+        spectra : list of synphot.SourceSpectrum
+        sampling : str, int
+            "union" : union of the wavesets of all spectra inside
+            [wave_min, wave_max]. Keeps all features of all spectra, unless
+            the library would be larger than ``max_library_size``
+            int : number of geometrically spaced points in
+            [wave_min, wave_max], i.e. a constant spectral resolution
+
+        Returns
+        -------
+        library : SpectralLibrary
+
+        """
+        wave_min = quantify(self.meta["wave_min"], u.um).to(u.AA).value
+        wave_max = quantify(self.meta["wave_max"], u.um).to(u.AA).value
+        if sampling == "union":
+            wavesets = [spec.waveset.to(u.AA).value for spec in spectra
+                        if spec.waveset is not None]
+            wave = np.unique(np.concatenate(wavesets + [[wave_min, wave_max]]))
+            wave = wave[(wave >= wave_min) * (wave <= wave_max)]
+
+            # a dense (n_spectra, n_waves) array of many finely sampled
+            # spectra can easily exceed the memory
+            max_size = int(self.meta["max_library_size"])
+            if len(wave) * len(spectra) > max_size:
+                n_waves = max(max_size // len(spectra), 2)
+                warnings.warn("Union of {} spectra has {} wavelength points, "
+                              "which exceeds max_library_size ({}). Using {} "
+                              "geometrically spaced points instead"
+                              "".format(len(spectra), len(wave), max_size,
+                                        n_waves))
+                sampling = n_waves
+
+        if sampling != "union":
+            wave = np.geomspace(wave_min, wave_max, int(sampling))
+
+        return SpectralLibrary.from_spectra(spectra, wave)
+
+    def emission_in_range(self, wave_min, wave_max):
+        """
+        Returns the photons emitted by all surfaces in a wavelength range
+
+        Uses the cumulative integral of the sampled emission curve, so that
+        each call is only a lookup. Arrays of ranges are integrated at once
+
+        Parameters
+        ----------
+        wave_min, wave_max : float, array-like, u.Quantity
+            [um]
+
+        Returns
+        -------
+        phs : u.Quantity
+            [ph s-1] Same shape as ``wave_min``
+
+        """
+        sampled = self._sampled_emission()
+        wave_min = quantify(wave_min, u.um).to(u.AA).value
+        wave_max = quantify(wave_max, u.um).to(u.AA).value
+        phs = _integrate_sampled(sampled["emission_wave"], sampled["emission"],
+                                 sampled["cum_emission"], wave_min, wave_max)
+
+        return phs * u.Unit("ph s-1")
+
+    def prepare_fovs(self, fovs=None):
+        """
+        Integrates the emission over the wavelength ranges of all FOVs at once
+
+        ``OpticalTrain.observe`` calls this once per observation, so that
+        ``apply_to`` only needs a dictionary lookup for each of the (possibly
+        thousands of) spectroscopic FOVs. The table is not updated if the
+        surfaces change, so it should be dropped after the observation by
+        calling this method without ``fovs``
+
+        Parameters
+        ----------
+        fovs : list of FieldOfView, optional
+            None drops the table
+
+        """
+        self._fov_emission = {}
+        if fovs is None or len(fovs) == 0 or self.is_empty:
+            return
+
+        wave_ranges = [_fov_wave_range(fov) for fov in fovs]
+        wave_min, wave_max = np.array(wave_ranges).T
+        phs = self.emission_in_range(wave_min, wave_max).value
+        self._fov_emission = dict(zip(wave_ranges, phs))
+
     def fov_grid(self, which="waveset", **kwargs):
         if which == "waveset":
             self.meta.update(kwargs)
@@ -161,13 +286,124 @@ class SurfaceList(Effect):
     def get_throughput(self, **kwargs):
         return self.radiometry_table.get_throughput(**kwargs)
 
-    def collapse(self, waveset):
-        throughput = self.radiometry_table.throughput(waveset)
-        self._throughput = SpectralElement(Empirical1D, points=waveset,
-                                           lookup_table=throughput)
-        emission = self.radiometry_table.emission(waveset)
-        self._emission = SourceSpectrum(Empirical1D, points=waveset,
-                                        lookup_table=emission)
+    def collapse(self, waveset=None):
+        """
+        Samples the combined throughput and emission curves onto arrays
+
+        The sampled curves are kept until the surfaces, their meta data (e.g.
+        temperatures), the etendue or the wavelength range change. The
+        emission includes the surface area (``use_area=True``), and is stored
+        together with its cumulative integral, so that the emission in any
+        wavelength range is a lookup.
+
+        Parameters
+        ----------
+        waveset : array-like, u.Quantity, optional
+            [um] Extra wavelengths to sample the throughput at. By default the
+            throughput is sampled at 1001 points between ``wave_min`` and
+            ``wave_max``, plus the points of its own waveset. The emission is
+            sampled in the same way
+
+        Returns
+        -------
+        sampled : dict
+            "wave", "throughput" : [Angstrom], [0..1]
+            "emission_wave", "emission", "cum_emission" : [Angstrom],
+            [ph s-1 AA-1], [ph s-1]
+
+        """
+        sampled = dict(self._sampled_throughput(waveset))
+        sampled.update(self._sampled_emission())
+
+        return sampled
+
+    def sampled_throughput(self):
+        """
+        Returns the combined throughput of all surfaces as arrays
+
+        Returns
+        -------
+        wave, throughput : np.ndarray
+            [Angstrom], [0..1]
+
+        """
+        sampled = self._sampled_throughput()
+        return sampled["wave"], sampled["throughput"]
+
+    def _sampled_throughput(self, waveset=None):
+        if waveset is not None:
+            waveset = quantify(waveset, u.um).to(u.AA).value
+        key = self._state_key("throughput", waveset)
+        if self._sampled.get("throughput", {}).get("key") == key:
+            return self._sampled["throughput"]
+
+        wave = self._default_waveset()
+        if waveset is not None:
+            wave = np.union1d(wave, waveset)
+
+        throughput = self.get_throughput()
+        thru = np.ones(len(wave))
+        if throughput is not None:
+            if throughput.waveset is not None:
+                wave = np.union1d(wave, throughput.waveset.to(u.AA).value)
+            thru = throughput(wave * u.AA).value
+
+        self._sampled["throughput"] = {"key": key, "wave": wave,
+                                       "throughput": thru}
+
+        return self._sampled["throughput"]
+
+    def _sampled_emission(self):
+        etendue = quantify(rc.__currsys__["!TEL.etendue"], "m2 arcsec2")
+        key = self._state_key("emission", etendue.value)
+        if self._sampled.get("emission", {}).get("key") == key:
+            return self._sampled["emission"]
+
+        # PHOTLAM * area --> ph s-1 AA-1
+        emission = self.get_emission(use_area=True)
+        wave = self._default_waveset()
+        if emission is not None and emission.waveset is not None:
+            wave = np.union1d(wave, emission.waveset.to(u.AA).value)
+        flux = np.zeros(len(wave))
+        if emission is not None:
+            flux = emission(wave * u.AA).value
+        cum_flux = np.zeros(len(wave))
+        cum_flux[1:] = np.cumsum(0.5 * (flux[1:] + flux[:-1]) * np.diff(wave))
+
+        self._sampled["emission"] = {"key": key, "emission_wave": wave,
+                                     "emission": flux,
+                                     "cum_emission": cum_flux}
+
+        return self._sampled["emission"]
+
+    def _default_waveset(self):
+        # [Angstrom]
+        wave_min = quantify(utils.from_currsys(self.meta["wave_min"]), u.um)
+        wave_max = quantify(utils.from_currsys(self.meta["wave_max"]), u.um)
+        return np.linspace(wave_min.to(u.AA).value, wave_max.to(u.AA).value,
+                           1001)
+
+    def _state_key(self, *extras):
+        # everything the combined curves depend on. Bang-strings in the
+        # surface meta dicts (e.g. temperatures) are looked up on each call
+        items = [utils.from_currsys(self.meta["wave_min"]),
+                 utils.from_currsys(self.meta["wave_max"])]
+        items += list(extras)
+
+        tbl = self.radiometry_table.table
+        if tbl is not None:
+            items += [np.asarray(tbl[col]) for col in tbl.colnames]
+            for name, surf in self.radiometry_table.surfaces.items():
+                items += [name, id(surf), id(getattr(surf, "table", None))]
+                meta = getattr(surf, "meta", {})
+                for meta_key in sorted(meta, key=str):
+                    value = meta[meta_key]
+                    if isinstance(value, str) and value.startswith("!") \
+                            and value in rc.__currsys__:
+                        value = rc.__currsys__[value]
+                    items += [meta_key, value]
+
+        return utils.content_hash(*items)
 
     @property
     def throughput(self):
@@ -194,3 +430,34 @@ class SurfaceList(Effect):
     @property
     def is_empty(self):
         return len(self.radiometry_table.table) == 0
+
+
+def _integrate_sampled(wave, flux, cum_flux, wave_min, wave_max):
+    """
+    Integrates a linearly sampled curve between pairs of wavelengths
+
+    Same result as ``np.trapz`` over ``[wave_min] + wave[inside] + [wave_max]``
+    with the edge values interpolated from the samples. ``wave_min`` and
+    ``wave_max`` can be floats or arrays of equal length
+    """
+    wave_min, wave_max = np.asarray(wave_min), np.asarray(wave_max)
+    flux_min = np.interp(wave_min, wave, flux)
+    flux_max = np.interp(wave_max, wave, flux)
+    i0 = np.searchsorted(wave, wave_min, side="right")
+    i1 = np.searchsorted(wave, wave_max, side="left")
+
+    # indexes are clipped for ranges without samples inside, see np.where
+    j0 = np.minimum(i0, len(wave) - 1)
+    j1 = np.maximum(i1 - 1, 0)
+    integral = cum_flux[j1] - cum_flux[j0]
+    integral += 0.5 * (flux_min + flux[j0]) * (wave[j0] - wave_min)
+    integral += 0.5 * (flux[j1] + flux_max) * (wave_max - wave[j1])
+
+    no_samples = 0.5 * (flux_min + flux_max) * (wave_max - wave_min)
+
+    return np.where(i1 > i0, integral, no_samples)
+
+
+def _fov_wave_range(fov):
+    return (quantify(fov.meta["wave_min"], u.um).value,
+            quantify(fov.meta["wave_max"], u.um).value)
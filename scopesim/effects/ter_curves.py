@@ -1,7 +1,6 @@
 import numpy as np
 from astropy import units as u
 from astropy.table import Table
-from os import path as pth
 
 from synphot import SourceSpectrum
 
@@ -9,6 +8,7 @@ from .effects import Effect
 from ..optics.surface import SpectralSurface
 from ..utils import from_currsys, quantify, check_keys
 from .ter_curves_utils import download_svo_filter
+from .skycalc_cache import get_skycalc_cache
 
 
 class TERCurve(Effect):
@@ -107,6 +107,14 @@ class SkycalcTERCurve(AtmosphericTERCurve):
         .. note:: Compared to skycalc_ipy, wmin and wmax must be given in units
             of ``um``
 
+        Responses are kept in the ``skycalc`` folder of
+        ``!SIM.file.cache_path``, so each set of parameters is only sent to the
+        server once. See ``skycalc_cache.SkycalcCache``
+
+        offline : bool, optional
+            Default ``!SIM.file.offline``. If True, raise an error instead of
+            querying the server when the parameters are not in the cache
+
         Examples
         --------
         ::
@@ -126,6 +134,7 @@ class SkycalcTERCurve(AtmosphericTERCurve):
 
         super(SkycalcTERCurve, self).__init__(**kwargs)
         self.meta["z_order"] = [112]
+        self.meta["offline"] = "!SIM.file.offline"
         self.meta.update(kwargs)
 
         self.skycalc_conn = skycalc_ipy.SkyCalc()
@@ -148,10 +157,9 @@ class SkycalcTERCurve(AtmosphericTERCurve):
         conn_kwargs = from_currsys(conn_kwargs)
         self.skycalc_conn.values.update(conn_kwargs)
 
-        local_path = from_currsys("!SIM.file.local_packages_path")
-        filename = pth.join(local_path, "skycalc_temp.fits")
-        tbl = self.skycalc_conn.get_sky_spectrum(return_type="table",
-                                                 filename=filename)
+        offline = from_currsys(self.meta["offline"])
+        tbl = get_skycalc_cache().get(self.skycalc_conn.values,
+                                      offline=offline)
         for i, colname in enumerate(["wavelength", "transmission", "emission"]):
             tbl.columns[i].name = colname
         tbl.meta["wavelength_unit"] = tbl.columns[0].unit
@@ -1,13 +1,12 @@
 from astropy import units as u
 from astropy.table import Table
 from astropy.utils.data import download_file
-from astropy.io import ascii as ioascii
 from synphot import SpectralElement, Empirical1D, Observation
 from synphot.units import PHOTLAM
 
 from ..source.source_templates import vega_spectrum, st_spectrum, \
     ab_spectrum
-from ..utils import find_file, quantity_from_table
+from .filter_store import get_filter_store
 
 FILTER_DEFAULTS = {"U": "Generic/Bessell.U",
                    "B": "Generic/Bessell.B",
@@ -86,25 +85,25 @@ def download_svo_filter(filter_name, return_style="synphot"):
 
 
 def get_filter(filter_name):
-    # first check locally
-    # check generics
-    # check spanish_vo
-    path = find_file(filter_name, silent=True)
-
-    if path is not None:
-        tbl = ioascii.read(path)
-        wave = quantity_from_table("wavelength", tbl, u.um).to(u.um)
-        filt = SpectralElement(Empirical1D, points=wave,
-                               lookup_table=tbl["transmission"])
-    elif filter_name in FILTER_DEFAULTS:
-        filt = download_svo_filter(FILTER_DEFAULTS[filter_name])
-    else:
-        try:
-            filt = download_svo_filter(filter_name)
-        except:
-            filt = None
+    """
+    Returns a filter curve from the local filter store
 
-    return filt
+    Filters are looked up in ``rc.__search_path__``, then in the store
+    directory, and are only downloaded from the Spanish-VO filter service if
+    they haven't been seen before. See ``filter_store.FilterStore``
+
+    Parameters
+    ----------
+    filter_name : str
+        A filename, a generic name from ``FILTER_DEFAULTS``, or a Spanish-VO
+        filter name, e.g. ``Paranal/HAWKI.Ks``
+
+    Returns
+    -------
+    filt : synphot.SpectralElement, None
+
+    """
+    return get_filter_store().get(filter_name)
 
 
 def get_zero_mag_spectrum(system_name="AB"):
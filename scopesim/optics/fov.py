@@ -42,6 +42,11 @@ class FieldOfView(FieldOfViewBase):
                                     "rotation": 0,
                                     "radius_of_curvature": None},
                      "conserve_image": True,
+                     "faint_source_culling":
+                         "!SIM.computing.faint_source_culling",
+                     "faint_source_binning":
+                         "!SIM.computing.faint_source_binning",
+                     "minimum_pixel_flux": "!SIM.spectral.minimum_pixel_flux",
                      }
         self.meta.update(kwargs)
 
@@ -88,14 +93,41 @@ class FieldOfView(FieldOfViewBase):
 
         # combine all Table fields
         if sum(tbl_fields_mask * fields_mask) > 0:
-            combined_table = fov_utils.combine_table_fields(self.hdu.header,
-                                                            src, fields_indexes)
+            # positions are shared by all FOVs with the same sky footprint,
+            # only the fluxes and the image-plane WCS differ between them
+            combined_table = src._table_positions(self.hdu.header,
+                                                  fields_indexes)
             tbl = fov_utils.make_flux_table(combined_table, src,
                                             wave_min, wave_max, area)
-            xd, yd = fov_utils.sky2fp(self.hdu.header, tbl["x"], tbl["y"])
+            xd, yd = imp_utils.pix2val(self.hdu.header,
+                                       np.asarray(combined_table["x_pix"]),
+                                       np.asarray(combined_table["y_pix"]),
+                                       "D")
             tbl.add_columns([Column(name="x_mm", data=xd, unit=u.mm),
                              Column(name="y_mm", data=yd, unit=u.mm)])
+
+            # sources below the noise floor are dropped or binned into an image
+            bg_hdu = None
+            culling = utils.from_currsys(self.meta["faint_source_culling"])
+            if culling:
+                mode = "background" if culling is True else culling
+                min_flux = utils.from_currsys(self.meta["minimum_pixel_flux"])
+                binning = utils.from_currsys(self.meta["faint_source_binning"])
+                tbl, bg_hdu, n_culled, flux_culled = \
+                    fov_utils.cull_faint_sources(
+                        tbl, combined_table["x_pix"], combined_table["y_pix"],
+                        self.hdu.header, float(min_flux), mode=mode,
+                        binning=binning)
+                # running totals, as a StreamingSource is extracted in chunks
+                culled = self.meta.get("culled_sources",
+                                       {"number": 0, "flux": 0.})
+                self.meta["culled_sources"] = {
+                    "number": culled["number"] + n_culled,
+                    "flux": culled["flux"] + flux_culled}
+
             self.fields += [tbl]
+            if bg_hdu is not None:
+                self.fields += [bg_hdu]
 
         # combine all ImageHDU fields
         if sum(img_fields_mask * fields_mask) > 0:
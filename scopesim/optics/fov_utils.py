@@ -38,12 +38,12 @@ def is_field_in_fov(fov_header, table_or_imagehdu, wcs_suffix=""):
 
 def make_flux_table(source_tbl, src, wave_min, wave_max, area):
     fluxes = np.zeros(len(src.spectra))
-    ref_set = list(set(source_tbl["ref"]))
+    ref = np.asarray(source_tbl["ref"])
+    ref_set = np.unique(ref)
     flux_set = src.photons_in_range(wave_min, wave_max, area, ref_set)
-    fluxes[ref_set] = flux_set
+    fluxes[ref_set] = flux_set.value
 
-    ref = source_tbl["ref"]
-    weight = source_tbl["weight"]
+    weight = np.asarray(source_tbl["weight"])
     flux_col = Column(name="flux", data=fluxes[ref] * weight)
     x_col = source_tbl["x"]
     y_col = source_tbl["y"]
@@ -54,6 +54,82 @@ def make_flux_table(source_tbl, src, wave_min, wave_max, area):
     return tbl
 
 
+def cull_faint_sources(tbl, xpix, ypix, fov_header, min_flux,
+                       mode="background", binning=8):
+    """
+    Removes sources which are fainter than a flux threshold from a flux table
+
+    Deep catalogues contain many sources which contribute far less than the
+    noise floor to a single FOV. Rendering each of them individually is
+    expensive, so they can either be dropped, or added together as a smooth
+    low-resolution image, which conserves the total flux in the FOV.
+
+    Parameters
+    ----------
+    tbl : Table
+        Must contain a "flux" column [ph s-1], e.g. from ``make_flux_table``
+    xpix, ypix : array-like
+        Pixel positions of the table rows on the FOV pixel grid
+    fov_header : fits.Header
+        Header from the FieldOfView
+    min_flux : float
+        [ph s-1] Sources with less flux than this are culled. Usually
+        ``!SIM.spectral.minimum_pixel_flux``
+    mode : str, optional
+        "background" : faint sources are binned into an image. Default
+        "drop" : faint sources are discarded
+    binning : int, optional
+        [pixel] Side length of the background bins. Default is 8
+
+    Returns
+    -------
+    bright_tbl : Table
+        The rows of ``tbl`` which were not culled
+    background_hdu : fits.ImageHDU, None
+        The binned faint sources on the FOV pixel grid. None for mode="drop"
+        or if no sources were culled
+    n_culled : int
+        Number of culled sources
+    flux_culled : float
+        [ph s-1] Total flux of the culled sources
+
+    """
+    if mode not in ["background", "drop"]:
+        raise ValueError("mode must be 'background' or 'drop': {}"
+                         "".format(mode))
+
+    flux = np.asarray(tbl["flux"], dtype=float)
+    faint = flux < min_flux
+    n_culled = int(np.sum(faint))
+    flux_culled = float(np.sum(flux[faint]))
+    if n_culled == 0:
+        return tbl, None, 0, 0.
+
+    background_hdu = None
+    if mode == "background":
+        binning = max(int(binning), 1)
+        nx, ny = fov_header["NAXIS1"], fov_header["NAXIS2"]
+        xx = np.floor(np.asarray(xpix)[faint]).astype(int)
+        yy = np.floor(np.asarray(ypix)[faint]).astype(int)
+        mask = (xx >= 0) * (xx < nx) * (yy >= 0) * (yy < ny)
+
+        nbx, nby = -(-nx // binning), -(-ny // binning)
+        bins = np.zeros((nby, nbx))
+        np.add.at(bins, (yy[mask] // binning, xx[mask] // binning),
+                  flux[faint][mask])
+
+        # spread the flux of each bin evenly over its pixels. The bins at the
+        # edges can have fewer than binning**2 pixels
+        widths_x = np.diff(np.minimum(np.arange(nbx + 1) * binning, nx))
+        widths_y = np.diff(np.minimum(np.arange(nby + 1) * binning, ny))
+        bins /= np.outer(widths_y, widths_x)
+        image = np.repeat(np.repeat(bins, binning, axis=0), binning, axis=1)
+        background_hdu = fits.ImageHDU(header=fov_header,
+                                       data=image[:ny, :nx])
+
+    return tbl[~faint], background_hdu, n_culled, flux_culled
+
+
 def combine_table_fields(fov_header, src, field_indexes):
     """
     Combines a list of Table objects into a single one bounded by the Header WCS
@@ -72,30 +148,30 @@ def combine_table_fields(fov_header, src, field_indexes):
     """
 
     fov_xsky, fov_ysky = imp_utils.calc_footprint(fov_header)
+    xmin, xmax = min(fov_xsky), max(fov_xsky)
+    ymin, ymax = min(fov_ysky), max(fov_ysky)
 
     x, y, ref, weight = [], [], [], []
 
     for ii in field_indexes:
         field = src.fields[ii]
         if isinstance(field, Table):
-            xcol = utils.quantity_from_table("x", field, u.arcsec)
-            ycol = utils.quantity_from_table("y", field, u.arcsec)
-            x += list(xcol.to(u.deg).value)
-            y += list(ycol.to(u.deg).value)
-            ref += list(field["ref"])
-            weight += list(field["weight"])
-
-    x = np.array(x)
-    y = np.array(y)
-    mask = np.array(x < max(fov_xsky)) * np.array(x > min(fov_xsky)) * \
-           np.array(y < max(fov_ysky)) * np.array(y > min(fov_ysky))
-
-    x = x[mask]
-    y = y[mask]
-    ref = np.array(ref)[mask]
-    weight = np.array(weight)[mask]
-
-    tbl = Table(names=["x", "y", "ref", "weight"], data=[x, y, ref, weight])
+            xcol = utils.array_from_table("x", field, u.deg, u.arcsec)
+            ycol = utils.array_from_table("y", field, u.deg, u.arcsec)
+            mask = (xcol < xmax) * (xcol > xmin) * (ycol < ymax) * (ycol > ymin)
+            x += [xcol[mask]]
+            y += [ycol[mask]]
+            ref += [np.asarray(field["ref"])[mask]]
+            weight += [np.asarray(field["weight"])[mask]]
+
+    x = np.concatenate(x) if len(x) > 0 else np.zeros(0)
+    y = np.concatenate(y) if len(y) > 0 else np.zeros(0)
+    ref = np.concatenate(ref) if len(ref) > 0 else np.zeros(0, dtype=np.int32)
+    weight = np.concatenate(weight) if len(weight) > 0 else \
+        np.zeros(0, dtype=np.float32)
+
+    tbl = Table(names=["x", "y", "ref", "weight"], data=[x, y, ref, weight],
+                copy=False)
     tbl["x"].unit = u.deg
     tbl["y"].unit = u.deg
 
@@ -136,19 +212,179 @@ def combine_imagehdu_fields(fov_header, src, fields_indexes, wave_min, wave_max,
     order = int(rc.__config__["!SIM.computing.spline_order"])
 
     for ii in fields_indexes:
-        if isinstance(src.fields[ii], fits.ImageHDU):
-            ref = src.fields[ii].header["SPEC_REF"]
-            flux = src.photons_in_range(wave_min, wave_max, area, indexes=[ref])
+        field = src.fields[ii]
+        if is_cube(field):
+            # the slab is already integrated over the FOV wavelength range
+            slab = extract_cube_slab(field, fov_header, wave_min, wave_max,
+                                     area, wcs_suffix=wcs_suffix,
+                                     throughput=src.cube_throughput)
+            if slab is None:
+                continue
             image = np.zeros((fov_header["NAXIS2"], fov_header["NAXIS1"]))
             temp_hdu = fits.ImageHDU(header=fov_header, data=image)
-            temp_hdu = imp_utils.add_imagehdu_to_imagehdu(src.fields[ii],
-                                                          temp_hdu, order=order,
+            temp_hdu = imp_utils.add_imagehdu_to_imagehdu(slab, temp_hdu,
+                                                          order=order,
                                                           wcs_suffix=wcs_suffix)
-            canvas_hdu.data += temp_hdu.data * flux[0].value
+            canvas_hdu.data += temp_hdu.data
+
+        elif isinstance(field, fits.ImageHDU):
+            # the resampled image is shared by all FOVs with the same
+            # footprint, so only the spectral flux factor is computed per FOV
+            ref = field.header["SPEC_REF"]
+            flux = src.photons_in_range(wave_min, wave_max, area,
+                                        indexes=[ref])[0].value
+            image = src._field_on_canvas(field, fov_header, order,
+                                         wcs_suffix=wcs_suffix)
+            canvas_hdu.data += image * flux
 
     return canvas_hdu
 
 
+###############################################################################
+# Spectral cubes
+
+
+def is_cube(field):
+    """Returns True if a Source field is a 3D (x, y, wavelength) ImageHDU"""
+    return isinstance(field, fits.ImageHDU) and field.header["NAXIS"] == 3
+
+
+def cube_wave_edges(header):
+    """
+    Returns the wavelength borders of the slices of a cube
+
+    The spectral axis is described by the linear WCS keywords ``CRVAL3``,
+    ``CDELT3``, ``CRPIX3`` (default 1) and ``CUNIT3`` (default um)
+
+    Parameters
+    ----------
+    header : fits.Header
+
+    Returns
+    -------
+    edges : np.ndarray
+        [um] NAXIS3 + 1 borders of the wavelength bins
+
+    """
+    unit = u.Unit(header.get("CUNIT3", "um"))
+    crpix = header.get("CRPIX3", 1)
+    pix = np.arange(header["NAXIS3"] + 1) + 0.5 - crpix
+    edges = header["CRVAL3"] + pix * header["CDELT3"]
+
+    return (edges * unit).to(u.um).value
+
+
+def extract_cube_slab(cube, fov_header, wave_min, wave_max, area=None,
+                      wcs_suffix="", throughput=None):
+    """
+    Integrates the part of a cube inside a FOV over a wavelength range
+
+    Only the slab ``cube.data[k0:k1, y0:y1, x0:x1]`` covering the FOV
+    footprint and the wavelength range is read. If the cube data is a memory
+    map (e.g. from ``Source(cube="cube.fits")``), nothing else is loaded from
+    disk. Slices which only partly overlap the wavelength range are weighted
+    by the overlap, and by the mean ``throughput`` over the overlap.
+
+    Parameters
+    ----------
+    cube : fits.ImageHDU
+        3D cube with BUNIT in photon flux density per pixel, e.g.
+        "ph s-1 m-2 um-1" (default)
+    fov_header : fits.Header
+    wave_min, wave_max : float, u.Quantity
+        [um]
+    area : float, u.Quantity, optional
+        [m2]
+    wcs_suffix : str, optional
+    throughput : tuple of np.ndarray, optional
+        ([Angstrom], [-]) The throughput of the optical system, as recorded by
+        ``SurfaceList`` in ``Source.cube_throughput``. Default is None, i.e. a
+        throughput of 1
+
+    Returns
+    -------
+    slab_hdu : fits.ImageHDU, None
+        [ph s-1 (m-2)] per pixel. None if the cube does not overlap the FOV
+
+    """
+    wave_min = utils.quantify(wave_min, u.um).value
+    wave_max = utils.quantify(wave_max, u.um).value
+    edges = cube_wave_edges(cube.header)
+    overlap = np.minimum(edges[1:], wave_max) - np.maximum(edges[:-1], wave_min)
+    kk = np.where(overlap > 0)[0]
+    if len(kk) == 0:
+        return None
+    k0, k1 = kk[0], kk[-1] + 1
+
+    hdr = cube.header
+    xsky, ysky = imp_utils.calc_footprint(fov_header, wcs_suffix)
+    xpix, ypix = imp_utils.val2pix(hdr, xsky, ysky, wcs_suffix)
+    x0 = max(int(np.floor(np.min(xpix))) - 1, 0)
+    x1 = min(int(np.ceil(np.max(xpix))) + 1, hdr["NAXIS1"])
+    y0 = max(int(np.floor(np.min(ypix))) - 1, 0)
+    y1 = min(int(np.ceil(np.max(ypix))) + 1, hdr["NAXIS2"])
+    if x0 >= x1 or y0 >= y1:
+        return None
+
+    bunit = u.Unit(hdr.get("BUNIT", "ph s-1 m-2 um-1"))
+    try:
+        factor = bunit.to(u.Unit("ph s-1 m-2 um-1"))
+    except u.UnitConversionError:
+        raise ValueError("Cube BUNIT must be a photon flux density, e.g. "
+                         "'ph s-1 m-2 um-1': {}".format(bunit))
+    if area is not None:
+        factor *= utils.quantify(area, u.m ** 2).value
+
+    weights = overlap[k0:k1]
+    if throughput is not None:
+        wave_lo = np.maximum(edges[k0:k1], wave_min)
+        wave_hi = np.minimum(edges[k0 + 1:k1 + 1], wave_max)
+        thru_wave = utils.quantify(throughput[0], u.AA).to(u.um).value
+        weights = weights * mean_in_bins(thru_wave, np.asarray(throughput[1]),
+                                         wave_lo, wave_hi)
+
+    slab = cube.data[k0:k1, y0:y1, x0:x1]
+    image = np.tensordot(weights * factor, slab, axes=1)
+
+    slab_hdu = fits.ImageHDU(data=image)
+    s = wcs_suffix
+    for key in ["CTYPE1", "CTYPE2", "CUNIT1", "CUNIT2", "CDELT1", "CDELT2",
+                "CRVAL1", "CRVAL2", "CRPIX1", "CRPIX2",
+                "PC1_1", "PC1_2", "PC2_1", "PC2_2"]:
+        if key + s in hdr:
+            slab_hdu.header[key + s] = hdr[key + s]
+    slab_hdu.header["CRPIX1" + s] -= x0
+    slab_hdu.header["CRPIX2" + s] -= y0
+
+    return slab_hdu
+
+
+def mean_in_bins(x, y, bin_min, bin_max):
+    """
+    Returns the mean of a linearly interpolated curve inside each bin
+
+    Parameters
+    ----------
+    x, y : np.ndarray
+        The curve. ``x`` must be increasing. ``y`` is constant beyond the ends
+        of ``x``
+    bin_min, bin_max : np.ndarray
+        Borders of the bins, with ``bin_max > bin_min``
+
+    Returns
+    -------
+    mean : np.ndarray
+
+    """
+    grid = np.union1d(x, np.concatenate([bin_min, bin_max]))
+    vals = np.interp(grid, x, y)
+    cum = np.concatenate([[0.], np.cumsum(0.5 * (vals[1:] + vals[:-1]) *
+                                          np.diff(grid))])
+    integral = np.interp(bin_max, grid, cum) - np.interp(bin_min, grid, cum)
+
+    return integral / (bin_max - bin_min)
+
+
 def sky2fp(header, xsky, ysky):
     """
     Convert sky coordinates to image plane coordinated
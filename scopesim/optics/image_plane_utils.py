@@ -126,10 +126,8 @@ def _make_bounding_header_for_tables(tables, pixel_scale=1*u.arcsec):
 
     pixel_scale = pixel_scale.to(unit_new).value
     for table in tables:
-        x_col = utils.quantity_from_table(x_name, table, unit_orig).to(unit_new)
-        y_col = utils.quantity_from_table(y_name, table, unit_orig).to(unit_new)
-        x_col = list(x_col.value)
-        y_col = list(y_col.value)
+        x_col = utils.array_from_table(x_name, table, unit_new, unit_orig)
+        y_col = utils.array_from_table(y_name, table, unit_new, unit_orig)
         x += [np.min(x_col), np.max(x_col) + 2 * pixel_scale]
         y += [np.min(y_col), np.max(y_col) + 2 * pixel_scale]
 
@@ -242,16 +240,15 @@ def add_table_to_imagehdu(table, canvas_hdu, sub_pixel=True, wcs_suffix=""):
         raise ValueError("canvas_hdu must include an appropriate WCS: {}"
                          "".format(s))
 
-    f = utils.quantity_from_table("flux", table, default_unit=u.Unit("ph s-1"))
+    f = np.asarray(table["flux"], dtype=float)
     if s == "D":
-        x = utils.quantity_from_table("x_mm", table, default_unit=u.mm).to(u.mm)
-        y = utils.quantity_from_table("y_mm", table, default_unit=u.mm).to(u.mm)
+        x = utils.array_from_table("x_mm", table, u.mm, default_unit=u.mm)
+        y = utils.array_from_table("y_mm", table, u.mm, default_unit=u.mm)
     else:
-        arcsec = u.arcsec
-        x = utils.quantity_from_table("x", table, default_unit=arcsec).to(u.deg)
-        y = utils.quantity_from_table("y", table, default_unit=arcsec).to(u.deg)
+        x = utils.array_from_table("x", table, u.deg, default_unit=u.arcsec)
+        y = utils.array_from_table("y", table, u.deg, default_unit=u.arcsec)
 
-    xpix, ypix = val2pix(canvas_hdu.header, x.value, y.value, s)
+    xpix, ypix = val2pix(canvas_hdu.header, x, y, s)
 
     # Weird FITS / astropy behaviour. Axis1 == y, Axis2 == x.
     naxis1 = canvas_hdu.header["NAXIS1"]
@@ -275,9 +272,7 @@ def _add_intpixel_sources_to_canvas(canvas_hdu, xpix, ypix, flux, mask):
                                    "".format(len(flux))
     xpix = xpix.astype(int)
     ypix = ypix.astype(int)
-    for ii in range(len(xpix)):
-        if mask[ii]:
-            canvas_hdu.data[ypix[ii], xpix[ii]] += flux[ii].value
+    np.add.at(canvas_hdu.data, (ypix[mask], xpix[mask]), flux[mask])
 
     return canvas_hdu
 
@@ -285,17 +280,83 @@ def _add_intpixel_sources_to_canvas(canvas_hdu, xpix, ypix, flux, mask):
 def _add_subpixel_sources_to_canvas(canvas_hdu, xpix, ypix, flux, mask):
     canvas_hdu.header["comment"] = "Adding {} sub-pixel files" \
                                    "".format(len(flux))
-    canvas_shape = canvas_hdu.data.shape
-    for ii in range(len(xpix)):
-        if mask[ii]:
-            xx, yy, fracs = sub_pixel_fractions(xpix[ii], ypix[ii])
-            for x, y, frac in zip(xx, yy, fracs):
-                if y < canvas_shape[0] and x < canvas_shape[1]:
-                    canvas_hdu.data[y, x] += frac * flux[ii].value
+    xx, yy, fracs = sub_pixel_weights(xpix[mask], ypix[mask])
+    fluxes = fracs * flux[mask][:, None]
+    ny, nx = canvas_hdu.data.shape
+    inside = (xx >= 0) * (xx < nx) * (yy >= 0) * (yy < ny)
+    np.add.at(canvas_hdu.data, (yy[inside], xx[inside]), fluxes[inside])
 
     return canvas_hdu
 
 
+def sub_pixel_weights(x, y):
+    """
+    Vectorised version of ``sub_pixel_fractions`` for arrays of positions
+
+    Parameters
+    ----------
+    x, y : array-like
+        Pixel coordinates of n points
+
+    Returns
+    -------
+    x_pix, y_pix, fracs : np.ndarray
+        (n, 4) arrays with the coordinates of the 4 pixels around each point
+        and the fraction of the flux (bilinear weight) going into each
+
+    """
+    x0, dx = np.divmod(np.asarray(x, dtype=float), 1)
+    y0, dy = np.divmod(np.asarray(y, dtype=float), 1)
+
+    xi0 = x0.astype(int)
+    xi1 = xi0 + (dx > 0)
+    yi0 = y0.astype(int)
+    yi1 = yi0 + (dy > 0)
+
+    x_pix = np.stack([xi0, xi1, xi0, xi1], axis=1)
+    y_pix = np.stack([yi0, yi0, yi1, yi1], axis=1)
+    fracs = np.stack([(1. - dx) * (1. - dy), dx * (1. - dy),
+                      (1. - dx) * dy, dx * dy], axis=1)
+
+    return x_pix, y_pix, fracs
+
+
+def points_to_image(x_pix, y_pix, flux, shape, sub_pixel=False):
+    """
+    Sums point sources onto a new pixel grid as a weighted 2D histogram
+
+    Parameters
+    ----------
+    x_pix, y_pix : array-like
+        Pixel coordinates of the points. Axis 1 is x, axis 0 is y
+    flux : array-like
+    shape : tuple of int
+        (ny, nx) of the output image
+    sub_pixel : bool, optional
+        If True, each point is split between the 4 nearest pixels
+
+    Returns
+    -------
+    image : np.ndarray
+
+    """
+    flux = np.asarray(flux, dtype=float)
+    if sub_pixel:
+        x_pix, y_pix, fracs = sub_pixel_weights(x_pix, y_pix)
+        flux = fracs * flux[:, None]
+    else:
+        x_pix = np.asarray(x_pix).astype(int)
+        y_pix = np.asarray(y_pix).astype(int)
+
+    ny, nx = shape
+    x_pix, y_pix, flux = x_pix.ravel(), y_pix.ravel(), flux.ravel()
+    inside = (x_pix >= 0) * (x_pix < nx) * (y_pix >= 0) * (y_pix < ny)
+    index = y_pix[inside] * nx + x_pix[inside]
+    image = np.bincount(index, weights=flux[inside], minlength=nx * ny)
+
+    return image.reshape((ny, nx))
+
+
 def sub_pixel_fractions(x, y):
     """
     Makes a list of pixel coordinates and weights to reflect sub-pixel shifts
@@ -578,9 +639,40 @@ def add_imagehdu_to_imagehdu(image_hdu, canvas_hdu, order=1, wcs_suffix="",
 
     # .. todo: Add a catch for projecting a large image onto a small canvas
 
+    pixel_scale = float(canvas_hdu.header["CDELT1"+wcs_suffix])
+    new_hdu = reproject_imagehdu(image_hdu, pixel_scale, order=order,
+                                 wcs_suffix=wcs_suffix,
+                                 conserve_flux=conserve_flux)
+    canvas_hdu = overlay_imagehdu(new_hdu, canvas_hdu, wcs_suffix=wcs_suffix)
+
+    return canvas_hdu
+
+
+def reproject_imagehdu(image_hdu, pixel_scale, order=1, wcs_suffix="",
+                       conserve_flux=True):
+    """
+    Rescales and reorients an ImageHDU onto an unrotated grid of pixel_scale
+
+    This is the expensive, canvas-independent part of
+    ``add_imagehdu_to_imagehdu``. As the operations are linear, the result
+    can be scaled and reused for any canvas with the same pixel scale.
+
+    Parameters
+    ----------
+    image_hdu : fits.ImageHDU
+    pixel_scale : float
+        [deg] NOT to be passed as a Quantity
+    order : int, optional
+    wcs_suffix : str, optional
+    conserve_flux : bool, optional
+
+    Returns
+    -------
+    new_hdu : fits.ImageHDU
+
+    """
     if isinstance(image_hdu.data, u.Quantity):
         image_hdu.data = image_hdu.data.value
-    pixel_scale = float(canvas_hdu.header["CDELT1"+wcs_suffix])
 
     new_hdu = rescale_imagehdu(image_hdu, pixel_scale=pixel_scale,
                                wcs_suffix=wcs_suffix, order=order,
@@ -589,15 +681,41 @@ def add_imagehdu_to_imagehdu(image_hdu, canvas_hdu, order=1, wcs_suffix="",
                                 wcs_suffix=wcs_suffix, order=order,
                                 conserve_flux=conserve_flux)
 
-    xcen_im = new_hdu.header["NAXIS1"] // 2
-    ycen_im = new_hdu.header["NAXIS2"] // 2
+    return new_hdu
+
+
+def overlay_imagehdu(image_hdu, canvas_hdu, wcs_suffix="", scale_factor=1):
+    """
+    Adds an ImageHDU with the same pixel scale as the canvas to the canvas
+
+    Parameters
+    ----------
+    image_hdu : fits.ImageHDU
+        Already on the pixel grid of the canvas, e.g. from
+        ``reproject_imagehdu``
+    canvas_hdu : fits.ImageHDU
+    wcs_suffix : str, optional
+    scale_factor : float, optional
+        Multiplies the image before it is added to the canvas
 
-    xsky0, ysky0 = pix2val(new_hdu.header, xcen_im, ycen_im, wcs_suffix)
+    Returns
+    -------
+    canvas_hdu : fits.ImageHDU
+
+    """
+    xcen_im = image_hdu.header["NAXIS1"] // 2
+    ycen_im = image_hdu.header["NAXIS2"] // 2
+
+    xsky0, ysky0 = pix2val(image_hdu.header, xcen_im, ycen_im, wcs_suffix)
     xpix0, ypix0 = val2pix(canvas_hdu.header, xsky0, ysky0, wcs_suffix)
 
+    image = image_hdu.data
+    if scale_factor != 1:
+        image = image * scale_factor
+
     # again, I need to add this transpose operation - WHY????
     # Image plane tests need the transpose operation, but FOV broadcast tests don't. Weird
-    canvas_hdu.data = overlay_image(new_hdu.data, canvas_hdu.data,
+    canvas_hdu.data = overlay_image(image, canvas_hdu.data,
                                     coords=(xpix0, ypix0))
 
     return canvas_hdu
@@ -723,6 +841,39 @@ def calc_footprint(header, wcs_suffix=""):
     return xsky, ysky
 
 
+def header_geometry_key(header, wcs_suffix=""):
+    """
+    Returns a hashable description of the spatial footprint of a header WCS
+
+    Two headers with the same key describe exactly the same pixel grid in the
+    coordinate system given by ``wcs_suffix``. The key can therefore be used
+    to cache results which only depend on the footprint of a header.
+
+    Parameters
+    ----------
+    header : fits.Header, PoorMansHeader
+    wcs_suffix : str
+        Letter suffix for the WCS keywords, e.g. "D" for image-plane coords
+
+    Returns
+    -------
+    key : tuple
+
+    """
+
+    if isinstance(header, fits.ImageHDU):
+        header = header.header
+
+    s = wcs_suffix
+    keys = ["NAXIS1", "NAXIS2"]
+    keys += [key + s for key in ["CRVAL1", "CRVAL2", "CRPIX1", "CRPIX2",
+                                 "CDELT1", "CDELT2", "PC1_1", "PC1_2",
+                                 "PC2_1", "PC2_2"]]
+    key = tuple([(key, header[key]) for key in keys if key in header])
+
+    return key
+
+
 def split_header(hdr, chunk_size, wcs_suffix=""):
     """
     Splits a header into many smaller parts of the chunk_size
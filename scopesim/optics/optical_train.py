@@ -1,12 +1,19 @@
-from copy import deepcopy
+from copy import copy, deepcopy
+
+import numpy as np
+from astropy import units as u
 
 from .. import rc
 from ..commands.user_commands import UserCommands
 from .optics_manager import OpticsManager
 from .fov_manager import FOVManager
 from .image_plane import ImagePlane
+from ..source.source import Source
+from ..source.streaming_source import StreamingSource
 from ..detector import DetectorArray
-from ..utils import from_currsys
+from ..effects import SurfaceList
+from ..source.source_utils import rebin_spectra
+from ..utils import from_currsys, quantify
 
 
 class OpticalTrain:
@@ -124,7 +131,8 @@ class OpticalTrain:
 
         Parameters
         ----------
-        orig_source : Source
+        orig_source : Source, StreamingSource
+            A ``StreamingSource`` is observed chunk by chunk
         update : bool
             Reload optical system
         kwargs : **dict
@@ -142,35 +150,153 @@ class OpticalTrain:
         - Apply FOV-independent (2D) effects - z_order = 400..499
         - [Apply detector plane (0D, 2D) effects - z_order = 500..599]
 
+        Sources without photons (e.g. ``empty_sky()``) skip the FOV stage in
+        imaging mode, as only the background emission reaches the image plane.
+        See ``!SIM.computing.background_fast_path``
+
         """
         if update:
             self.update(**kwargs)
 
         self.set_focus(kwargs)    # put focus back on current instrument package
 
-        source = deepcopy(orig_source)
+        if self._is_background_only(orig_source):
+            # the FOVs would only add zeros to the image planes. The background
+            # is added by the SurfaceList among the image plane effects
+            fovs, source = [], None
+        elif isinstance(orig_source, StreamingSource):
+            # chunks are added up in the FOVs before the FOV effects are applied
+            fovs = self.fov_manager.fovs
+            self._extract_chunks(orig_source, fovs)
+            source = None
+        else:
+            fovs = self.fov_manager.fovs
+            # preloaded FOVs would otherwise add to the culled_sources totals
+            # of the previous observation. See also ``_extract_chunks``
+            for fov in fovs:
+                fov.meta.pop("culled_sources", None)
+            source = self._apply_source_effects(deepcopy(orig_source), fovs)
+
+        # [3D - Atmospheric shifts, PSF, NCPAs, Grating shift/distortion]
+        fov_effects = self.optics_manager.fov_effects
+        surface_lists = [eff for eff in fov_effects
+                         if isinstance(eff, SurfaceList)]
+        try:
+            for surface_list in surface_lists:
+                # background emission for all FOV wavelength bins in one go
+                surface_list.prepare_fovs(fovs)
+
+            for fov_i, fov in enumerate(fovs):
+                # print("FOV", fov_i+1, "of", n_fovs, flush=True)
+                if source is not None:
+                    fov.extract_from(source)
+                    fov.view()
+
+                for effect in fov_effects:
+                    fov = effect.apply_to(fov)
+
+                self.image_planes[fov.image_plane_id].add(fov.hdu,
+                                                          wcs_suffix="D")
+                # ..todo: finish off the multiple image plane stuff
+        finally:
+            # don't keep the emission table of these FOVs after an error
+            for surface_list in surface_lists:
+                surface_list.prepare_fovs(None)
+
+        # [2D - Vibration, flat fielding, chopping+nodding]
+        for effect in self.optics_manager.image_plane_effects:
+            for ii in range(len(self.image_planes)):
+                self.image_planes[ii] = effect.apply_to(self.image_planes[ii])
+
+    def _is_background_only(self, source):
+        """
+        True if only the instrumental background needs to be simulated
+
+        This is the case for sources without photons (e.g. ``empty_sky()``) in
+        imaging mode, where the background is a constant added to the image
+        plane. In spectroscopy mode the background is dispersed per FOV, so
+        the FOVs are still needed
+        """
+        return from_currsys("!SIM.computing.background_fast_path") is True \
+            and not isinstance(source, StreamingSource) \
+            and getattr(source, "is_empty", False) is True \
+            and not self.optics_manager.is_spectroscope
+
+    def _apply_source_effects(self, source, fovs=()):
+        if from_currsys("!SIM.computing.rebin_spectra") and len(fovs) > 0:
+            self._rebin_spectra(source, fovs)
 
         # [1D - transmission curves]
         for effect in self.optics_manager.source_effects:
             source = effect.apply_to(source)
 
-        # [3D - Atmospheric shifts, PSF, NCPAs, Grating shift/distortion]
-        fovs = self.fov_manager.fovs
-        for fov_i, fov in enumerate(fovs):
-            # print("FOV", fov_i+1, "of", n_fovs, flush=True)
-            fov.extract_from(source)
-            fov.view()
+        return source
 
-            for effect in self.optics_manager.fov_effects:
-                fov = effect.apply_to(fov)
+    def _rebin_spectra(self, source, fovs):
+        """
+        Drops the spectral points which are not needed for the FOV wavelengths
 
-            self.image_planes[fov.image_plane_id].add(fov.hdu, wcs_suffix="D")
-            # ..todo: finish off the multiple image plane stuff
+        Each spectrum is resampled onto the coarsest grid which includes the
+        FOV wavelength edges and stays within ``!SIM.computing.rebin_accuracy``
+        of the original. See ``source_utils.rebin_spectra``
+        """
+        wave_edges = [quantify(fov.meta[key], u.um).value for fov in fovs
+                      for key in ["wave_min", "wave_max"]]
+        rel_error = from_currsys("!SIM.computing.rebin_accuracy")
 
-        # [2D - Vibration, flat fielding, chopping+nodding]
-        for effect in self.optics_manager.image_plane_effects:
-            for ii in range(len(self.image_planes)):
-                self.image_planes[ii] = effect.apply_to(self.image_planes[ii])
+        throughput = None
+        for effect in self.optics_manager.source_effects:
+            if isinstance(effect, SurfaceList) and not effect.is_empty:
+                wave, thru = effect.sampled_throughput()
+                if throughput is not None:
+                    new_wave = np.union1d(wave, throughput[0])
+                    thru = np.interp(new_wave, wave, thru) * \
+                        np.interp(new_wave, *throughput)
+                    wave = new_wave
+                throughput = (wave, thru)
+
+        source.spectra = rebin_spectra(source.spectra, wave_edges, rel_error,
+                                       throughput=throughput)
+
+    def _extract_chunks(self, streaming_source, fovs):
+        """
+        Adds up the FOV images of all chunks of a ``StreamingSource``
+
+        Only one chunk is held in memory at a time. Each FOV keeps the fields
+        of the last chunk which fell inside it, so that the FOV effects know
+        the FOV is not empty. The Source effects only alter the spectra, which
+        all chunks share, so they are applied once to a copy of the spectra
+        """
+        spectra_source = Source()
+        spectra_source.spectra = deepcopy(streaming_source.spectra)
+        spectra_source = self._apply_source_effects(spectra_source, fovs)
+        streaming_source = copy(streaming_source)
+        streaming_source.spectra = spectra_source.spectra
+
+        for fov in fovs:
+            fov.meta.pop("culled_sources", None)
+
+        images = [None] * len(fovs)
+        fields = [[] for _ in fovs]
+        for chunk in streaming_source:
+            for ii, fov in enumerate(fovs):
+                # extract_from appends to .fields, so drop the last chunk
+                fov.fields = []
+                fov.extract_from(chunk)
+                image = fov.view()
+                if images[ii] is None:
+                    images[ii] = image
+                else:
+                    images[ii] += image
+                if len(fov.fields) > 0:
+                    fields[ii] = fov.fields
+
+        for fov, image, fov_fields in zip(fovs, images, fields):
+            if image is None:
+                fov.view()
+            else:
+                fov.hdu.data = image
+            fov.fields = fov_fields
 
     def readout(self, filename=None, **kwargs):
         """
@@ -8,6 +8,8 @@ from .optical_element import OpticalElement
 from .. import effects as efs
 from ..effects.effects_utils import is_spectroscope
 from ..effects.effects_utils import combine_surface_effects
+from ..effects.effects_utils import combine_psf_effects
+from ..utils import from_currsys
 from .. import rc
 
 
@@ -28,7 +30,7 @@ class OpticsManager:
 
     def __init__(self, yaml_dicts=[], **kwargs):
         self.optical_elements = []
-        self.meta = {}
+        self.meta = {"fuse_psf_kernels": "!SIM.computing.fuse_psf_kernels"}
         self.meta.update(kwargs)
         self._surfaces_table = None
 
@@ -185,13 +187,33 @@ class OpticsManager:
         effects = self.get_z_order_effects(700)
         if not self.is_spectroscope:
             effects += [self.surfaces_table]   # Background Emission if Imager
-        return effects
+        return self.fuse_psf_effects(effects)
 
     @property
     def fov_effects(self):
         effects = self.get_z_order_effects(600)
         if self.is_spectroscope:
             effects += [self.surfaces_table]   # Background Emission if Spectroscope
+        return self.fuse_psf_effects(effects)
+
+    def fuse_psf_effects(self, effects):
+        """
+        Replaces runs of consecutive shift-invariant PSFs with a FusedPSF
+
+        Only done if ``!SIM.computing.fuse_psf_kernels`` is True. Effects with
+        ``include=False`` have already been removed by get_z_order_effects.
+
+        Parameters
+        ----------
+        effects : list of Effect objects
+
+        Returns
+        -------
+        effects : list of Effect objects
+
+        """
+        if from_currsys(self.meta["fuse_psf_kernels"]):
+            effects = combine_psf_effects(effects)
         return effects
 
     @property
@@ -2,46 +2,166 @@ from collections import OrderedDict
 
 import numpy as np
 from astropy import units as u
+from astropy.table import Table, Column, MaskedColumn
 
-from ..utils import real_colname, quantify
+from ..utils import real_colname, quantify, insert_into_ordereddict
 from .radiometry_utils import combine_emissions, combine_throughputs, \
-    combine_tables, add_surface_to_table, add_surface_to_dict, \
-    make_surface_from_row
+    string_to_table, make_surface_from_row
 
 
 class RadiometryTable:
+    """
+    An ordered list of optical surfaces
+
+    The rows are kept as a list of records (one dict per surface), so that
+    adding surfaces does not copy the whole table. The astropy ``.table`` view
+    is only built when it is asked for, and is then kept until the next
+    surface is added. Changes must therefore be made with ``add_surface``,
+    ``add_surface_list`` or by assigning a new table to ``.table``. The
+    columns of the view are read-only, use ``.table.copy()`` for an editable
+    table.
+    """
     def __init__(self, tables=(), **kwargs):
         self.meta = {"area": None}
         self.meta.update(kwargs)
 
-        self.table = None
+        self._colnames = None       # None until a table template is added
+        self._dtypes = {}
+        self._units = {}
+        self._table_meta = OrderedDict({})
+        self._records = []
+        self._table = None
         self.surfaces = OrderedDict({})
 
         if len(tables) > 0:
             self.add_surface_list(tables)
 
-    def add_surface_list(self, surface_list, prepend=False):
-        self.table = combine_tables(surface_list, self.table, prepend=prepend)
+    @property
+    def table(self):
+        if self._colnames is None:
+            return None
+
+        if self._table is None:
+            self._table = self._make_table()
+
+        return self._table
+
+    @table.setter
+    def table(self, new_table):
+        self._colnames = None
+        self._dtypes = {}
+        self._units = {}
+        self._table_meta = OrderedDict({})
+        self._records = []
+        self._table = None
+        if new_table is not None:
+            self._add_records(new_table)
 
-        r_name = real_colname("name", self.table.colnames)
-        for row in self.table:
-            if row[r_name] not in self.surfaces:
-                surf = make_surface_from_row(row)
-                self.add_surface(surf, row[r_name], position=-1,
-                                 add_to_table=False)
+    def add_surface_list(self, surface_list, prepend=False):
+        if isinstance(surface_list, (str, Table)):
+            surface_list = [surface_list]
+
+        new_tables = [string_to_table(tbl) if isinstance(tbl, str) else tbl
+                      for tbl in surface_list]
+
+        # prepended tables keep their own order: [new_1, new_2, old]
+        position = 0
+        for tbl in new_tables:
+            self._add_records(tbl, position=position if prepend else None)
+            position += len(tbl)
+
+        for tbl in new_tables:
+            r_name = real_colname("name", tbl.colnames)
+            for row in tbl:
+                if row[r_name] not in self.surfaces:
+                    surf = make_surface_from_row(row)
+                    self.add_surface(surf, row[r_name], position=-1,
+                                     add_to_table=False)
 
     def add_surface(self, surface, name, position=-1, add_to_table=True):
-        if self.table is None:
+        if self._colnames is None:
             raise ValueError("Cannot add surface without <self>.table template."
                              "Please add an empty table to define column names")
 
         if position < 0:
-            position += len(self.table) + 1
-        self.surfaces = add_surface_to_dict(self.surfaces, surface,
-                                            name, position)
+            position += len(self._records) + 1
+
+        if position >= len(self.surfaces) or name in self.surfaces:
+            self.surfaces[name] = surface
+        else:
+            self.surfaces = insert_into_ordereddict(self.surfaces,
+                                                    [name, surface], position)
+
         if add_to_table:
-            self.table = add_surface_to_table(self.table, surface,
-                                              name, position)
+            record = {}
+            for colname in self._colnames:
+                surf_col = real_colname(colname, surface.meta)
+                if surf_col is not None:
+                    surf_val = surface.meta[surf_col]
+                    if isinstance(surf_val, u.Quantity):
+                        surf_val = surf_val.value
+                    record[colname] = surf_val
+            record[real_colname("name", self._colnames)] = name
+
+            self._records.insert(position, record)
+            self._table = None
+
+    def _add_records(self, tbl, position=None):
+        """Adds the rows of an astropy Table at ``position``. Default is the end"""
+        records = [{} for _ in range(len(tbl))]
+        for colname in tbl.colnames:
+            # masked entries (e.g. from vstack-ed tables) come back as None
+            for record, value in zip(records, tbl[colname].tolist()):
+                if value is not None:
+                    record[colname] = value
+
+        if self._colnames is None:
+            self._colnames = []
+        for colname in tbl.colnames:
+            if colname not in self._colnames:
+                self._colnames += [colname]
+                self._dtypes[colname] = tbl[colname].dtype
+                self._units[colname] = tbl[colname].unit
+
+        # as for vstack([new, old]), old meta values take precedence
+        if position is not None:
+            self._table_meta = OrderedDict(list(tbl.meta.items()) +
+                                           list(self._table_meta.items()))
+            self._records[position:position] = records
+        else:
+            self._table_meta.update(tbl.meta)
+            self._records += records
+
+        self._table = None
+
+    def _make_table(self):
+        columns = []
+        for colname in self._colnames:
+            values = [record.get(colname) for record in self._records]
+            missing = [value is None for value in values]
+            dtype = _column_dtype(self._dtypes[colname],
+                                  [val for val in values if val is not None])
+            if len(values) == 0:
+                col = Column(name=colname, dtype=self._dtypes[colname],
+                             length=0)
+            elif any(missing):
+                fill = np.zeros(1, dtype=self._dtypes[colname])[0]
+                values = [fill if miss else val
+                          for val, miss in zip(values, missing)]
+                col = MaskedColumn(name=colname, data=values, mask=missing,
+                                   dtype=dtype)
+            else:
+                col = Column(name=colname, data=values, dtype=dtype)
+            col.unit = self._units[colname]
+            columns += [col]
+
+        tbl = Table(columns, meta=OrderedDict(self._table_meta))
+        for col in tbl.itercols():
+            col.setflags(write=False)
+            if isinstance(col, MaskedColumn):
+                col.mask.setflags(write=False)
+
+        return tbl
 
     def get_throughput(self, start=0, end=None, rows=None):
 
@@ -94,3 +214,19 @@ class RadiometryTable:
         return self.table.__repr__()
 
 
+def _column_dtype(dtype, values):
+    """
+    Returns the dtype for a column of values which were stored via ``tolist``
+
+    ``tolist`` turns e.g. float32 into python floats. Numeric columns get
+    their original dtype back, unless the values need a wider kind (e.g. a
+    float added to an int column). All other columns (e.g. strings, whose
+    width depends on the values) get the dtype numpy infers from the values.
+    """
+    kinds = "biuf"
+    val_kind = np.array(values).dtype.kind
+    if dtype.kind in kinds and val_kind in kinds and \
+            kinds.index(dtype.kind) >= kinds.index(val_kind):
+        return dtype
+
+    return None
@@ -1,89 +1,191 @@
 from collections import OrderedDict
-from copy import deepcopy
 import warnings
 
 import numpy as np
 from astropy import units as u
 from astropy.io import ascii as ioascii
 from astropy.table import Table, vstack
+from synphot import SourceSpectrum, SpectralElement
+from synphot.models import Empirical1D
 
 from .surface import SpectralSurface
 from ..utils import real_colname, insert_into_ordereddict, quantify, \
-    change_table_entry, convert_table_comments_to_dict
+    change_table_entry, convert_table_comments_to_dict, from_currsys
 
 
 def combine_emissions(tbl, surfaces, row_indexes, etendue, use_area=False):
+    """
+    Returns the emission of a series of surfaces as seen after the last one
+
+    The emission of each surface is attenuated by the throughput of all the
+    surfaces that come after it. All curves are sampled onto one common
+    wavelength grid (see ``flat_wavelength_grid``) and combined with a single
+    array operation, instead of building a nested synphot compound model.
+
+    Parameters
+    ----------
+    tbl : Table
+        Radiometry table with the columns "name" and "action"
+    surfaces : dict
+        {name: SpectralSurface}
+    row_indexes : list of int
+        Which rows of ``tbl`` to use, in the order the light passes them
+    etendue : float, u.Quantity
+        [m2 arcsec2]
+    use_area : bool, optional
+        If True, the emission is multiplied by the area of each surface [cm2]
+
+    Returns
+    -------
+    emission : synphot.SourceSpectrum, None
+        An ``Empirical1D`` spectrum in [PHOTLAM] (x cm2 if ``use_area``)
+
+    """
     if len(tbl) == 0:
         return None
 
     etendue = quantify(etendue, "m2 arcsec2")
 
-    r_name = real_colname("name", tbl.colnames)
-    r_action = real_colname("action", tbl.colnames)
+    throughputs, emissions = [], []
+    for row_num in row_indexes:
+        surf, surf_throughput = _surface_and_throughput(tbl, surfaces,
+                                                        row_num)
+        if surf is None:
+            continue
+
+        surf_emission = None
+        area = surf.area
+        if area is not None:
+            surf_emission = surf.emission       # PHOTLAM * arcsec**-2
+            surf_eff_area = area * np.cos(surf.mirror_angle)
+            surf_eff_solid_angle = (etendue / surf_eff_area).to(u.arcsec**2)
+            scale_factor = surf_eff_solid_angle.value
+            if use_area:
+                scale_factor *= area.to(u.cm**2).value
+            surf_emission = (surf_emission, scale_factor)
+        else:
+            warnings.warn('Ignoring emission from surface: "{}". Area came '
+                          'back as "None"'.format(surf.meta["name"]))
 
-    emission = None
-    for ii, row_num in enumerate(row_indexes):
-        row = tbl[row_num]
-        surf = surfaces[row[r_name]]
-        action_attr = row[r_action]
-
-        if isinstance(surf, SpectralSurface):
-            surf_throughput = getattr(surf, action_attr)
-            if emission is not None:
-                emission = emission * surf_throughput
-
-            area = surf.area
-            if area is not None:
-                surf_emission = surf.emission       # PHOTLAM * arcsec**-2
-                surf_eff_area = area * np.cos(surf.mirror_angle)
-                surf_eff_solid_angle = (etendue / surf_eff_area).to(u.arcsec**2)
-                surf_emission *= surf_eff_solid_angle.value
-
-                if use_area:
-                    surf_emission *= area.to(u.cm**2).value
-                    surf_emission.meta["use_area"] = use_area
-
-                msg = "Etendue scale factor applied. Effective pixel solid " \
-                      "angle for surface is {}".format(surf_eff_solid_angle)
-                surf_emission.meta["solid_angle"] = None
-                surf_emission.meta["history"] += [msg]
-
-                if ii == 0:
-                    emission = deepcopy(surf_emission)
-                else:
-                    emission = emission + surf_emission
-            else:
-                warnings.warn('Ignoring emission from surface: "{}". Area came '
-                              'back as "None"'.format(surf.meta["name"]))
+        throughputs += [surf_throughput]
+        emissions += [surf_emission]
+
+    if all([emission is None for emission in emissions]):
+        return None
+
+    curves = throughputs + [em[0] for em in emissions if em is not None]
+    wave = flat_wavelength_grid(curves)
+
+    # throughput of all surfaces downstream of each surface
+    thru = np.array([curve(wave * u.AA).value for curve in throughputs])
+    downstream = np.ones_like(thru)
+    downstream[:-1] = np.cumprod(thru[::-1], axis=0)[::-1][1:]
+
+    flux = np.zeros(len(wave))
+    for ii, emission in enumerate(emissions):
+        if emission is not None:
+            surf_emission, scale_factor = emission
+            flux += surf_emission(wave * u.AA).value * scale_factor * \
+                    downstream[ii]
+
+    emission = SourceSpectrum(Empirical1D, points=wave * u.AA,
+                              lookup_table=flux)
+    emission.meta["solid_angle"] = None
+    emission.meta["use_area"] = use_area
+    emission.meta["history"] = ["Combined emission of {} surfaces with "
+                                "etendue {}".format(len(emissions), etendue)]
 
     return emission
 
 
 def combine_throughputs(tbl, surfaces, rows_indexes):
+    """
+    Returns the product of the throughputs of a series of surfaces
+
+    Parameters
+    ----------
+    tbl : Table
+        Radiometry table with the columns "name" and "action"
+    surfaces : dict
+        {name: SpectralSurface}
+    rows_indexes : list of int
+
+    Returns
+    -------
+    throughput : synphot.SpectralElement, None
+        An ``Empirical1D`` curve sampled on ``flat_wavelength_grid``
+
+    """
     if len(tbl) == 0:
         return None
 
+    throughputs = []
+    for row_num in rows_indexes:
+        surf, surf_throughput = _surface_and_throughput(tbl, surfaces,
+                                                        row_num)
+        if surf is not None:
+            throughputs += [surf_throughput]
+
+    if len(throughputs) == 0:
+        return None
+
+    wave = flat_wavelength_grid(throughputs)
+    thru = np.prod([curve(wave * u.AA).value for curve in throughputs], axis=0)
+
+    return SpectralElement(Empirical1D, points=wave * u.AA, lookup_table=thru)
+
+
+def flat_wavelength_grid(curves):
+    """
+    Returns a wavelength grid on which a list of synphot curves can be sampled
+
+    The grid is the union of the wavesets of all curves, plus a geometric grid
+    between ``!SIM.spectral.wave_min`` and ``!SIM.spectral.wave_max`` with a
+    relative step of ``!SIM.spectral.spectral_resolution``. The latter resolves
+    analytic curves, e.g. blackbodies, which have only a coarse waveset
+
+    Parameters
+    ----------
+    curves : list of synphot.SpectralElement, synphot.SourceSpectrum
+
+    Returns
+    -------
+    wave : np.ndarray
+        [Angstrom]
+
+    """
+    wave_min = quantify(from_currsys("!SIM.spectral.wave_min"), u.um)
+    wave_max = quantify(from_currsys("!SIM.spectral.wave_max"), u.um)
+    resolution = float(from_currsys("!SIM.spectral.spectral_resolution"))
+    n_wave = int(np.log(wave_max / wave_min) / np.log1p(resolution)) + 1
+    wave = np.geomspace(wave_min.to(u.AA).value, wave_max.to(u.AA).value,
+                        max(n_wave, 2))
+
+    wavesets = [curve.waveset.to(u.AA).value for curve in curves
+                if curve.waveset is not None]
+
+    return np.unique(np.concatenate([wave] + wavesets))
+
+
+def _surface_and_throughput(tbl, surfaces, row_num):
     r_name = real_colname("name", tbl.colnames)
     r_action = real_colname("action", tbl.colnames)
 
-    throughput = None
-    for ii, row_num in enumerate(rows_indexes):
-
-        row = tbl[row_num]
-        surf = surfaces[row[r_name]]
-        action_attr = row[r_action]
-        if action_attr == "":
-            raise ValueError("No action in surf.meta: {}".format(surf.meta))
+    row = tbl[row_num]
+    surf = surfaces[row[r_name]]
+    action_attr = row[r_action]
+    if action_attr == "":
+        raise ValueError("No action in surf.meta: {}".format(surf.meta))
 
-        if isinstance(surf, SpectralSurface):
-            surf_throughput = getattr(surf, action_attr)
+    if not isinstance(surf, SpectralSurface):
+        return None, None
 
-            if ii == 0:
-                throughput = deepcopy(surf_throughput)
-            else:
-                throughput = throughput * surf_throughput
+    surf_throughput = getattr(surf, action_attr)
+    if surf_throughput is None:
+        raise ValueError("Surface {} has no {} curve"
+                         "".format(row[r_name], action_attr))
 
-    return throughput
+    return surf, surf_throughput
 
 
 def combine_tables(new_tables, old_table=None, prepend=False):
@@ -13,6 +13,8 @@ from synphot.models import Empirical1D
 from ..effects import ter_curves_utils as ter_utils
 from ..utils import get_meta_quantity, quantify, extract_type_from_unit
 from ..utils import from_currsys, convert_table_comments_to_dict, find_file
+from ..utils import content_hash
+from .. import rc
 from .surface_utils import make_emission_from_emissivity,\
     make_emission_from_array
 
@@ -41,6 +43,7 @@ class SpectralSurface:
                 self.meta.update(tbl_meta)
 
         self.meta.update(kwargs)
+        self._emission = None
 
     @property
     def area(self):
@@ -89,8 +92,40 @@ class SpectralSurface:
         Assumption is that self.meta["temperature"] is in deg_C
         Return units are in PHOTLAM arcsec^-2, even though arcsec^-2 is not
         given
-        """
 
+        The spectrum is kept until the meta data (e.g. temperature or
+        rescale_emission) or the table of the surface change
+        """
+        key = self._emission_key()
+        if self._emission is None or self._emission[0] != key:
+            self._emission = (key, self._make_emission())
+
+        return self._emission[1]
+
+    def clear_cache(self):
+        """Forces the emission spectrum to be rebuilt on the next access"""
+        self._emission = None
+
+    def _emission_key(self):
+        # bang-strings are looked up so that changes in rc.__currsys__ are seen
+        def resolve(value):
+            if isinstance(value, str) and value.startswith("!") and \
+                    value in rc.__currsys__:
+                value = rc.__currsys__[value]
+            if isinstance(value, dict):
+                value = {key: resolve(val) for key, val in value.items()}
+            return value
+
+        items = []
+        for key in sorted(self.meta, key=str):
+            value = resolve(self.meta[key])
+            items += [key, value, str(getattr(value, "unit", ""))]
+        for colname in self.table.colnames:
+            items += [colname, np.asarray(self.table[colname])]
+
+        return content_hash(*items)
+
+    def _make_emission(self):
         flux = self._get_array("emission")
         if flux is not None:
             wave = self._get_array("wavelength")
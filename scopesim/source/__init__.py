@@ -1 +1,2 @@
 from . import source_utils
+from .spectral_library import SpectralLibrary
@@ -32,8 +32,11 @@
 # [WCS = CRPIXn, CRVALn = (0,0), CTYPEn, CDn_m, NAXISn, CUNITn
 """
 
+import os
+import json
 import pickle
 import warnings
+from collections import OrderedDict
 from copy import deepcopy
 import numpy as np
 
@@ -46,13 +49,20 @@ from synphot import SpectralElement, SourceSpectrum, Empirical1D
 
 from ..optics.image_plane import ImagePlane
 from ..optics import image_plane_utils as imp_utils
+from ..optics import fov_utils
 from .source_utils import validate_source_input, convert_to_list_of_spectra, \
-    photons_in_range
+    photons_in_range, make_table_field, spectra_to_arrays, arrays_to_spectra
 
+from .spectral_library import SpectralLibrary
 from ..base_classes import SourceBase
 from .. import utils
 
 
+SOURCE_FORMAT = "scopesim.Source"
+SOURCE_FORMAT_VERSION = 2     # 2: SpectralLibrary spectra stored as such
+SOURCE_INDEX_FILE = "source.json"
+
+
 class Source(SourceBase):
     """
     Create a source object from a file or from arrays
@@ -89,6 +99,10 @@ class Source(SourceBase):
        - ``x=<array>, y=<array>, ref=<array>, spectra=<list of array>, lam=<array>``
        - ``x=<array>, y=<array>, ref=<array>, weight=<array>, spectra=<list of array>, lam=<array>``
 
+       Spectral cubes (no spectra needed)
+       - ``cube=<fits.ImageHDU>`` with a 3D (x, y, wavelength) array
+       - ``cube=<filename>``, the cube is then read via a memory map
+
        More details on the content of these combinations can be found in the
        use-case documentation.
 
@@ -110,6 +124,10 @@ class Source(SourceBase):
         ``flux(x[i], y[i]) = spectra[ref[i]] * weight[i]``
     weight : np.array
         A weighting to scale the relevant spectrum for each position
+    cube : fits.ImageHDU, str
+        A 3D cube with a linear spectral WCS on axis 3 (CRVAL3, CDELT3,
+        CUNIT3). BUNIT must be a photon flux density per pixel, e.g.
+        "ph s-1 m-2 um-1"
 
 
     Attributes
@@ -117,10 +135,15 @@ class Source(SourceBase):
     fields : list
         The spatial distribution of the on-sky source, either as
         ``fits.ImageHDU`` or ``astropy.Table`` objects
-    spectra : list of ``synphot.SourceSpectrum`` objects
-        List of spectra associated with the fields
+    spectra : list of ``synphot.SourceSpectrum`` objects, SpectralLibrary
+        List of spectra associated with the fields. A ``SpectralLibrary`` can
+        be passed instead of a list for sources with many spectra
     meta : dict
         Dictionary of extra information about the source
+    cube_throughput : tuple of np.ndarray, None
+        ([Angstrom], [-]) Throughput which the optical train has applied to
+        the spectra, but which still needs to be applied to the cube fields
+        when they are extracted. Set by ``SurfaceList``
 
     See Also
     --------
@@ -130,23 +153,30 @@ class Source(SourceBase):
 
     def __init__(self, filename=None,
                  lam=None, spectra=None, x=None, y=None, ref=None, weight=None,
-                 table=None, image_hdu=None, **kwargs):
+                 table=None, image_hdu=None, cube=None, **kwargs):
 
         self.meta = {}
         self.meta.update(kwargs)
-        
+
+        self._parts = []
+        self._image_cache = OrderedDict()
         self.fields = []
         self.spectra = []
 
         self.bandpass = None
+        self.cube_throughput = None
 
         valid = validate_source_input(lam=lam, x=x, y=y, ref=ref, weight=weight,
                                       spectra=spectra, table=table,
-                                      image_hdu=image_hdu, filename=filename)
+                                      image_hdu=image_hdu, cube=cube,
+                                      filename=filename)
 
         spectra = convert_to_list_of_spectra(spectra, lam)
 
-        if filename is not None and spectra is not None:
+        if cube is not None:
+            self._from_cube(cube)
+
+        elif filename is not None and spectra is not None:
             self._from_file(filename, spectra)
 
         elif table is not None and spectra is not None:
@@ -181,16 +211,14 @@ class Source(SourceBase):
             self._from_table(tbl, spectra)
 
     def _from_table(self, tbl, spectra):
-        if "weight" not in tbl.colnames:
-            tbl.add_column(Column(name="weight", data=np.ones(len(tbl))))
-        tbl["ref"] += len(self.spectra)
+        tbl = make_table_field(tbl, ref_offset=len(self.spectra))
         self.fields += [tbl]
-        self.spectra += spectra
+        self._add_spectra(spectra)
 
     def _from_imagehdu(self, image_hdu, spectra):
         if spectra is not None and len(spectra) > 0:
             image_hdu.header["SPEC_REF"] = len(self.spectra)
-            self.spectra += spectra
+            self._add_spectra(spectra)
         else:
             image_hdu.header["SPEC_REF"] = ""
             warnings.warn("No spectrum was provided. SPEC_REF set to ''. "
@@ -206,6 +234,30 @@ class Source(SourceBase):
 
         self.fields += [image_hdu]
 
+    def _from_cube(self, cube):
+        if isinstance(cube, str):
+            # keep the data as a memory map, so that only the slabs needed by
+            # each FieldOfView are read from disk
+            with fits.open(utils.find_file(cube), memmap=True) as hdulist:
+                hdus = [hdu for hdu in hdulist if hdu.header["NAXIS"] == 3]
+                if len(hdus) == 0:
+                    raise ValueError("No 3D extension found in {}"
+                                     "".format(cube))
+                cube = fits.ImageHDU(data=hdus[0].data,
+                                     header=hdus[0].header)
+        else:
+            # don't alter the header of the cube passed in by the user
+            cube = fits.ImageHDU(data=cube.data, header=cube.header.copy())
+
+        cube.header["SPEC_REF"] = ""
+        for i in [1, 2]:
+            unit = u.Unit(cube.header.get("CUNIT"+str(i), "deg").lower())
+            val = float(cube.header["CDELT"+str(i)])
+            cube.header["CUNIT"+str(i)] = "DEG"
+            cube.header["CDELT"+str(i)] = val * unit.to(u.deg)
+
+        self.fields += [cube]
+
     def _from_arrays(self, x, y, ref, weight, spectra):
         if weight is None:
             weight = np.ones(len(x))
@@ -213,15 +265,49 @@ class Source(SourceBase):
         x = utils.quantify(x, u.arcsec)
         y = utils.quantify(y, u.arcsec)
         tbl = Table(names=["x", "y", "ref", "weight"],
-                    data=[x, y, np.array(ref) + len(self.spectra), weight])
-        tbl.meta["x_unit"] = "arcsec"
-        tbl.meta["y_unit"] = "arcsec"
+                    data=[x, y, np.array(ref), weight])
+        tbl = make_table_field(tbl, ref_offset=len(self.spectra))
 
         self.fields += [tbl]
-        self.spectra += spectra
+        self._add_spectra(spectra)
+
+    def _add_spectra(self, spectra):
+        # keep a SpectralLibrary intact, rather than unpacking it into a list
+        if isinstance(spectra, SpectralLibrary) and len(self.spectra) == 0:
+            self.spectra = spectra
+        else:
+            self.spectra += spectra
 
     def image_in_range(self, wave_min, wave_max, pixel_scale=1*u.arcsec,
                        layers=None, area=None, order=1, sub_pixel=False):
+        """
+        Returns an ImagePlane with the flux of the Source in a wavelength range
+
+        Table fields are binned onto the pixel grid in one vectorised step.
+        Image fields are only reprojected onto the pixel grid the first time
+        they are needed for a given ``pixel_scale``. The reprojected images
+        are kept and scaled by the flux of each new wavelength range.
+
+        Parameters
+        ----------
+        wave_min, wave_max : float, u.Quantity
+            [um]
+        pixel_scale : u.Quantity, optional
+            [arcsec]
+        layers : list of int, optional
+            Which fields to include. Default is all
+        area : float, u.Quantity, optional
+            [m2]
+        order : int, optional
+            Spline order for reprojecting image fields
+        sub_pixel : bool, optional
+            Split point sources between neighbouring pixels
+
+        Returns
+        -------
+        im_plane : ImagePlane
+
+        """
         if layers is None:
             layers = range(len(self.fields))
         fields = [self.fields[ii] for ii in layers]
@@ -231,13 +317,24 @@ class Source(SourceBase):
 
         for field in fields:
             if isinstance(field, Table):
-                fluxes = self.photons_in_range(wave_min, wave_max, area,
-                                               field["ref"]) * field["weight"]
+                ref = np.asarray(field["ref"])
+                ref_set, ref_index = np.unique(ref, return_inverse=True)
+                ref_fluxes = self.photons_in_range(wave_min, wave_max, area,
+                                                   ref_set)
+                fluxes = ref_fluxes[ref_index] * np.asarray(field["weight"])
                 x = utils.quantity_from_table("x", field, u.arcsec)
                 y = utils.quantity_from_table("y", field, u.arcsec)
-                tbl = Table(names=["x", "y", "flux"], data=[x, y, fluxes])
+                tbl = Table(names=["x", "y", "flux"], data=[x, y, fluxes],
+                            copy=False)
                 tbl.meta.update(field.meta)
-                hdu_or_table = tbl
+                im_plane.add(tbl, sub_pixel=sub_pixel, order=order)
+
+            elif fov_utils.is_cube(field):
+                slab = fov_utils.extract_cube_slab(
+                    field, hdr, wave_min, wave_max, area,
+                    throughput=self.cube_throughput)
+                if slab is not None:
+                    im_plane.add(slab, order=order)
 
             elif isinstance(field, fits.ImageHDU):
                 if field.header["SPEC_REF"] is not "":
@@ -256,16 +353,166 @@ class Source(SourceBase):
                 #     # [ph s-1] or [ph s-1 m-2] come out of photons_in_range
                 #     flux = 1
 
-                image = field.data * flux
-                hdu = fits.ImageHDU(header=field.header, data=image)
-                hdu_or_table = hdu
-            else:
-                continue
-
-            im_plane.add(hdu_or_table, sub_pixel=sub_pixel, order=order)
+                new_hdu = self._reprojected_field(field, hdr["CDELT1"], order)
+                im_plane.hdu = imp_utils.overlay_imagehdu(
+                    new_hdu, im_plane.hdu, scale_factor=flux.value[0])
 
         return im_plane
 
+    def _reprojected_field(self, field, pixel_scale, order, wcs_suffix=""):
+        # The reprojected unit image only depends on the field and the pixel
+        # grid, so it is kept until the field is changed or removed. The data
+        # hash catches in-place edits of the image
+        key = (id(field), utils.content_hash(field.data),
+               imp_utils.header_geometry_key(field.header, wcs_suffix),
+               float(pixel_scale), order, wcs_suffix)
+        new_hdu = self._from_image_cache(key, [field])
+        if new_hdu is None:
+            hdu = fits.ImageHDU(header=field.header, data=field.data)
+            new_hdu = imp_utils.reproject_imagehdu(hdu, float(pixel_scale),
+                                                   order=order,
+                                                   wcs_suffix=wcs_suffix)
+            self._add_to_image_cache(key, [field], new_hdu)
+
+        return new_hdu
+
+    def _field_on_canvas(self, field, canvas_header, order, wcs_suffix=""):
+        """
+        Returns an image field resampled onto the pixel grid of a header
+
+        The image is not scaled by the spectrum of the field. FOVs with the same
+        spatial footprint (e.g. different wavelength slices of a spectroscopic
+        observation) therefore share the same resampled image and only need to
+        multiply it by their own flux. The source field is not altered.
+
+        Parameters
+        ----------
+        field : fits.ImageHDU
+            One of the 2D image fields in ``.fields``
+        canvas_header : fits.Header
+            Header of the target, e.g. a ``FieldOfView``
+        order : int
+            Spline order for the reprojection
+        wcs_suffix : str, optional
+
+        Returns
+        -------
+        image : np.ndarray
+            Array with shape (NAXIS2, NAXIS1) of ``canvas_header``
+
+        """
+        key = ("canvas", id(field), utils.content_hash(field.data),
+               imp_utils.header_geometry_key(field.header, wcs_suffix),
+               imp_utils.header_geometry_key(canvas_header, wcs_suffix),
+               order, wcs_suffix)
+        image = self._from_image_cache(key, [field])
+        if image is None:
+            pixel_scale = canvas_header["CDELT1" + wcs_suffix]
+            new_hdu = self._reprojected_field(field, pixel_scale, order,
+                                              wcs_suffix)
+            image = np.zeros((canvas_header["NAXIS2"],
+                              canvas_header["NAXIS1"]))
+            canvas_hdu = fits.ImageHDU(header=canvas_header, data=image)
+            canvas_hdu = imp_utils.overlay_imagehdu(new_hdu, canvas_hdu,
+                                                    wcs_suffix=wcs_suffix)
+            image = canvas_hdu.data
+            self._add_to_image_cache(key, [field], image)
+
+        return image
+
+    def _table_positions(self, fov_header, field_indexes):
+        """
+        Returns the table field entries inside a FOV with their pixel positions
+
+        The positions only depend on the on-sky footprint of the FOV, so they
+        are computed once for all FOVs with the same footprint (e.g. the
+        wavelength slices of an imaging observation). Shifts of the
+        image-plane WCS, such as those from atmospheric dispersion, are applied
+        afterwards by each FOV when converting the pixel positions to [mm].
+
+        Parameters
+        ----------
+        fov_header : fits.Header
+            Header of a ``FieldOfView`` with an on-sky WCS
+        field_indexes : list of int
+            Which fields to use. Non-Table fields are ignored
+
+        Returns
+        -------
+        tbl : Table
+            Columns "x", "y" [deg], "ref", "weight", "x_pix", "y_pix"
+
+        """
+        fields = [self.fields[ii] for ii in field_indexes
+                  if isinstance(self.fields[ii], Table)]
+        # the content of the columns is part of the key, so that in-place
+        # edits of the table (e.g. by .shift) are not hidden by the cache
+        key = ("tables", tuple(id(field) for field in fields),
+               tuple(_table_fingerprint(field) for field in fields),
+               imp_utils.header_geometry_key(fov_header))
+        tbl = self._from_image_cache(key, fields)
+        if tbl is None:
+            tbl = fov_utils.combine_table_fields(fov_header, self,
+                                                 field_indexes)
+            xpix, ypix = imp_utils.val2pix(fov_header, np.asarray(tbl["x"]),
+                                           np.asarray(tbl["y"]))
+            tbl.add_columns([Column(name="x_pix", data=np.asarray(xpix)),
+                             Column(name="y_pix", data=np.asarray(ypix))])
+            self._add_to_image_cache(key, fields, tbl)
+
+        return tbl
+
+    def _from_image_cache(self, key, fields):
+        """
+        Returns a cached image or table, if it was made from the same fields
+
+        Parameters
+        ----------
+        key : tuple
+        fields : list of Table, ImageHDU
+            The field objects the cached value was made from
+
+        Returns
+        -------
+        value : ImageHDU, np.ndarray, Table, None
+            None if there is no valid entry for ``key``
+
+        """
+        if key in self._image_cache:
+            cached_fields, value = self._image_cache[key]
+            if len(cached_fields) == len(fields) and \
+                    all(a is b for a, b in zip(cached_fields, fields)):
+                self._image_cache.move_to_end(key)
+                return value
+
+        return None
+
+    def _add_to_image_cache(self, key, fields, value):
+        """
+        Adds an entry to the cache and drops the least recently used entries
+
+        The cache is limited to ``!SIM.computing.source_cache_size`` [MB]. The
+        newest entry is always kept, even if it is larger than the limit
+        """
+        self._image_cache[key] = (tuple(fields), value)
+        self._image_cache.move_to_end(key)
+
+        max_bytes = utils.from_currsys("!SIM.computing.source_cache_size")
+        max_bytes = float(max_bytes) * 2**20
+        n_bytes = sum(_cache_nbytes(val) for _, val in
+                      self._image_cache.values())
+        while n_bytes > max_bytes and len(self._image_cache) > 1:
+            _, (_, old_value) = self._image_cache.popitem(last=False)
+            n_bytes -= _cache_nbytes(old_value)
+
+    def clear_image_cache(self):
+        """
+        Drops the reprojected images and field positions kept for the FOVs
+
+        This happens automatically when ``.fields`` or ``.spectra`` are set
+        """
+        self._image_cache = OrderedDict()
+
     def photons_in_range(self, wave_min, wave_max, area=None, indexes=None):
         """
 
@@ -286,6 +533,13 @@ class Source(SourceBase):
             [ph / s] if area is passed
 
         """
+        if isinstance(self.spectra, SpectralLibrary):
+            if indexes is not None:
+                indexes = np.asarray(indexes, dtype=int)
+            return self.spectra.photons_in_range(wave_min, wave_max, area=area,
+                                                 indexes=indexes,
+                                                 bandpass=self.bandpass)
+
         if indexes is None:
             indexes = range(len(self.spectra))
 
@@ -301,16 +555,144 @@ class Source(SourceBase):
         return self.image_in_range(wave_min, wave_max, **kwargs)
 
     @classmethod
-    def load(cls, filename):
-        """Load :class:'.Source' object from filename"""
-        with open(filename, 'rb') as fp1:
-            src = pickle.load(fp1)
+    def load(cls, filename, mmap_mode=None):
+        """
+        Load :class:'.Source' object from filename
+
+        Parameters
+        ----------
+        filename : str
+            A directory written by ``.dump``. Files which are not directories
+            are treated as (legacy) pickled Source objects
+        mmap_mode : str, optional
+            [None, "r", "r+", "c"] Passed to ``np.load`` for the table columns
+            and image data. With ``"r"`` the field data are read from disk only
+            when needed, and several processes can share one source file
+            through the operating system page cache
+
+        Returns
+        -------
+        src : Source
+
+        """
+        if not os.path.isdir(filename):
+            with open(filename, 'rb') as fp1:
+                src = pickle.load(fp1)
+            return src
+
+        with open(os.path.join(filename, SOURCE_INDEX_FILE)) as fp1:
+            info = json.load(fp1)
+        if info.get("format") != SOURCE_FORMAT:
+            raise ValueError("{} is not a Source directory: {}"
+                             "".format(filename, info.get("format")))
+
+        def load_array(fname, mmap=mmap_mode):
+            return np.load(os.path.join(filename, fname), mmap_mode=mmap,
+                           allow_pickle=False)
+
+        src = cls()
+        src.meta = info["meta"]
+        for field in info["fields"]:
+            if field["type"] == "table":
+                cols = [Column(load_array(col["file"]), name=col["name"],
+                               unit=col["unit"], copy=False)
+                        for col in field["columns"]]
+                src.fields += [Table(cols, meta=field["meta"], copy=False)]
+            elif field["type"] == "image":
+                hdr = fits.Header.fromstring(field["header"])
+                hdu_class = getattr(fits, field["hdu_class"])
+                src.fields += [hdu_class(data=load_array(field["file"]),
+                                         header=hdr)]
+
+        if info["spectra"].get("library", False):
+            src.spectra = SpectralLibrary(
+                load_array(info["spectra"]["waves"], mmap=None),
+                load_array(info["spectra"]["fluxes"], mmap=None))
+        else:
+            spec_arrays = [load_array(info["spectra"][key], mmap=None)
+                           for key in ["waves", "values", "offsets"]]
+            src.spectra = arrays_to_spectra(*spec_arrays)
+
+        if info["bandpass"] is not None:
+            bp_arrays = [load_array(info["bandpass"][key], mmap=None)
+                         for key in ["waves", "values", "offsets"]]
+            src.bandpass = arrays_to_spectra(*bp_arrays,
+                                             spec_class=SpectralElement)[0]
+
         return src
 
     def dump(self, filename):
-        """Save to filename as a pickle"""
-        with open(filename, 'wb') as fp1:
-            pickle.dump(self, fp1)
+        """
+        Save the Source to a directory of ``.npy`` arrays and a JSON index
+
+        Table columns and image data are stored as separate ``.npy`` files,
+        which can be memory-mapped by ``Source.load``. Spectra (and the
+        bandpass) are stored as lookup tables, see
+        ``source_utils.spectra_to_arrays``. A ``SpectralLibrary`` is stored as
+        its wavelength grid and flux array, and is a ``SpectralLibrary`` again
+        after ``Source.load``
+
+        Parameters
+        ----------
+        filename : str
+            Name of the directory. Created if it doesn't exist
+
+        """
+        os.makedirs(filename, exist_ok=True)
+
+        def save_array(fname, arr):
+            arr = np.asarray(arr)
+            if arr.dtype.kind == "O":
+                arr = arr.astype(str)
+            np.save(os.path.join(filename, fname), arr, allow_pickle=False)
+            return fname
+
+        info = {"format": SOURCE_FORMAT,
+                "version": SOURCE_FORMAT_VERSION,
+                "meta": _jsonify(self.meta),
+                "fields": [],
+                "spectra": {},
+                "bandpass": None}
+
+        for ii, field in enumerate(self.fields):
+            if isinstance(field, Table):
+                cols = []
+                for jj, name in enumerate(field.colnames):
+                    fname = save_array("field{}_col{}.npy".format(ii, jj),
+                                       field[name])
+                    unit = field[name].unit
+                    cols += [{"name": name, "file": fname,
+                              "unit": None if unit is None else str(unit)}]
+                info["fields"] += [{"type": "table", "columns": cols,
+                                    "meta": _jsonify(field.meta)}]
+
+            elif isinstance(field, (fits.ImageHDU, fits.PrimaryHDU)):
+                fname = save_array("field{}_image.npy".format(ii), field.data)
+                info["fields"] += [{"type": "image", "file": fname,
+                                    "hdu_class": type(field).__name__,
+                                    "header": field.header.tostring()}]
+
+        if isinstance(self.spectra, SpectralLibrary):
+            info["spectra"] = {
+                "library": True,
+                "waves": save_array("spectra_waves.npy", self.spectra.waves),
+                "fluxes": save_array("spectra_fluxes.npy",
+                                     self.spectra.fluxes)}
+        else:
+            arrays = spectra_to_arrays(self.spectra)
+            for key, arr in zip(["waves", "values", "offsets"], arrays):
+                info["spectra"][key] = save_array(
+                    "spectra_{}.npy".format(key), arr)
+
+        if self.bandpass is not None:
+            arrays = spectra_to_arrays([self.bandpass])
+            info["bandpass"] = {}
+            for key, arr in zip(["waves", "values", "offsets"], arrays):
+                info["bandpass"][key] = save_array(
+                    "bandpass_{}.npy".format(key), arr)
+
+        with open(os.path.join(filename, SOURCE_INDEX_FILE), "w") as fp1:
+            json.dump(info, fp1, indent=1)
 
     # def collapse_spectra(self, wave_min=None, wave_max=None):
     #     for spec in self.spectra:
@@ -329,19 +711,21 @@ class Source(SourceBase):
 
         for ii in layers:
             if isinstance(self.fields[ii], Table):
-                x = utils.quantity_from_table("x", u.arcsec)
-                x += utils.quantify(dx, u.arcsec)
-                self.fields[ii]["x"] = x
-
-                y = utils.quantity_from_table("y", u.arcsec)
-                y += utils.quantify(dy, u.arcsec)
-                self.fields[ii]["y"] = y
+                tbl = self.fields[ii]
+                for name, dval in [("x", dx), ("y", dy)]:
+                    arr = utils.array_from_table(name, tbl, u.arcsec, u.arcsec)
+                    arr = arr + utils.quantify(dval, u.arcsec).value
+                    tbl.replace_column(name, Column(arr, name=name,
+                                                    unit=u.arcsec))
+                    tbl.meta[name + "_unit"] = "arcsec"
             elif isinstance(self.fields[ii], fits.ImageHDU):
                 dx = utils.quantify(dx, u.arcsec).to(u.deg)
                 dy = utils.quantify(dy, u.arcsec).to(u.deg)
                 self.fields[ii].header["CRVAL1"] += dx.value
                 self.fields[ii].header["CRVAL2"] += dy.value
 
+        self.clear_image_cache()
+
     def rotate(self, angle, offset=None, layers=None):
         pass
 
@@ -352,21 +736,118 @@ class Source(SourceBase):
         self.bandpass = bandpass
 
     def append(self, source_to_add):
-        new_source = deepcopy(source_to_add)
-        if isinstance(new_source, Source):
-            for field in new_source.fields:
-                if isinstance(field, Table):
-                    field["ref"] += len(self.spectra)
-                    self.fields += [field]
-
-                elif isinstance(field, fits.ImageHDU):
-                    if isinstance(field.header["SPEC_REF"], int):
-                        field.header["SPEC_REF"] += len(self.spectra)
-                    self.fields += [field]
-                self.spectra += new_source.spectra
-        else:
+        """
+        Adds the fields and spectra of another Source to this Source
+
+        The fields and spectra are not copied. Table fields are wrapped in new
+        ``Table`` objects sharing the column data, and ImageHDU fields in new
+        ``ImageHDU`` objects sharing the image data, so that only the spectrum
+        references ("ref" and ``SPEC_REF``) need to be offset.
+
+        Parameters
+        ----------
+        source_to_add : Source
+
+        """
+        if not isinstance(source_to_add, Source):
             raise ValueError("Cannot add {} object to Source object"
-                             "".format(type(new_source)))
+                             "".format(type(source_to_add)))
+
+        offset = len(self.spectra)
+        for field in source_to_add.fields:
+            self.fields += [_offset_field(field, offset)]
+
+        spectra = source_to_add.spectra
+        if isinstance(spectra, SpectralLibrary):
+            spectra = spectra[:]    # a new library object on the same data
+        self._add_spectra(spectra)
+
+    def _materialise(self):
+        # flatten the tree of pending additions without recursion, so that
+        # each component is only visited once
+        parts, self._parts = self._parts, []
+        stack = parts[::-1]
+        while len(stack) > 0:
+            part = stack.pop()
+            if len(part._parts) > 0:
+                stack += part._parts[::-1]
+            else:
+                self.append(part)
+
+    @property
+    def fields(self):
+        if len(self._parts) > 0:
+            self._materialise()
+        return self._fields
+
+    @fields.setter
+    def fields(self, new_fields):
+        self._fields = new_fields
+        self.clear_image_cache()
+
+    @property
+    def spectra(self):
+        if len(self._parts) > 0:
+            self._materialise()
+        return self._spectra
+
+    @property
+    def is_empty(self):
+        """
+        True if the Source emits no photons, e.g. ``source_templates.empty_sky``
+
+        A field is empty if all its pixels are zero, or if all the spectra it
+        references (with non-zero weights) are zero at every wavelength point
+        """
+        zero_spectra = {}
+
+        def is_zero_spectrum(ref):
+            if ref not in zero_spectra:
+                spec = self.spectra[ref]
+                zero_spectra[ref] = spec.waveset is not None and \
+                    not np.any(spec(spec.waveset).value)
+            return zero_spectra[ref]
+
+        for field in self.fields:
+            if isinstance(field, Table):
+                weight = np.asarray(field["weight"]) if "weight" in \
+                    field.colnames else np.ones(len(field))
+                refs = np.unique(np.asarray(field["ref"])[weight != 0])
+                if not all(is_zero_spectrum(int(ref)) for ref in refs):
+                    return False
+            elif isinstance(field, (fits.ImageHDU, fits.PrimaryHDU)):
+                if not np.any(field.data):
+                    continue
+                ref = field.header.get("SPEC_REF")
+                if fov_utils.is_cube(field) or ref is None or \
+                        not is_zero_spectrum(int(ref)):
+                    return False
+            else:
+                return False
+
+        return True
+
+    @spectra.setter
+    def spectra(self, new_spectra):
+        self._spectra = new_spectra
+        self.clear_image_cache()
+
+    def __setstate__(self, state):
+        # Source objects pickled before fields and spectra became properties
+        for key in ["fields", "spectra"]:
+            if key in state:
+                state["_" + key] = state.pop(key)
+        state.setdefault("_parts", [])
+        state.setdefault("cube_throughput", None)
+        state["_image_cache"] = OrderedDict()
+        self.__dict__.update(state)
+
+    def __getstate__(self):
+        # reprojected images and positions can be rebuilt, so they are not
+        # pickled
+        state = self.__dict__.copy()
+        state["_image_cache"] = OrderedDict()
+        return state
 
     def plot(self):
         import matplotlib.pyplot as plt
@@ -384,11 +865,35 @@ class Source(SourceBase):
         plt.gca().set_aspect("equal")
 
     def __add__(self, new_source):
-        self_copy = deepcopy(self)
-        self_copy.append(new_source)
-        return self_copy
+        """
+        Returns a new Source made of this Source and ``new_source``
+
+        The combination is lazy: the lists of fields and spectra of both
+        Sources are copied, but they are only combined when ``.fields`` or
+        ``.spectra`` are first accessed. Hence ``sum(list_of_sources)`` scales
+        linearly with the number of Sources.
+
+        Adding, removing or shifting fields of either Source afterwards does
+        not change the new Source. However the table columns, image data and
+        spectrum objects are NOT copied, i.e. they are shared between the
+        Sources. In-place changes, e.g. ``new_source.fields[0]["x"][0] = 42``,
+        will therefore also show up in the original Source. Use
+        ``deepcopy(new_source)`` if independent data is needed.
+        """
+        if not isinstance(new_source, Source):
+            raise ValueError("Cannot add {} object to Source object"
+                             "".format(type(new_source)))
+
+        combined = Source()
+        combined.meta = deepcopy(self.meta)
+        combined.bandpass = self.bandpass
+        combined._parts = [_snapshot(self), _snapshot(new_source)]
+        return combined
 
     def __radd__(self, new_source):
+        # sum() starts with 0
+        if isinstance(new_source, int) and new_source == 0:
+            return self
         return self.__add__(new_source)
 
     def __repr__(self):
@@ -399,6 +904,9 @@ class Source(SourceBase):
                 num_spec = set(self.fields[ii]["ref"])
                 msg += "[{}]: Table with {} rows, referencing spectra {} \n" \
                        "".format(ii, tbl_len, num_spec)
+            elif fov_utils.is_cube(self.fields[ii]):
+                msg += "[{}]: Cube with size {}\n" \
+                       "".format(ii, self.fields[ii].data.shape)
             elif isinstance(self.fields[ii], fits.ImageHDU):
                 im_size = self.fields[ii].data.shape
                 num_spec = "-"
@@ -408,3 +916,83 @@ class Source(SourceBase):
                        "\n".format(ii, im_size, num_spec)
 
         return msg
+
+
+def _snapshot(source):
+    """
+    Returns a Source holding the current lists of fields and spectra of a Source
+
+    The field and spectrum objects are shallow copies, see ``_offset_field``.
+    """
+    snapshot = Source()
+    if len(source._parts) > 0:
+        # pending parts are already snapshots and are never changed in-place
+        snapshot._parts = source._parts
+    else:
+        snapshot.fields = [_offset_field(field, 0) for field in source.fields]
+        spectra = source.spectra
+        if isinstance(spectra, SpectralLibrary):
+            snapshot.spectra = spectra[:]
+        else:
+            snapshot.spectra = list(spectra)
+
+    return snapshot
+
+
+def _offset_field(field, offset):
+    """
+    Returns a shallow copy of a field with the spectrum references offset
+
+    Table columns and image data are shared with the original field.
+    """
+    if isinstance(field, Table):
+        new_field = Table(field, copy=False)
+        new_field.meta = dict(field.meta)
+        if offset != 0:
+            ref = np.asarray(field["ref"]) + np.int32(offset)
+            new_field.replace_column("ref", Column(ref, name="ref"))
+
+    elif isinstance(field, fits.ImageHDU):
+        new_field = fits.ImageHDU(data=field.data, header=field.header.copy())
+        if isinstance(new_field.header["SPEC_REF"], int):
+            new_field.header["SPEC_REF"] += offset
+
+    else:
+        new_field = field
+
+    return new_field
+
+
+def _cache_nbytes(value):
+    """Returns the memory [bytes] used by the data of a cached image or table"""
+    if isinstance(value, Table):
+        return sum(np.asarray(value[col]).nbytes for col in value.colnames)
+    if isinstance(value, fits.ImageHDU):
+        value = value.data
+
+    return np.asarray(value).nbytes if value is not None else 0
+
+
+def _table_fingerprint(tbl):
+    """Returns a hash of the columns and units used for the field positions"""
+    colnames = [col for col in ["x", "y", "ref", "weight"]
+                if col in tbl.colnames]
+    units = [str(tbl[col].unit) for col in colnames]
+    meta_units = [tbl.meta.get(col + "_unit") for col in ["x", "y"]]
+
+    return utils.content_hash(colnames, units, meta_units,
+                              *[np.asarray(tbl[col]) for col in colnames])
+
+
+def _jsonify(item):
+    """Converts (nested) meta data into something ``json.dump`` accepts"""
+    if isinstance(item, dict):
+        item = {str(key): _jsonify(val) for key, val in item.items()}
+    elif isinstance(item, (list, tuple)):
+        item = [_jsonify(val) for val in item]
+    elif isinstance(item, np.generic):
+        item = item.item()
+    elif not isinstance(item, (str, int, float, bool, type(None))):
+        item = str(item)
+
+    return item
@@ -3,9 +3,10 @@ import warnings
 import numpy as np
 from astropy import wcs, units as u
 from astropy.io import fits
-from astropy.table import Table
+from astropy.table import Table, Column
 from synphot import SourceSpectrum, Empirical1D, SpectralElement
 
+from .spectral_library import SpectralLibrary
 from .. import utils
 
 
@@ -25,6 +26,16 @@ def validate_source_input(**kwargs):
             warnings.warn("image does not contain valid WCS. {}"
                           "".format(wcs.WCS(image_hdu)))
 
+    if "cube" in kwargs and kwargs["cube"] is not None:
+        cube = kwargs["cube"]
+        if isinstance(cube, (fits.PrimaryHDU, fits.ImageHDU)):
+            if cube.header["NAXIS"] != 3:
+                raise ValueError("cube must have 3 axes (x, y, wavelength): "
+                                 "NAXIS == {}".format(cube.header["NAXIS"]))
+        elif not isinstance(cube, str):
+            raise ValueError("cube must be a fits.ImageHDU or a filename: {}"
+                             "".format(type(cube)))
+
     if "table" in kwargs and kwargs["table"] is not None:
         tbl = kwargs["table"]
         if not isinstance(tbl, Table):
@@ -38,9 +49,60 @@ def validate_source_input(**kwargs):
     return True
 
 
+def make_table_field(tbl, ref_offset=0):
+    """
+    Returns a Source table field with columns in the canonical units and types
+
+    Table fields are stored column-wise as contiguous arrays:
+
+    - ``x``, ``y`` : float64 [arcsec]
+    - ``ref`` : int32, offset by ``ref_offset``
+    - ``weight`` : float32, default 1
+
+    The units are set both on the columns and in ``tbl.meta``, so that the
+    arrays can be used directly (e.g. via ``utils.array_from_table``) without
+    any unit conversions. Any other columns are passed on without copying.
+    The input table is not altered.
+
+    Parameters
+    ----------
+    tbl : astropy.Table
+        Must contain the columns "x", "y", "ref"
+    ref_offset : int
+        Added to the ``ref`` column, i.e. the number of spectra already held by
+        the Source
+
+    Returns
+    -------
+    new_tbl : astropy.Table
+
+    """
+    new_tbl = Table(tbl, copy=False)
+    for name in ["x", "y"]:
+        arr = utils.array_from_table(name, tbl, u.arcsec, u.arcsec)
+        new_tbl.replace_column(name, Column(np.ascontiguousarray(arr),
+                                            name=name, unit=u.arcsec))
+        new_tbl.meta[name + "_unit"] = "arcsec"
+
+    ref = np.asarray(tbl["ref"]).astype(np.int32) + ref_offset
+    new_tbl.replace_column("ref", Column(ref, name="ref"))
+
+    if "weight" in tbl.colnames:
+        weight = np.asarray(tbl["weight"], dtype=np.float32)
+        new_tbl.replace_column("weight", Column(weight, name="weight"))
+    else:
+        weight = np.ones(len(tbl), dtype=np.float32)
+        new_tbl.add_column(Column(name="weight", data=weight))
+
+    return new_tbl
+
+
 def convert_to_list_of_spectra(spectra, lam):
     spectra_list = []
-    if isinstance(spectra, SourceSpectrum):
+    if isinstance(spectra, SpectralLibrary):
+        spectra_list = spectra
+
+    elif isinstance(spectra, SourceSpectrum):
         spectra_list += [spectra]
 
     elif lam is None and\
@@ -67,6 +129,205 @@ def convert_to_list_of_spectra(spectra, lam):
     return spectra_list
 
 
+def spectra_to_arrays(spectra, default_waves=None):
+    """
+    Samples a list of spectra onto flat lookup table arrays
+
+    Each spectrum is evaluated on its own ``waveset``. Spectra without a
+    waveset (e.g. ``ConstFlux1D``) are evaluated on ``default_waves``.
+
+    Parameters
+    ----------
+    spectra : list of synphot.SourceSpectrum, synphot.SpectralElement
+    default_waves : array, optional
+        [Angstrom] Default is a geometric grid of 1000 points between
+        ``!SIM.spectral.wave_min`` and ``!SIM.spectral.wave_max``
+
+    Returns
+    -------
+    waves : np.ndarray
+        [Angstrom] The wavelengths of all spectra, one after the other
+    values : np.ndarray
+        [PHOTLAM] or [dimensionless] The values of the spectra at ``waves``
+    offsets : np.ndarray
+        int array of length ``len(spectra) + 1``. Spectrum ``i`` is stored in
+        ``waves[offsets[i]:offsets[i+1]]``
+
+    """
+    if default_waves is None:
+        wmin = utils.from_currsys("!SIM.spectral.wave_min")
+        wmax = utils.from_currsys("!SIM.spectral.wave_max")
+        default_waves = np.geomspace(wmin, wmax, 1000) * 1E4
+
+    waves, values, offsets = [], [], [0]
+    for spec in spectra:
+        wave = spec.waveset
+        wave = np.asarray(default_waves, dtype=float) if wave is None else \
+            wave.to(u.Angstrom).value
+        waves += [wave]
+        values += [spec(wave).value]
+        offsets += [offsets[-1] + len(wave)]
+
+    waves = np.concatenate(waves) if len(waves) > 0 else np.zeros(0)
+    values = np.concatenate(values) if len(values) > 0 else np.zeros(0)
+
+    return waves, values, np.array(offsets, dtype=np.int64)
+
+
+def arrays_to_spectra(waves, values, offsets, spec_class=SourceSpectrum):
+    """
+    Inverse of ``spectra_to_arrays``
+
+    Parameters
+    ----------
+    waves, values, offsets : np.ndarray
+        See ``spectra_to_arrays``
+    spec_class : class
+        SourceSpectrum or SpectralElement
+
+    Returns
+    -------
+    spectra : list of synphot objects
+
+    """
+    spectra = []
+    for i0, i1 in zip(offsets[:-1], offsets[1:]):
+        spectra += [spec_class(Empirical1D, points=np.array(waves[i0:i1]),
+                               lookup_table=np.array(values[i0:i1]))]
+
+    return spectra
+
+
+def rebin_spectra(spectra, wave_edges, rel_error=1E-3, throughput=None):
+    """
+    Resamples spectra onto the coarsest grid that keeps them within rel_error
+
+    The new grid is a subset of the original wavelength points, the
+    ``wave_edges`` (e.g. the FOV wavelength bin edges) and the throughput
+    wavelengths. Points are only dropped where linear interpolation between the
+    remaining points deviates from the original spectrum, and from the
+    spectrum times the throughput, by less than ``rel_error`` times the mean
+    flux of the interval. The flux in any wavelength range therefore changes by
+    less than ``rel_error``, also after the throughput is applied on the new
+    grid (e.g. by ``SurfaceList.apply_to``).
+
+    All spectra with a ``waveset`` are resampled, whatever their model, e.g.
+    also the ``CompoundModel`` of a scaled spectrum (``spec * 2``,
+    ``vega_spectrum(mag)``). The result is an ``Empirical1D`` spectrum.
+    Spectra without a waveset (e.g. ``ConstFlux1D``) are returned unchanged.
+    Outside the range of ``wave_edges`` only the nearest original point on
+    each side is kept.
+
+    Parameters
+    ----------
+    spectra : list of synphot.SourceSpectrum, SpectralLibrary
+    wave_edges : array-like, u.Quantity
+        [um] Wavelengths which must be grid points
+    rel_error : float, optional
+        Default 1E-3
+    throughput : tuple of np.ndarray, optional
+        ``(wave [Angstrom], throughput)``, e.g. from
+        ``SurfaceList.sampled_throughput``
+
+    Returns
+    -------
+    new_spectra : list of synphot.SourceSpectrum, SpectralLibrary
+
+    """
+    wave_edges = utils.quantify(wave_edges, u.um).to(u.Angstrom).value
+    wave_edges = np.unique(wave_edges)
+
+    thru_waves = np.zeros(0)
+    if throughput is not None:
+        thru_waves, thru = throughput
+        mask = (thru_waves > wave_edges[0]) * (thru_waves < wave_edges[-1])
+        thru_waves = thru_waves[mask]
+
+    def rows_to_check(waves, fluxes):
+        if throughput is None:
+            return fluxes
+        return np.vstack([fluxes, fluxes * np.interp(waves, *throughput)])
+
+    if isinstance(spectra, SpectralLibrary):
+        waves = _rebin_input_waves(spectra.waves, wave_edges, thru_waves)
+        keep = _coarse_grid_mask(waves, rows_to_check(waves, spectra(waves)),
+                                 wave_edges, rel_error)
+        if np.sum(keep) >= len(spectra.waves):
+            return spectra
+        return SpectralLibrary(waves[keep], spectra(waves[keep]))
+
+    new_spectra = []
+    for spec in spectra:
+        if spec.waveset is not None:
+            orig_waves = spec.waveset.to(u.Angstrom).value
+            waves = _rebin_input_waves(orig_waves, wave_edges, thru_waves)
+            fluxes = spec(waves).value
+            keep = _coarse_grid_mask(waves, rows_to_check(waves, fluxes[None]),
+                                     wave_edges, rel_error)
+            if np.sum(keep) < len(orig_waves):
+                new_spec = SourceSpectrum(Empirical1D, points=waves[keep],
+                                          lookup_table=fluxes[keep],
+                                          meta=spec.meta)
+                spec = new_spec
+        new_spectra += [spec]
+
+    return new_spectra
+
+
+def _rebin_input_waves(waves, wave_edges, extra_waves):
+    """The original points inside the edges, the edges and one point outside"""
+    i0, i1 = np.searchsorted(waves, [wave_edges[0], wave_edges[-1]])
+    i0, i1 = max(i0 - 1, 0), min(i1 + 1, len(waves))
+
+    return np.unique(np.concatenate([waves[i0:i1], wave_edges, extra_waves]))
+
+
+def _coarse_grid_mask(waves, fluxes, fixed_waves, rel_error):
+    """
+    Returns a mask of the points of ``waves`` needed to describe ``fluxes``
+
+    Segments which deviate from the (n_spectra, n_waves) ``fluxes`` by more
+    than ``rel_error`` are split at the worst point and at their middle, until
+    all segments of all spectra are good enough
+    """
+    n = len(waves)
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+    keep[np.searchsorted(waves, fixed_waves)] = True
+    if n < 3:
+        return keep
+
+    abs_fluxes = np.abs(fluxes)
+    cum_fluxes = np.zeros((len(fluxes), n + 1))
+    cum_fluxes[:, 1:] = np.cumsum(abs_fluxes, axis=1)
+    floor = 1E-10 * np.max(abs_fluxes, axis=1, keepdims=True) + 1E-300
+    index = np.arange(n)
+
+    while True:
+        knots = np.where(keep)[0]
+        seg = np.clip(np.searchsorted(knots, index, side="right") - 1,
+                      0, len(knots) - 2)
+        i0, i1 = knots[seg], knots[seg + 1]
+
+        frac = (waves - waves[i0]) / (waves[i1] - waves[i0])
+        chord = fluxes[:, i0] * (1 - frac) + fluxes[:, i1] * frac
+        mean = (cum_fluxes[:, i1 + 1] - cum_fluxes[:, i0]) / (i1 - i0 + 1)
+        dev = np.max(np.abs(chord - fluxes) / np.maximum(mean, floor), axis=0)
+        dev[keep] = 0
+
+        bad = np.maximum.reduceat(dev, knots[:-1]) > rel_error
+        if not np.any(bad):
+            break
+
+        # the last entry per segment, sorted by deviation, is the worst point
+        order = np.lexsort((dev, seg))
+        worst = order[np.r_[np.where(np.diff(seg[order]))[0], n - 1]]
+        keep[worst[bad]] = True
+        keep[(knots[:-1][bad] + knots[1:][bad]) // 2] = True
+
+    return keep
+
+
 def photons_in_range(spectra, wave_min, wave_max, area=None, bandpass=None):
     """
 
@@ -145,9 +406,11 @@ def make_imagehdu_from_table(x, y, flux, pix_scale=1*u.arcsec):
     ypix, xpix = the_wcs.wcs_world2pix(y.to(u.deg), x.to(u.deg), 1)
     yint, xint  = ypix.astype(int), xpix.astype(int)
 
-    image = np.zeros((np.max(xint) + 1, np.max(yint) + 1))
-    for ii in range(len(xint)):
-        image[xint[ii], yint[ii]] += flux[ii]
+    # a weighted 2D histogram: sum the fluxes falling in each pixel
+    shape = (np.max(xint) + 1, np.max(yint) + 1)
+    index = np.ravel_multi_index((xint, yint), shape, mode="wrap")
+    image = np.bincount(index, weights=np.asarray(flux, dtype=float),
+                        minlength=shape[0] * shape[1]).reshape(shape)
 
     hdu = fits.ImageHDU(data=image)
     hdu.header.extend(the_wcs.to_header())
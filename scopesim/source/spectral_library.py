@@ -0,0 +1,272 @@
+"""
+A dense array representation for large numbers of spectra
+
+``Source.spectra`` is normally a list of ``synphot.SourceSpectrum`` objects.
+For sources with many unique spectra (e.g. a galaxy catalogue with one SED per
+galaxy) evaluating each spectrum separately is slow. A ``SpectralLibrary``
+holds all spectra on one shared wavelength grid as a single
+``(n_spectra, n_wave)`` array, so that operations on all spectra are single
+numpy operations.
+
+A ``SpectralLibrary`` can be used in place of the list in ``Source.spectra``.
+It behaves like a list of ``SourceSpectrum`` objects (``len``, indexing,
+iteration), but these objects are only created when they are asked for.
+"""
+
+import numpy as np
+from astropy import units as u
+from synphot import SourceSpectrum, SpectralElement
+from synphot.models import Empirical1D
+
+from .. import utils
+
+
+class SpectralLibrary:
+    """
+    A set of spectra sampled on a common wavelength grid
+
+    Parameters
+    ----------
+    waves : array-like, u.Quantity
+        [Angstrom] Wavelength grid of length m. Floats are assumed to be in
+        Angstrom, as for ``synphot``
+    fluxes : array-like
+        [PHOTLAM] A (n, m) array with n spectra. Stored as float32
+
+    Examples
+    --------
+    ::
+
+        >>> lib = SpectralLibrary.from_spectra(list_of_source_spectra)
+        >>> src = Source(x=x, y=y, ref=ref, spectra=lib)
+
+    """
+    def __init__(self, waves, fluxes):
+        waves = utils.quantify(waves, u.Angstrom).to(u.Angstrom).value
+        self.waves = np.asarray(waves, dtype=float)
+        self.fluxes = np.atleast_2d(np.asarray(fluxes, dtype=np.float32))
+
+        if self.fluxes.shape[1] != len(self.waves):
+            raise ValueError("fluxes must have shape (n_spectra, {}): {}"
+                             "".format(len(self.waves), self.fluxes.shape))
+
+    @classmethod
+    def from_spectra(cls, spectra, waves=None):
+        """
+        Samples a list of synphot spectra onto a common wavelength grid
+
+        Parameters
+        ----------
+        spectra : list of synphot.SourceSpectrum
+        waves : array-like, u.Quantity, optional
+            [Angstrom] Default is the union of the wavesets of all spectra
+
+        Returns
+        -------
+        library : SpectralLibrary
+
+        """
+        if waves is None:
+            wavesets = [spec.waveset.to(u.Angstrom).value for spec in spectra
+                        if spec.waveset is not None]
+            if len(wavesets) == 0:
+                raise ValueError("waves must be given if no spectrum has a "
+                                 "waveset")
+            waves = np.unique(np.concatenate(wavesets))
+        waves = utils.quantify(waves, u.Angstrom).to(u.Angstrom).value
+
+        fluxes = np.zeros((len(spectra), len(waves)), dtype=np.float32)
+        for ii, spec in enumerate(spectra):
+            fluxes[ii] = spec(waves).value
+
+        return cls(waves, fluxes)
+
+    def __call__(self, waves, indexes=None):
+        """
+        Interpolates the spectra onto new wavelengths
+
+        Values outside the wavelength grid are set to the value at the nearest
+        edge of the grid, as for ``synphot.Empirical1D``
+
+        Parameters
+        ----------
+        waves : array-like, u.Quantity
+            [Angstrom]
+        indexes : list of int, optional
+            Which spectra to use. Default is all
+
+        Returns
+        -------
+        fluxes : np.ndarray
+            [PHOTLAM] Array of shape (len(indexes), len(waves))
+
+        """
+        waves = utils.quantify(waves, u.Angstrom).to(u.Angstrom).value
+        waves = np.clip(np.atleast_1d(waves), self.waves[0], self.waves[-1])
+        fluxes = self.fluxes if indexes is None else self.fluxes[indexes]
+
+        i1 = np.clip(np.searchsorted(self.waves, waves), 1,
+                     len(self.waves) - 1)
+        i0 = i1 - 1
+        frac = (waves - self.waves[i0]) / (self.waves[i1] - self.waves[i0])
+        new_fluxes = fluxes[:, i0] * (1 - frac) + fluxes[:, i1] * frac
+
+        return new_fluxes
+
+    def photons_in_range(self, wave_min, wave_max, area=None, indexes=None,
+                         bandpass=None):
+        """
+        Integrates all spectra over a wavelength range at once
+
+        Equivalent to ``source_utils.photons_in_range`` for synphot spectra.
+
+        Parameters
+        ----------
+        wave_min, wave_max : float, u.Quantity
+            [um]
+        area : float, u.Quantity, optional
+            [m2]
+        indexes : list of int, optional
+        bandpass : synphot.SpectralElement, optional
+
+        Returns
+        -------
+        counts : u.Quantity array
+            [ph / s / m2] if area is None
+            [ph / s] if area is passed
+
+        """
+        wave_min = utils.quantify(wave_min, u.um).to(u.Angstrom).value
+        wave_max = utils.quantify(wave_max, u.um).to(u.Angstrom).value
+
+        mask = (self.waves > wave_min) * (self.waves < wave_max)
+        x = np.concatenate([[wave_min], self.waves[mask], [wave_max]])
+        fluxes = self.fluxes if indexes is None else self.fluxes[indexes]
+        y = np.zeros((len(fluxes), len(x)))
+        y[:, 1:-1] = fluxes[:, mask]
+        y[:, [0, -1]] = self([wave_min, wave_max], indexes)
+
+        if isinstance(bandpass, SpectralElement):
+            y *= bandpass(x).value[None, :]
+
+        # counts = flux [ph s-1 cm-2] --> [ph s-1 m-2]
+        counts = 1E4 * np.trapz(y, x, axis=1)
+        counts = counts * u.ph * u.s**-1 * u.m**-2
+        if area is not None:
+            counts *= utils.quantify(area, u.m ** 2)
+
+        return counts
+
+    def apply_throughput(self, throughput, wave_min=None, wave_max=None):
+        """
+        Multiplies all spectra by a transmission curve, in place
+
+        If ``wave_min`` and ``wave_max`` are given, the spectra outside this
+        range are held at their (attenuated) values at the range edges. This is
+        what happens to the ``Empirical1D`` spectra that
+        ``SurfaceList.apply_to`` creates for lists of ``SourceSpectrum``
+
+        Parameters
+        ----------
+        throughput : synphot.SpectralElement, callable
+            Is evaluated once on the wavelength grid
+        wave_min, wave_max : float, u.Quantity, optional
+            [um]
+
+        Returns
+        -------
+        self : SpectralLibrary
+
+        """
+        waves = self.waves
+        fluxes = self.fluxes
+        if wave_min is not None and wave_max is not None:
+            wave_min = utils.quantify(wave_min, u.um).to(u.Angstrom).value
+            wave_max = utils.quantify(wave_max, u.um).to(u.Angstrom).value
+            waves = np.clip(waves, wave_min, wave_max)
+            if np.any(waves != self.waves):
+                fluxes = self(waves)
+
+        thru = throughput(waves * u.Angstrom)
+        thru = np.asarray(getattr(thru, "value", thru), dtype=np.float32)
+        self.fluxes = (fluxes * thru[None, :]).astype(np.float32, copy=False)
+
+        return self
+
+    def scale(self, factors, indexes=None):
+        """
+        Multiplies each spectrum by a factor, in place
+
+        Parameters
+        ----------
+        factors : float, array-like
+            One factor for all spectra, or one per spectrum in ``indexes``
+        indexes : list of int, optional
+
+        Returns
+        -------
+        self : SpectralLibrary
+
+        """
+        factors = np.asarray(factors, dtype=np.float32)
+        if factors.ndim == 1:
+            factors = factors[:, None]
+        if indexes is None:
+            self.fluxes *= factors
+        else:
+            self.fluxes[indexes] *= factors
+
+        return self
+
+    def to_spectra(self):
+        """Returns the spectra as a list of ``synphot.SourceSpectrum``"""
+        return [self[ii] for ii in range(len(self))]
+
+    def append(self, other):
+        """
+        Adds spectra to the library
+
+        Parameters
+        ----------
+        other : SpectralLibrary, list of SourceSpectrum
+            Resampled onto the wavelength grid of this library if needed
+
+        """
+        if isinstance(other, SpectralLibrary) and \
+                np.array_equal(other.waves, self.waves):
+            fluxes = other.fluxes
+        elif isinstance(other, SpectralLibrary):
+            fluxes = other(self.waves)
+        else:
+            fluxes = SpectralLibrary.from_spectra(list(other), self.waves).fluxes
+        self.fluxes = np.vstack([self.fluxes, fluxes.astype(np.float32)])
+
+    def __len__(self):
+        return len(self.fluxes)
+
+    def __getitem__(self, item):
+        if isinstance(item, (slice, list, np.ndarray)):
+            return SpectralLibrary(self.waves, self.fluxes[item])
+
+        return SourceSpectrum(Empirical1D, points=self.waves * u.Angstrom,
+                              lookup_table=self.fluxes[item].astype(float))
+
+    def __setitem__(self, item, spectrum):
+        self.fluxes[item] = spectrum(self.waves * u.Angstrom).value
+
+    def __iter__(self):
+        for ii in range(len(self)):
+            yield self[ii]
+
+    def __add__(self, other):
+        new_lib = SpectralLibrary(self.waves, self.fluxes.copy())
+        new_lib.append(other)
+        return new_lib
+
+    def __radd__(self, other):
+        return list(other) + self.to_spectra()
+
+    def __repr__(self):
+        return "SpectralLibrary with {} spectra on {} wavelength bins " \
+               "[{:.4g}, {:.4g}] AA".format(len(self), len(self.waves),
+                                            self.waves[0], self.waves[-1])
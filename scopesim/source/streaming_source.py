@@ -0,0 +1,155 @@
+"""
+A Source which reads a large catalogue file in chunks of rows
+
+``Source(filename=...)`` reads a whole catalogue into memory. For catalogues
+with tens of millions of rows this is not possible. A ``StreamingSource`` only
+keeps the filename and the spectra, and creates a normal ``Source`` object for
+each block of ``chunk_size`` rows when it is iterated over.
+``OpticalTrain.observe`` accepts a ``StreamingSource`` and adds up the
+contributions of all chunks, so that peak memory depends on the chunk size and
+not on the size of the catalogue.
+"""
+
+from copy import deepcopy
+from itertools import islice
+
+from astropy.table import Table
+from astropy.io import ascii as ioascii
+from astropy.io import fits
+from synphot import SpectralElement
+
+from .source import Source
+from .source_utils import convert_to_list_of_spectra
+from .. import utils
+
+
+class StreamingSource:
+    """
+    A catalogue Source which is read from file in chunks of rows
+
+    Parameters
+    ----------
+    filename : str
+        Path to a catalogue with at least the columns "x", "y", "ref". Either
+        a FITS file with a binary table in extension 1, or an ASCII file
+        (e.g. ECSV, CSV) where the column names follow the comment lines.
+        FITS rows are read via a memory map
+    spectra : list of synphot.SourceSpectrum, SpectralLibrary, np.ndarray
+        The spectra referenced by the "ref" column. See ``Source``
+    lam : np.ndarray, optional
+        Needed if spectra is passed as an array. See ``Source``
+    chunk_size : int, optional
+        Number of rows per chunk. Default is
+        ``!SIM.computing.source_chunk_size``
+    kwargs
+        Added to the ``.meta`` dict of each chunk ``Source``
+
+    Examples
+    --------
+    ::
+
+        >>> src = StreamingSource("galaxies.fits", spectra=seds,
+        ...                       chunk_size=10**6)
+        >>> opt.observe(src)
+
+    """
+    def __init__(self, filename, spectra, lam=None, chunk_size=None,
+                 **kwargs):
+        self.filename = utils.find_file(filename)
+        if self.filename is None:
+            raise ValueError("filename was not found: {}".format(filename))
+
+        self.spectra = convert_to_list_of_spectra(spectra, lam)
+        self.bandpass = None
+        self.meta = {"chunk_size": "!SIM.computing.source_chunk_size"}
+        if chunk_size is not None:
+            self.meta["chunk_size"] = chunk_size
+        self.meta.update(kwargs)
+
+    def iter_tables(self):
+        """
+        Yields the catalogue as a series of ``Table`` objects
+
+        Yields
+        ------
+        tbl : astropy.Table
+            At most ``chunk_size`` rows of the catalogue
+
+        """
+        chunk_size = int(utils.from_currsys(self.meta["chunk_size"]))
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be a positive integer: {}"
+                             "".format(chunk_size))
+
+        if utils.is_fits(self.filename):
+            tables = _iter_fits_tables(self.filename, chunk_size)
+        else:
+            tables = _iter_ascii_tables(self.filename, chunk_size)
+
+        for tbl in tables:
+            yield tbl
+
+    def __iter__(self):
+        """
+        Yields a ``Source`` object for each chunk of the catalogue
+
+        The chunks share the spectra of the StreamingSource, only the rows of
+        the catalogue are new for each chunk. Effects which alter the spectra
+        should therefore be applied once to (a copy of) ``.spectra``, not to
+        every chunk. ``OpticalTrain.observe`` does this
+        """
+        meta = {key: val for key, val in self.meta.items()
+                if key != "chunk_size"}
+        for tbl in self.iter_tables():
+            src = Source(table=tbl, spectra=self.spectra, **meta)
+            if self.bandpass is not None:
+                src.add_bandpass(self.bandpass)
+            yield src
+
+    def add_bandpass(self, bandpass):
+        if not isinstance(bandpass, SpectralElement):
+            raise ValueError("type(bandpass) must be synphot.SpectralElement")
+
+        self.bandpass = bandpass
+
+    def __repr__(self):
+        return "StreamingSource: {} in chunks of {} rows, referencing {} " \
+               "spectra".format(self.filename, self.meta["chunk_size"],
+                                len(self.spectra))
+
+
+def _iter_fits_tables(filename, chunk_size):
+    with fits.open(filename, memmap=True) as hdulist:
+        meta = dict(hdulist[0].header)
+        meta.update(dict(hdulist[1].header))
+        data = hdulist[1].data
+        comments = None
+        for i0 in range(0, len(data), chunk_size):
+            # slicing the memmap only reads these rows from disk
+            tbl = Table(data[i0:i0 + chunk_size], meta=deepcopy(meta))
+            if comments is None:
+                comments = utils.convert_table_comments_to_dict(tbl)
+            tbl.meta.update(comments)
+            yield tbl
+
+
+def _iter_ascii_tables(filename, chunk_size):
+    with open(filename) as f:
+        # the header is the comment block plus the column names line
+        header = []
+        line = f.readline()
+        while line.startswith("#") or (line and not line.strip()):
+            header += [line]
+            line = f.readline()
+        header += [line]
+
+        comments = None
+        while True:
+            rows = list(islice(f, chunk_size))
+            if len(rows) == 0:
+                break
+            tbl = ioascii.read(header + rows)
+            if comments is None:
+                comments = utils.convert_table_comments_to_dict(tbl)
+            tbl.meta.update(comments)
+            yield tbl
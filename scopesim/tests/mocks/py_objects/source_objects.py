@@ -163,3 +163,21 @@ def _vega_source(mag=0, x=0, y=0):
     tbl_source = Source(table=tbl, spectra=specs)
 
     return tbl_source
+
+
+def _cube_source(n_pix=50, n_wave=20, pixel_scale=0.2):
+    """
+    A flat cube of 1 ph s-1 m-2 um-1 per pixel from 0.975 to 1.975 um
+    """
+    data = np.ones((n_wave, n_pix, n_pix), dtype=np.float32)
+    hdu = fits.ImageHDU(data=data)
+    hdu.header.update({"CTYPE1": "RA---TAN", "CTYPE2": "DEC--TAN",
+                       "CUNIT1": "arcsec", "CUNIT2": "arcsec",
+                       "CDELT1": pixel_scale, "CDELT2": pixel_scale,
+                       "CRVAL1": 0, "CRVAL2": 0,
+                       "CRPIX1": n_pix / 2, "CRPIX2": n_pix / 2,
+                       "CTYPE3": "WAVE", "CUNIT3": "um", "CDELT3": 0.05,
+                       "CRVAL3": 1.0, "CRPIX3": 1,
+                       "BUNIT": "ph s-1 m-2 um-1"})
+
+    return Source(cube=hdu)
@@ -3,12 +3,15 @@
 import pytest
 import numpy as np
 from astropy import wcs
+from astropy import units as u
+from astropy.table import Table
 from astropy.io import ascii as ioascii, fits
 
 from scopesim.utils import parallactic_angle, deriv_polynomial2d
 from scopesim.utils import find_file, has_needed_keywords
 from scopesim.utils import airmass2zendist, zendist2airmass
 from scopesim.utils import convert_table_comments_to_dict
+from scopesim.utils import array_from_table
 
 from scopesim import rc
 
@@ -162,3 +165,22 @@ class TestHasWcsKeys:
         hdr["NAXIS1"] = 100
         assert has_needed_keywords(hdr, "D")
 
+
+class TestArrayFromTable:
+    def test_returns_column_data_without_copy_for_same_unit(self):
+        tbl = Table(names=["x"], data=[[1., 2.]])
+        tbl["x"].unit = u.arcsec
+        arr = array_from_table("x", tbl, u.arcsec)
+        arr[0] = 5
+        assert tbl["x"][0] == 5
+
+    def test_converts_units_from_meta(self):
+        tbl = Table(names=["x"], data=[[1., 2.]], meta={"x_unit": "arcmin"})
+        arr = array_from_table("x", tbl, u.arcsec)
+        assert np.all(arr == [60, 120])
+        assert isinstance(arr, np.ndarray)
+
+    def test_uses_default_unit_if_none_given(self):
+        tbl = Table(names=["x"], data=[[3600.]])
+        arr = array_from_table("x", tbl, u.deg, default_unit=u.arcsec)
+        assert arr[0] == 1
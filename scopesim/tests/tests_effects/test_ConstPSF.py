@@ -78,7 +78,8 @@ class TestGetKernel:
         fov.hdu.header["CDELT1"] *= factor
         fov.hdu.header["CDELT2"] *= factor
 
-        constpsf = FieldConstantPSF(filename="test_ConstPSF.fits")
+        constpsf = FieldConstantPSF(filename="test_ConstPSF.fits",
+                                    truncate_kernel=False)
         kernel = constpsf.get_kernel(fov)
 
         psf_shape = np.array(constpsf._file[2].data.shape)
@@ -86,6 +87,22 @@ class TestGetKernel:
 
         assert np.all(kernel_shape == psf_shape / factor)
 
+    def test_kernel_is_truncated_to_flux_accuracy(self):
+        fov = _centre_fov(n=10, waverange=[1.9, 2.5])
+        constpsf = FieldConstantPSF(filename="test_ConstPSF.fits")
+        kernel = constpsf.get_kernel(fov)
+
+        assert kernel.shape == (1, 1)
+        assert np.sum(kernel) == approx(1)
+
+    def test_kernel_is_not_truncated_if_turned_off(self):
+        fov = _centre_fov(n=10, waverange=[1.9, 2.5])
+        constpsf = FieldConstantPSF(filename="test_ConstPSF.fits",
+                                    truncate_kernel=False)
+        kernel = constpsf.get_kernel(fov)
+
+        assert kernel.shape == (5, 5)
+
 
 class TestApplyTo:
     @pytest.mark.parametrize("waves, max_pixel",
@@ -109,3 +126,31 @@ class TestApplyTo:
 
 
 
+
+    def test_halo_adds_back_truncated_flux(self):
+        fovs = []
+        for kwargs in [{"flux_accuracy": 0.7},
+                       {"flux_accuracy": 0.7, "kernel_halo": True}]:
+            fov = _centre_fov(n=10, waverange=[1.5, 1.7])
+            nax1, nax2 = fov.header["NAXIS1"], fov.header["NAXIS2"]
+            fov.hdu.data = np.zeros((nax2, nax1))
+            fov.hdu.data[nax2 // 2, nax1 // 2] = 1
+            constpsf = FieldConstantPSF(filename="test_ConstPSF.fits",
+                                        **kwargs)
+            fovs += [constpsf.apply_to(fov)]
+
+        # the truncated core alone is renormalised, the halo spreads the flux
+        assert np.sum(fovs[0].hdu.data) == approx(1)
+        assert np.sum(fovs[1].hdu.data) == approx(1)
+        assert np.max(fovs[1].hdu.data) < np.max(fovs[0].hdu.data)
+
+    def test_truncated_core_is_renormalised_without_changing_the_file(self):
+        fov = _centre_fov(n=10, waverange=[1.5, 1.7])
+        constpsf = FieldConstantPSF(filename="test_ConstPSF.fits",
+                                    flux_accuracy=0.7)
+        orig_data = np.copy(constpsf._file[2].data)
+        kernel = constpsf.get_kernel(fov)
+
+        assert kernel.shape[0] < orig_data.shape[0]
+        assert np.sum(kernel) == approx(1)
+        assert np.all(constpsf._file[2].data == orig_data)
@@ -73,7 +73,8 @@ class TestStrehlImageHDU:
 @pytest.mark.usefixtures("centre_fov")
 class TestGetKernel:
     def test_returns_array_with_single_kernel_from_fov(self):
-        fvpsf = FieldVaryingPSF(filename="test_FVPSF.fits")
+        fvpsf = FieldVaryingPSF(filename="test_FVPSF.fits",
+                                truncate_kernel=False)
         kernels = fvpsf.get_kernel(_centre_fov(n=10))
         assert np.all(kernels[0][0] == fvpsf._file[2].data[4])
         assert kernels[0][1] is None
@@ -84,7 +85,8 @@ class TestGetKernel:
         fov.hdu.header["CDELT1"] *= factor
         fov.hdu.header["CDELT2"] *= factor
 
-        fvpsf = FieldVaryingPSF(filename="test_FVPSF.fits")
+        fvpsf = FieldVaryingPSF(filename="test_FVPSF.fits",
+                                truncate_kernel=False)
         kernels = fvpsf.get_kernel(fov)
 
         psf_shape = np.array(fvpsf._file[2].data[0].shape)
@@ -92,6 +94,31 @@ class TestGetKernel:
 
         assert all(kernel_shape == psf_shape * factor)
 
+    def test_kernel_is_truncated_to_flux_accuracy(self):
+        fvpsf = FieldVaryingPSF(filename="test_FVPSF.fits")
+        kernels = fvpsf.get_kernel(_centre_fov(n=10))
+        layer = fvpsf._file[2].data[4]
+
+        assert kernels[0][0].shape[0] <= layer.shape[0]
+        assert np.sum(kernels[0][0]) >= \
+               (1 - fvpsf.meta["flux_accuracy"]) * np.sum(layer)
+
+    def test_core_and_halo_are_normalised_without_changing_the_file(self):
+        fvpsf = FieldVaryingPSF(filename="test_FVPSF.fits", kernel_halo=True,
+                                flux_accuracy=0.2)
+        fvpsf._file[2].data = fvpsf._file[2].data * 2 + 0.01
+        orig_data = np.copy(fvpsf._file[2].data)
+        for _ in range(2):
+            fov = _centre_fov(n=10)
+            fov.hdu.data = np.ones((10, 10))
+            fov.fields = [1]
+            fvpsf.apply_to(fov)
+
+        core, halo = fvpsf.kernel[0][0], fvpsf.halo[0]
+        assert halo is not None
+        assert np.sum(core) + np.sum(halo) == approx(1)
+        assert np.all(fvpsf._file[2].data == orig_data)
+
     def test_returns_four_arrays_when_fov_on_intersection(self):
         fov = _centre_fov(n=20)
         fov.hdu.header["CRVAL1"] -= 15/3600.
@@ -185,3 +212,45 @@ class TestFunctionGetStrehlCutout:
             plt.show()
 
         assert all(np.unique(strehl_hdu.data).astype(int) == [0, 1, 3, 4])
+
+
+class TestGetLayerMasks:
+    def test_single_layer_returned_without_mask_for_central_fov(self):
+        fvpsf = FieldVaryingPSF(filename="test_FVPSF.fits")
+        layer_ids, masks = fvpsf.get_layer_masks(_centre_fov(n=10).header)
+        assert len(layer_ids) == 1
+        assert masks[0] is None
+
+    def test_results_are_cached_by_header_geometry(self):
+        fvpsf = FieldVaryingPSF(filename="test_FVPSF.fits")
+        result1 = fvpsf.get_layer_masks(_centre_fov(n=10).header)
+        result2 = fvpsf.get_layer_masks(_centre_fov(n=10).header)
+        assert result1 is result2
+
+    def test_same_layers_as_strehl_cutout_for_shifted_fov(self):
+        centre_fov = _centre_fov(10)
+        centre_fov.hdu.header["CRVAL1"] -= 15/3600.
+        centre_fov.hdu.header["CRVAL2"] -= 15/3600.
+
+        fvpsf = FieldVaryingPSF(filename="test_FVPSF.fits")
+        layer_ids, masks = fvpsf.get_layer_masks(centre_fov.header)
+        strehl_hdu = psfs.get_strehl_cutout(centre_fov.header,
+                                            fvpsf.strehl_imagehdu)
+
+        assert layer_ids == list(np.unique(strehl_hdu.data))
+        assert len(masks) == len(layer_ids)
+
+
+class TestFunctionMakeStrehlMapFromTable:
+    def test_map_pixels_take_layer_of_nearest_catalogue_entry(self):
+        tbl = fits.BinTableHDU.from_columns([
+            fits.Column(name="x", format="E", array=[-10, 10, -10, 10]),
+            fits.Column(name="y", format="E", array=[-10, -10, 10, 10]),
+            fits.Column(name="layer", format="J", array=[0, 1, 2, 3])])
+        map_hdu = psfs.make_strehl_map_from_table(tbl)
+
+        assert map_hdu.data.shape == (21, 21)
+        assert map_hdu.data[0, 0] == 0
+        assert map_hdu.data[0, -1] == 1
+        assert map_hdu.data[-1, 0] == 2
+        assert map_hdu.data[-1, -1] == 3
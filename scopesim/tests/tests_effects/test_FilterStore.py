@@ -0,0 +1,125 @@
+import pytest
+from pytest import approx
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from astropy import units as u
+from synphot import SpectralElement
+
+from scopesim import utils
+from scopesim.effects import ter_curves_utils as ter_utils
+from scopesim.effects.filter_store import FilterStore, get_filter_store, \
+    set_filter_store
+
+
+class CountingFetcher:
+    """A local stand-in for the SVO service"""
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, filter_name):
+        self.calls += [filter_name]
+        if "Missing" in filter_name:
+            raise ValueError("Filter not found: {}".format(filter_name))
+        wave = np.linspace(19000, 24000, 51)
+        trans = np.where((wave > 20000) * (wave < 23000), 0.9, 0.)
+        return wave, trans
+
+
+@pytest.fixture(scope="function")
+def fetcher():
+    return CountingFetcher()
+
+
+@pytest.fixture(scope="function")
+def store(tmp_path, fetcher):
+    return FilterStore(path=str(tmp_path), fetchers=[fetcher])
+
+
+@pytest.mark.usefixtures("store", "fetcher")
+class TestGet:
+    def test_returns_spectral_element_from_fetcher(self, store, fetcher):
+        filt = store.get("Paranal/HAWKI.Ks")
+        assert isinstance(filt, SpectralElement)
+        assert filt(2.1 * u.um).value == approx(0.9)
+        assert fetcher.calls == ["Paranal/HAWKI.Ks"]
+
+    def test_second_call_is_served_from_memory(self, store, fetcher):
+        filt = store.get("Paranal/HAWKI.Ks")
+        assert store.get("Paranal/HAWKI.Ks") is filt
+        assert len(fetcher.calls) == 1
+
+    def test_new_store_reads_from_directory_without_fetching(self, tmp_path,
+                                                             store, fetcher):
+        store.get("Paranal/HAWKI.Ks")
+        offline_store = FilterStore(path=str(tmp_path), fetchers=[])
+        filt = offline_store.get("Paranal/HAWKI.Ks")
+        assert filt(2.1 * u.um).value == approx(0.9)
+        assert len(fetcher.calls) == 1
+        assert offline_store.names() == ["Paranal/HAWKI.Ks"]
+
+    def test_aliases_are_resolved(self, store, fetcher):
+        store.get("Ks")
+        assert fetcher.calls == [ter_utils.FILTER_DEFAULTS["Ks"]]
+
+    def test_returns_none_for_unknown_filter(self, store, tmp_path):
+        assert store.get("Nowhere/Missing.X") is None
+        assert FilterStore(path=str(tmp_path), fetchers=[]).get("Ks") is None
+
+    def test_least_recently_used_filter_is_dropped(self, tmp_path, fetcher):
+        store = FilterStore(path=str(tmp_path), fetchers=[fetcher],
+                            cache_size=2)
+        for name in ["A/B.1", "A/B.2", "A/B.1", "A/B.3"]:
+            store.get(name)
+        assert [key[0] for key in store._cache] == ["A/B.1", "A/B.3"]
+
+    def test_cached_names_are_not_searched_for_as_files(self, store,
+                                                        monkeypatch):
+        filt = store.get("Paranal/HAWKI.Ks")
+        calls = []
+
+        def find_file(*args, **kwargs):
+            calls.append(args)
+            return None
+
+        monkeypatch.setattr(utils, "find_file", find_file)
+        assert store.get("Paranal/HAWKI.Ks") is filt
+        assert calls == []
+
+
+@pytest.mark.usefixtures("store", "fetcher")
+class TestAdd:
+    def test_parallel_adds_are_all_listed(self, tmp_path):
+        names = ["Lab/Filter.{}".format(ii) for ii in range(40)]
+        wave, trans = CountingFetcher()("Lab/Filter.0")
+
+        def add(name):
+            FilterStore(path=str(tmp_path), fetchers=[]).add(name, wave, trans)
+
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(add, names))
+
+        assert FilterStore(path=str(tmp_path)).names() == sorted(names)
+        assert not any(".tmp" in fname for fname in os.listdir(tmp_path))
+
+
+@pytest.mark.usefixtures("store", "fetcher")
+class TestPopulate:
+    def test_fetches_all_names_and_returns_missing(self, store, fetcher):
+        missing = store.populate(["J", "Nowhere/Missing.X"])
+        assert missing == ["Nowhere/Missing.X"]
+        assert store.names() == [ter_utils.FILTER_DEFAULTS["J"]]
+
+
+@pytest.mark.usefixtures("store", "fetcher")
+class TestGetFilter:
+    def test_get_filter_uses_the_filter_store(self, store, fetcher):
+        old_store = get_filter_store()
+        set_filter_store(store)
+        try:
+            filt = ter_utils.get_filter("Ks")
+        finally:
+            set_filter_store(old_store)
+        assert isinstance(filt, SpectralElement)
+        assert len(fetcher.calls) == 1
@@ -0,0 +1,72 @@
+import pytest
+from pytest import approx
+import numpy as np
+
+from scopesim.effects import Vibration, FusedPSF, FieldConstantPSF
+from scopesim.optics.fov import FieldOfView
+from scopesim.optics.image_plane import ImagePlane
+from scopesim.tests.mocks.py_objects.header_objects import _fov_header, \
+                                                           _implane_header
+
+
+def _implane_with_point_sources():
+    implane = ImagePlane(_implane_header())
+    implane.hdu.data[75, 75] = 1
+    implane.hdu.data[20, 110] = 3
+    return implane
+
+
+@pytest.fixture(scope="function")
+def vibrations():
+    return [Vibration(fwhm=0.01, pixel_scale=0.004, name="vib1"),
+            Vibration(fwhm=0.02, pixel_scale=0.004, name="vib2")]
+
+
+@pytest.mark.usefixtures("vibrations")
+class TestInit:
+    def test_initialises_with_list_of_psfs(self, vibrations):
+        fused = FusedPSF(psf_effects=vibrations)
+        assert isinstance(fused, FusedPSF)
+        assert fused.meta["name"] == "vib1 + vib2"
+
+    def test_apply_to_classes_is_union_of_member_classes(self, vibrations):
+        fused = FusedPSF(psf_effects=vibrations)
+        assert fused.apply_to_classes == (vibrations[0].apply_to_classes,)
+
+
+@pytest.mark.usefixtures("vibrations")
+class TestApplyTo:
+    def test_result_equals_sequential_application(self, vibrations):
+        implane_seq = _implane_with_point_sources()
+        for vib in vibrations:
+            implane_seq = vib.apply_to(implane_seq)
+
+        fused = FusedPSF(psf_effects=vibrations)
+        implane_fused = fused.apply_to(_implane_with_point_sources())
+
+        assert implane_fused.data.shape == implane_seq.data.shape
+        assert np.allclose(implane_fused.data, implane_seq.data, atol=1e-12)
+        for key in ["CRPIX1D", "CRPIX2D"]:
+            assert implane_fused.header[key] == implane_seq.header[key]
+
+    def test_conserves_flux(self, vibrations):
+        fused = FusedPSF(psf_effects=vibrations)
+        implane = fused.apply_to(_implane_with_point_sources())
+        assert np.sum(implane.data) == approx(4)
+
+    def test_ignores_classes_no_member_applies_to(self, vibrations):
+        fov = FieldOfView(_fov_header(), waverange=[1.9, 2.4])
+        fov.hdu.data = np.ones((100, 100))
+        fused = FusedPSF(psf_effects=vibrations)
+        new_fov = fused.apply_to(fov)
+        assert new_fov.hdu.data.shape == (100, 100)
+
+
+class TestIsShiftInvariant:
+    def test_true_for_analytical_psf_in_full_mode(self):
+        vib = Vibration(fwhm=0.01, pixel_scale=0.004)
+        assert vib.is_shift_invariant
+
+    def test_false_for_same_convolve_mode(self):
+        vib = Vibration(fwhm=0.01, pixel_scale=0.004, convolve_mode="same")
+        assert not vib.is_shift_invariant
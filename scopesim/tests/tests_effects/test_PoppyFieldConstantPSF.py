@@ -0,0 +1,99 @@
+import os
+import pytest
+from pytest import approx
+
+import numpy as np
+
+from scopesim import rc
+from scopesim.effects import PoppyFieldConstantPSF
+from scopesim.effects import psf_utils as pu
+
+from scopesim.tests.mocks.py_objects.fov_objects import _centre_fov
+
+
+@pytest.fixture(scope="function")
+def psf_kwargs():
+    return {"diameter": 0.1, "inner_diameter": 0.02, "n_spiders": 3,
+            "spider_width": 0.002, "pupil_size": 64, "kernel_size": 31,
+            "wave_min": 0.8, "wave_max": 2.5}
+
+
+@pytest.fixture(scope="function")
+def cache_path(tmp_path):
+    old_path = rc.__currsys__["!SIM.file.cache_path"]
+    rc.__currsys__["!SIM.file.cache_path"] = str(tmp_path)
+    yield str(tmp_path)
+    rc.__currsys__["!SIM.file.cache_path"] = old_path
+
+
+class TestInit:
+    def test_errors_when_initialised_with_nothing(self):
+        with pytest.raises(ValueError):
+            PoppyFieldConstantPSF()
+
+    def test_initialises_with_diameter(self, psf_kwargs):
+        psf = PoppyFieldConstantPSF(**psf_kwargs)
+        assert isinstance(psf, PoppyFieldConstantPSF)
+
+    def test_waveset_covers_wavelength_range(self, psf_kwargs):
+        psf = PoppyFieldConstantPSF(**psf_kwargs)
+        assert psf._waveset[0] == approx(0.8)
+        assert psf._waveset[-1] == approx(2.5)
+        assert np.all(psf._waveset[1:] / psf._waveset[:-1] <= 1.05 + 1e-9)
+
+
+@pytest.mark.usefixtures("psf_kwargs")
+class TestGetKernel:
+    def test_returns_normalised_kernel(self, psf_kwargs):
+        psf = PoppyFieldConstantPSF(**psf_kwargs)
+        kernel = psf.get_kernel(_centre_fov(n=10, waverange=(1.0, 1.1)))
+        assert kernel.shape == (31, 31)
+        assert np.sum(kernel) == approx(1)
+        assert np.argmax(kernel) == 15 * 31 + 15
+
+    def test_kernel_broadens_with_wavelength(self, psf_kwargs):
+        psf = PoppyFieldConstantPSF(**psf_kwargs)
+        blue = psf.get_kernel(_centre_fov(n=10, waverange=(0.9, 1.0))).copy()
+        red = psf.get_kernel(_centre_fov(n=10, waverange=(2.2, 2.4)))
+        assert np.max(red) < np.max(blue)
+
+
+class TestPupilPsfCube:
+    def test_airy_disk_peak_matches_theory(self):
+        # peak pixel of a normalised Airy disk is (pi / 4) * (p * D / lambda)^2
+        # which is pi/16 for a pixel scale p of lambda / 2D
+        n, diameter, wave = 128, 1., 1.
+        pixel_scale = np.rad2deg(0.5 * wave * 1e-6 / diameter) * 3600
+        pupil = pu.make_pupil_mask(n, diameter)
+        cube = pu.pupil_psf_cube(pupil, diameter / n, [wave], pixel_scale, 127)
+        assert cube[0, 63, 63] == approx(np.pi / 16, rel=0.02)
+
+    def test_opd_reduces_peak(self):
+        pupil = pu.make_pupil_mask(64, 1.)
+        opd = np.random.RandomState(0).normal(0, 0.1, pupil.shape)
+        cube0 = pu.pupil_psf_cube(pupil, 1 / 64., [1.], 0.1, 31)
+        cube1 = pu.pupil_psf_cube(pupil, 1 / 64., [1.], 0.1, 31, opd=opd)
+        assert np.max(cube1) < np.max(cube0)
+
+
+@pytest.mark.usefixtures("cache_path")
+class TestDiskCache:
+    def test_cube_is_written_to_and_read_from_disk(self, cache_path,
+                                                   monkeypatch):
+        pupil = pu.make_pupil_mask(32, 1.)
+        cube1 = pu.get_pupil_psf_cube(pupil, 1 / 32., [1., 2.], 0.1, 15)
+        files = os.listdir(os.path.join(cache_path, "psfs"))
+        assert len(files) == 1
+
+        def no_calculation(*args, **kwargs):
+            raise AssertionError("cube should come from the disk cache")
+
+        monkeypatch.setattr(pu, "pupil_psf_cube", no_calculation)
+        cube2 = pu.get_pupil_psf_cube(pupil, 1 / 32., [1., 2.], 0.1, 15)
+        assert np.all(cube1 == cube2)
+
+    def test_different_configuration_gets_new_file(self, cache_path):
+        pupil = pu.make_pupil_mask(32, 1.)
+        pu.get_pupil_psf_cube(pupil, 1 / 32., [1.], 0.1, 15)
+        pu.get_pupil_psf_cube(pupil, 1 / 32., [1.], 0.2, 15)
+        assert len(os.listdir(os.path.join(cache_path, "psfs"))) == 2
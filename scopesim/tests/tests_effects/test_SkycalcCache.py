@@ -0,0 +1,105 @@
+import pytest
+from pytest import approx
+import os
+
+import numpy as np
+from astropy import units as u
+from astropy.table import Table
+
+from scopesim.effects import SkycalcTERCurve
+from scopesim.effects.skycalc_cache import SkycalcCache, get_skycalc_cache, \
+    set_skycalc_cache, normalise_query
+
+
+class CountingBackend:
+    """A local stand-in for the SkyCalc server"""
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, query):
+        self.calls += [query]
+        wave = np.linspace(0.3, 3, 271) * u.um
+        trans = np.ones(271) * 0.9 / query.get("airmass", 1.)
+        flux = np.ones(271) * u.Unit("ph s-1 m-2 um-1 arcsec-2")
+        return Table([wave, trans, flux], names=["lam", "trans", "flux"])
+
+
+@pytest.fixture(scope="function")
+def backend():
+    return CountingBackend()
+
+
+@pytest.fixture(scope="function")
+def cache(tmp_path, backend):
+    return SkycalcCache(path=str(tmp_path), backend=backend)
+
+
+class TestNormaliseQuery:
+    def test_numbers_of_any_type_give_the_same_query(self):
+        query_a = normalise_query({"pwv": 2, "airmass": np.float32(1.5)})
+        query_b = normalise_query({"airmass": 1.5, "pwv": 2.0})
+        assert query_a == query_b
+        assert list(query_a) == ["airmass", "pwv"]
+
+
+@pytest.mark.usefixtures("cache", "backend")
+class TestGet:
+    def test_first_call_queries_the_backend(self, cache, backend):
+        tbl = cache.get({"airmass": 1.5})
+        assert tbl["trans"][0] == approx(0.6)
+        assert len(backend.calls) == 1
+        assert os.path.exists(cache.filename({"airmass": 1.5}))
+
+    def test_same_query_is_read_from_disk(self, cache, backend):
+        cache.get({"airmass": 1.5, "pwv": 2})
+        tbl = cache.get({"pwv": 2.0, "airmass": 1.5})
+        assert len(backend.calls) == 1
+        assert tbl["lam"].unit == u.um
+        assert tbl["flux"].unit == u.Unit("ph s-1 m-2 um-1 arcsec-2")
+
+    def test_different_queries_get_different_files(self, cache, backend):
+        tbls = [cache.get({"airmass": airmass}) for airmass in [1., 2.]]
+        assert tbls[1]["trans"][0] == approx(0.45)
+        assert len(backend.calls) == 2
+        assert len(os.listdir(cache.path)) == 2
+
+    def test_backend_gets_the_original_query_values(self, cache, backend):
+        cache.get({"pwv": 2, "observatory": "paranal"})
+        assert backend.calls[0] == {"pwv": 2, "observatory": "paranal"}
+        assert isinstance(backend.calls[0]["pwv"], int)
+
+    def test_parallel_threads_leave_one_complete_file(self, cache, backend):
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            tbls = list(pool.map(lambda _: cache.get({"airmass": 1.5}),
+                                 range(16)))
+        assert all(len(tbl) == 271 for tbl in tbls)
+        assert os.listdir(cache.path) == \
+            [os.path.basename(cache.filename({"airmass": 1.5}))]
+
+    def test_offline_mode_raises_on_cache_miss(self, tmp_path, cache,
+                                                backend):
+        cache.get({"airmass": 1.5})
+        offline_cache = SkycalcCache(path=str(tmp_path), backend=backend,
+                                     offline=True)
+        assert offline_cache.get({"airmass": 1.5})["trans"][0] == approx(0.6)
+        with pytest.raises(ValueError):
+            offline_cache.get({"airmass": 2.})
+        assert len(backend.calls) == 1
+
+
+@pytest.mark.usefixtures("cache", "backend")
+class TestSkycalcTERCurve:
+    def test_skycalc_ter_curve_uses_the_cache(self, cache, backend):
+        old_cache = get_skycalc_cache()
+        set_skycalc_cache(cache)
+        try:
+            sky_ters = [SkycalcTERCurve(airmass=1.5, pwv=2.5)
+                        for _ in range(2)]
+        finally:
+            set_skycalc_cache(old_cache)
+        assert len(backend.calls) == 1
+        assert backend.calls[0]["pwv"] == 2.5
+        thru = sky_ters[1].surface.transmission(1 * u.um)
+        assert thru.value == approx(0.6)
@@ -9,9 +9,12 @@ from synphot import SourceSpectrum
 
 from scopesim import rc
 from scopesim.effects import SurfaceList
+from scopesim.source import SpectralLibrary
 from scopesim.optics.radiometry import RadiometryTable
 
-from scopesim.tests.mocks.py_objects.source_objects import _image_source
+from scopesim.tests.mocks.py_objects.source_objects import _image_source, \
+    _cube_source
+from scopesim.tests.mocks.py_objects.fov_objects import _centre_fov
 from scopesim.tests.mocks.py_objects.effects_objects import _surf_list, \
     _surf_list_empty, _filter_surface
 
@@ -129,3 +132,161 @@ class TestApplyTo:
             plt.plot(wave, image_source.spectra[0](wave))
             plt.plot(wave, new_source.spectra[0](wave))
             plt.show()
+
+    def test_throughput_is_recorded_for_cube_fields(self, filter_surface,
+                                                    surf_list_empty):
+        surf_list_empty.add_surface(filter_surface, "filter")
+        src = surf_list_empty.apply_to(_cube_source())
+
+        wave = np.linspace(1.0, 1.9, 10) * u.um
+        thru_wave, thru = src.cube_throughput
+        assert np.interp(wave.to(u.AA).value, thru_wave, thru) == \
+            pytest.approx(surf_list_empty.throughput(wave).value)
+
+        im = src.image_in_range(1.0, 1.9, pixel_scale=0.2*u.arcsec)
+        im0 = _cube_source().image_in_range(1.0, 1.9,
+                                            pixel_scale=0.2*u.arcsec)
+        assert np.sum(im.image) < np.sum(im0.image)
+
+    def test_applied_to_spectral_library_same_as_to_spectra(self,
+                                                            filter_surface,
+                                                            surf_list_empty,
+                                                            image_source):
+        surf_list_empty.add_surface(filter_surface, "filter")
+        lib_source = deepcopy(image_source)
+        lib_source.spectra = SpectralLibrary.from_spectra(lib_source.spectra)
+        lib_source = surf_list_empty.apply_to(lib_source)
+        new_source = surf_list_empty.apply_to(deepcopy(image_source))
+
+        assert isinstance(lib_source.spectra, SpectralLibrary)
+        wave = np.linspace(1.5, 2.5, 100)*u.um
+        new_flux = new_source.spectra[0](wave).value
+        lib_flux = lib_source.spectra(wave)[0]
+        assert np.allclose(lib_flux, new_flux, rtol=1e-3,
+                           atol=1e-3 * np.max(new_flux))
+
+
+    def test_union_sampling_same_as_per_spectrum(self, filter_surface,
+                                                 surf_list_empty,
+                                                 image_source):
+        surf_list_empty.add_surface(filter_surface, "filter")
+        new_source = surf_list_empty.apply_to(deepcopy(image_source))
+        surf_list_empty.meta["throughput_sampling"] = "union"
+        lib_source = surf_list_empty.apply_to(deepcopy(image_source))
+
+        assert isinstance(lib_source.spectra, SpectralLibrary)
+        phs = new_source.photons_in_range(1.8, 2.6).value
+        lib_phs = lib_source.photons_in_range(1.8, 2.6).value
+        assert lib_phs == pytest.approx(phs, rel=1e-3)
+
+    def test_large_union_grid_falls_back_to_fixed_sampling(self,
+                                                           filter_surface,
+                                                           surf_list_empty,
+                                                           image_source):
+        surf_list_empty.add_surface(filter_surface, "filter")
+        surf_list_empty.meta["throughput_sampling"] = "union"
+        surf_list_empty.meta["max_library_size"] = 20
+        with pytest.warns(UserWarning):
+            lib_source = surf_list_empty.apply_to(deepcopy(image_source))
+
+        lib = lib_source.spectra
+        assert isinstance(lib, SpectralLibrary)
+        assert len(lib) * len(lib.waves) <= 20
+
+    def test_max_library_size_has_its_own_default(self, filter_surface,
+                                                  surf_list_empty,
+                                                  image_source):
+        surf_list_empty.add_surface(filter_surface, "filter")
+        surf_list_empty.meta["throughput_sampling"] = "union"
+        old_size = rc.__currsys__["!SIM.computing.max_library_size"]
+        rc.__currsys__["!SIM.computing.max_library_size"] = 20
+        try:
+            with pytest.warns(UserWarning):
+                lib_source = surf_list_empty.apply_to(deepcopy(image_source))
+        finally:
+            rc.__currsys__["!SIM.computing.max_library_size"] = old_size
+
+        lib = lib_source.spectra
+        assert len(lib) * len(lib.waves) <= 20
+
+    def test_fixed_sampling_resolves_the_filter_edges(self, filter_surface,
+                                                      surf_list_empty,
+                                                      image_source):
+        surf_list_empty.add_surface(filter_surface, "filter")
+        surf_list_empty.meta["throughput_sampling"] = 20001
+        lib_source = surf_list_empty.apply_to(deepcopy(image_source))
+
+        wave = np.linspace(1.8, 2.6, 100001) * u.um
+        flux = image_source.spectra[0](wave) * \
+            surf_list_empty.throughput(wave)
+        phs = np.trapz(flux, wave.to(u.AA)).value * 1E4     # [ph s-1 m-2]
+        lib_phs = lib_source.photons_in_range(1.8, 2.6).value
+        assert lib_phs == pytest.approx(phs, rel=1e-3)
+
+@pytest.fixture(scope="function")
+def warm_surf_list():
+    old_etendue = rc.__currsys__["!TEL.etendue"]
+    rc.__currsys__["!TEL.etendue"] = 1 * u.m**2 * u.arcsec**2
+    surf_list = _surf_list()
+    for surf in surf_list.radiometry_table.surfaces.values():
+        surf.meta["temperature"] = 20
+    yield surf_list
+    rc.__currsys__["!TEL.etendue"] = old_etendue
+
+
+@pytest.mark.usefixtures("warm_surf_list")
+class TestCollapse:
+    def test_emission_in_range_same_as_integrating_emission(self,
+                                                            warm_surf_list):
+        emission = warm_surf_list.get_emission(use_area=True)
+        wave = np.linspace(1.5, 1.6, 1001) * u.um
+        phs = (np.trapz(emission(wave), wave) * u.cm**2).to(u.Unit("ph s-1"))
+        new_phs = warm_surf_list.emission_in_range(1.5, 1.6)
+        assert new_phs.value == pytest.approx(phs.value, rel=1e-2)
+
+    def test_emission_in_range_works_on_arrays_of_ranges(self,
+                                                         warm_surf_list):
+        wave_min = np.array([1.5, 1.50001, 2.0, 1.0])
+        wave_max = np.array([1.6, 1.50002, 2.2, 2.5])
+        phs = warm_surf_list.emission_in_range(wave_min, wave_max)
+        assert phs.shape == (4,)
+        for ii in range(4):
+            single_phs = warm_surf_list.emission_in_range(wave_min[ii],
+                                                          wave_max[ii])
+            assert phs[ii].value == pytest.approx(single_phs.value)
+
+    def test_prepared_fovs_get_the_same_emission(self, warm_surf_list):
+        wave_edges = np.linspace(1.5, 1.6, 11)
+        fovs = [_centre_fov(n=5, waverange=(w0, w1))
+                for w0, w1 in zip(wave_edges[:-1], wave_edges[1:])]
+        warm_surf_list.prepare_fovs(fovs)
+        assert len(warm_surf_list._fov_emission) == 10
+        for fov in fovs:
+            fov.hdu.data = np.zeros((11, 11))
+            fov = warm_surf_list.apply_to(fov)
+            phs = warm_surf_list.emission_in_range(fov.meta["wave_min"],
+                                                   fov.meta["wave_max"])
+            assert fov.hdu.data[0, 0] == pytest.approx(phs.value)
+
+        warm_surf_list.prepare_fovs(None)
+        assert len(warm_surf_list._fov_emission) == 0
+
+    def test_sampled_curves_are_reused(self, warm_surf_list):
+        sampled = warm_surf_list._sampled_emission()
+        assert warm_surf_list._sampled_emission() is sampled
+        sampled = warm_surf_list._sampled_throughput()
+        assert warm_surf_list._sampled_throughput() is sampled
+
+    def test_sampled_curves_are_rebuilt_when_temperature_changes(
+            self, warm_surf_list):
+        phs = warm_surf_list.emission_in_range(1.5, 1.6)
+        surf = list(warm_surf_list.radiometry_table.surfaces.values())[1]
+        surf.meta["temperature"] = 40
+        assert warm_surf_list.emission_in_range(1.5, 1.6) > phs
+
+    def test_sampled_curves_are_rebuilt_when_surface_is_added(
+            self, warm_surf_list, filter_surface):
+        thru = warm_surf_list.collapse()["throughput"]
+        warm_surf_list.add_surface(filter_surface, "filter")
+        new_thru = warm_surf_list.collapse()["throughput"]
+        assert len(new_thru) != len(thru) or np.any(new_thru != thru)
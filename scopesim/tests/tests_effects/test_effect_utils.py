@@ -3,7 +3,7 @@ import pytest
 
 from scopesim import rc
 from scopesim.effects import effects_utils as e_utils, GaussianDiffractionPSF
-from scopesim.effects import SurfaceList
+from scopesim.effects import SurfaceList, Vibration, FusedPSF
 from scopesim.tests.mocks.py_objects.effects_objects import _surf_list, \
     _surf_list_empty, _filter_surface
 from scopesim.tests.mocks.py_objects.yaml_objects import _atmo_yaml_dict
@@ -75,3 +75,28 @@ class TestMakeRadiometryTable:
         len2 = len(rad_table.table)
         assert len2 == len1 + 1
 
+
+
+class TestCombinePsfEffects:
+    def test_consecutive_psfs_are_fused(self, filter_surface):
+        vibs = [Vibration(fwhm=0.01 * i, pixel_scale=0.004)
+                for i in range(1, 4)]
+        effects = e_utils.combine_psf_effects([filter_surface] + vibs)
+        assert len(effects) == 2
+        assert effects[0] is filter_surface
+        assert isinstance(effects[1], FusedPSF)
+        assert effects[1].psf_effects == vibs
+
+    def test_runs_separated_by_other_effects_are_not_fused(self,
+                                                           filter_surface):
+        vibs = [Vibration(fwhm=0.01 * i, pixel_scale=0.004)
+                for i in range(1, 3)]
+        effects = e_utils.combine_psf_effects([vibs[0], filter_surface,
+                                               vibs[1]])
+        assert effects == [vibs[0], filter_surface, vibs[1]]
+
+    def test_psfs_with_same_convolve_mode_are_not_fused(self):
+        vibs = [Vibration(fwhm=0.01, pixel_scale=0.004),
+                Vibration(fwhm=0.02, pixel_scale=0.004, convolve_mode="same")]
+        effects = e_utils.combine_psf_effects(vibs)
+        assert effects == vibs
@@ -0,0 +1,213 @@
+import pytest
+from pytest import approx
+
+import numpy as np
+from scipy.signal import convolve
+
+from scopesim.effects import psf_utils as pu
+
+
+@pytest.fixture(scope="function")
+def random_image():
+    np.random.seed(42)
+    return np.random.random((31, 37))
+
+
+class TestGetAnalyticKernel:
+    def test_returns_normalised_gaussian_kernel(self):
+        kernel = pu.get_analytic_kernel("gaussian", sigma=1.5)
+        assert np.sum(kernel) == approx(1)
+
+    def test_returns_same_object_for_same_parameters(self):
+        kernel1 = pu.get_analytic_kernel("gaussian", sigma=2., x_size=11,
+                                         y_size=11)
+        kernel2 = pu.get_analytic_kernel("gaussian", sigma=2., x_size=11,
+                                         y_size=11)
+        assert kernel1 is kernel2
+
+    def test_returns_different_kernels_for_different_parameters(self):
+        kernel1 = pu.get_analytic_kernel("gaussian", sigma=2.)
+        kernel2 = pu.get_analytic_kernel("gaussian", sigma=3.)
+        assert kernel1.shape != kernel2.shape
+
+    def test_cached_kernels_are_read_only(self):
+        kernel = pu.get_analytic_kernel("gaussian", sigma=2.)
+        with pytest.raises(ValueError):
+            kernel *= 2
+
+    @pytest.mark.parametrize("kind, kwargs", [("moffat", {"alpha": 2,
+                                                          "beta": 2.5}),
+                                              ("airy", {"radius": 3})])
+    def test_other_kernel_types_are_available(self, kind, kwargs):
+        kernel = pu.get_analytic_kernel(kind, **kwargs)
+        assert np.sum(kernel) == approx(1)
+
+    def test_throws_error_for_unknown_kernel_type(self):
+        with pytest.raises(ValueError):
+            pu.get_analytic_kernel("bogus", sigma=1)
+
+    def test_registered_kernel_functions_are_used(self):
+        pu.register_kernel("box", lambda width: np.ones((width, width)))
+        kernel = pu.get_analytic_kernel("box", width=3)
+        assert kernel.shape == (3, 3)
+        pu.KERNEL_FUNCTIONS.pop("box")
+
+
+class TestGaussianKernelWidth:
+    @pytest.mark.parametrize("flux_accuracy", [1e-2, 1e-3, 1e-5])
+    def test_wing_flux_is_below_flux_accuracy(self, flux_accuracy):
+        sigma = 2.5
+        width = pu.gaussian_kernel_width(sigma, flux_accuracy)
+        big = pu.gaussian_kernel(sigma, x_size=101, y_size=101)
+        dw = (101 - width) // 2
+        core = big[dw:-dw, dw:-dw]
+        assert width % 2 == 1
+        assert 1 - np.sum(core) < flux_accuracy
+
+    def test_width_shrinks_for_lower_accuracy(self):
+        assert pu.gaussian_kernel_width(3, 1e-2) < \
+               pu.gaussian_kernel_width(3, 1e-5)
+
+
+@pytest.mark.usefixtures("random_image")
+class TestConvolveKernel:
+    def test_gaussian_kernel_is_separable(self):
+        kernel = pu.gaussian_kernel(2., x_size=15, y_size=15)
+        assert pu.separate_kernel(kernel) is not None
+
+    def test_non_separable_kernel_is_detected(self):
+        kernel = np.eye(5)
+        assert pu.separate_kernel(kernel) is None
+
+    @pytest.mark.parametrize("mode", ["full", "same"])
+    def test_separable_result_equals_2d_convolution(self, random_image, mode):
+        kernel = pu.gaussian_kernel(1.7, x_size=11, y_size=9)
+        new_image = pu.convolve_kernel(random_image, kernel, mode=mode)
+        old_image = convolve(random_image, kernel, mode=mode)
+        assert new_image.shape == old_image.shape
+        assert np.allclose(new_image, old_image, rtol=1e-10, atol=1e-12)
+
+    def test_non_separable_result_equals_2d_convolution(self, random_image):
+        kernel = np.eye(5) / 5.
+        new_image = pu.convolve_kernel(random_image, kernel)
+        old_image = convolve(random_image, kernel)
+        assert np.allclose(new_image, old_image)
+
+
+@pytest.mark.usefixtures("random_image")
+class TestCombineKernels:
+    def test_combined_kernel_equals_sequential_convolution(self,
+                                                           random_image):
+        kernels = [pu.gaussian_kernel(1.2, x_size=7, y_size=7),
+                   np.eye(3) / 3.,
+                   pu.gaussian_kernel(0.8, x_size=5, y_size=9)]
+        seq_image = random_image
+        for kernel in kernels:
+            seq_image = convolve(seq_image, kernel, mode="full")
+        combined = pu.combine_kernels(kernels)
+        fused_image = pu.convolve_kernel(random_image, combined)
+
+        assert combined.shape == (17, 13)
+        assert np.allclose(fused_image, seq_image)
+
+    def test_empty_list_returns_unit_kernel(self):
+        assert np.all(pu.combine_kernels([]) == np.ones((1, 1)))
+
+
+@pytest.fixture(scope="function")
+def moffat():
+    return pu.moffat_kernel(3, 2.5, x_size=101, y_size=101)
+
+
+@pytest.mark.usefixtures("moffat")
+class TestTruncateKernel:
+    @pytest.mark.parametrize("flux_accuracy", [1e-2, 1e-3])
+    def test_core_contains_enough_flux(self, moffat, flux_accuracy):
+        core = pu.truncate_kernel(moffat, flux_accuracy)
+        assert core.shape[0] < moffat.shape[0]
+        assert np.sum(core) >= 1 - flux_accuracy
+
+    def test_core_stays_centred(self, moffat):
+        core = pu.truncate_kernel(moffat, 1e-2)
+        h, w = core.shape
+        assert h % 2 == 1 and w % 2 == 1
+        assert core[h // 2, w // 2] == np.max(moffat)
+
+    def test_box_shrinks_for_lower_accuracy(self, moffat):
+        core1 = pu.truncate_kernel(moffat, 1e-3)
+        core2 = pu.truncate_kernel(moffat, 1e-2)
+        assert core2.shape[0] < core1.shape[0]
+
+    def test_even_sized_kernels_are_cropped_symmetrically(self):
+        kernel = np.zeros((8, 8))
+        kernel[3:5, 3:5] = 0.25
+        y0, y1, x0, x1 = pu.encircled_energy_box(kernel, 1e-3)
+        assert (y0, y1, x0, x1) == (3, 5, 3, 5)
+
+    def test_halo_plus_core_conserves_flux(self, moffat):
+        image = np.zeros((64, 64))
+        image[32, 32] = 1
+        core = pu.truncate_kernel(moffat, 1e-2)
+        halo = pu.make_halo_kernel(moffat, 1e-2, binning=4)
+        new_image = pu.convolve_kernel(image, core, mode="same")
+        halo_image = pu.convolve_halo(image, halo, binning=4)
+
+        assert np.sum(halo) == approx(np.sum(moffat) - np.sum(core))
+        assert np.sum(new_image + halo_image) > np.sum(new_image)
+        assert np.sum(new_image + halo_image) == approx(1, rel=1e-2)
+
+    def test_no_halo_if_nothing_is_truncated(self):
+        assert pu.make_halo_kernel(np.ones((1, 1))) is None
+
+
+def _layer_map_hdu():
+    from astropy.io import fits
+    from scopesim.optics.image_plane_utils import header_from_list_of_xy
+
+    hdr = header_from_list_of_xy([-10 / 3600, 10 / 3600],
+                                 [-10 / 3600, 10 / 3600], 1 / 3600)
+    data = np.zeros((hdr["NAXIS2"], hdr["NAXIS1"]))
+    data[:, hdr["NAXIS1"] // 2:] = 1
+    return fits.ImageHDU(header=hdr, data=data)
+
+
+def _small_header(x, y, width=2):
+    from scopesim.optics.image_plane_utils import header_from_list_of_xy
+
+    return header_from_list_of_xy([(x - width) / 3600, (x + width) / 3600],
+                                  [(y - width) / 3600, (y + width) / 3600],
+                                  1 / 3600)
+
+
+class TestLayerMapIndex:
+    def test_single_layer_for_footprint_inside_one_layer(self):
+        index = pu.LayerMapIndex(_layer_map_hdu())
+        assert index.single_layer(_small_header(-5, 0)) == 0
+        assert index.single_layer(_small_header(5, 0)) == 1
+
+    def test_no_single_layer_for_footprint_on_border(self):
+        index = pu.LayerMapIndex(_layer_map_hdu())
+        assert index.single_layer(_small_header(0, 0)) is None
+
+    def test_layer_cutout_returns_both_layers_on_border(self):
+        index = pu.LayerMapIndex(_layer_map_hdu())
+        cutout = index.layer_cutout(_small_header(0, 0))
+        assert cutout.shape == (4, 4)
+        assert np.all(cutout[:, 0] == 0) and np.all(cutout[:, -1] == 1)
+        assert np.all(cutout == cutout[0])
+
+    def test_layer_cutout_has_the_shape_of_a_non_square_header(self):
+        from scopesim.optics.image_plane_utils import header_from_list_of_xy
+
+        hdr = header_from_list_of_xy([-6 / 3600, 6 / 3600],
+                                     [-2 / 3600, 2 / 3600], 1 / 3600)
+        cutout = pu.LayerMapIndex(_layer_map_hdu()).layer_cutout(hdr)
+        assert cutout.shape == (4, 12)
+        assert np.all(cutout == cutout[0])
+        assert np.all(np.diff(cutout[0]) >= 0)
+        assert cutout[0, 0] == 0 and cutout[0, -1] == 1
+
+    def test_layer_cutout_uses_nearest_layer_outside_the_map(self):
+        index = pu.LayerMapIndex(_layer_map_hdu())
+        cutout = index.layer_cutout(_small_header(30, 30))
+        assert np.all(cutout == 1)
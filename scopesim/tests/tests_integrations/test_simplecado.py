@@ -86,6 +86,32 @@ def test_simplecado(obs_dict, det_yaml):
     assert np.all(hdu[1].data == 2.0)
 
 
+@pytest.mark.usefixtures("obs_dict", "det_yaml")
+def test_empty_sky_skips_fovs_with_the_same_result(obs_dict, det_yaml,
+                                                   monkeypatch):
+    src = scopesim.source.source_templates.empty_sky()
+    cmd = sim.commands.UserCommands(yamls=[det_yaml], properties=obs_dict)
+    images = []
+    for fast_path in [False, True]:
+        opt = sim.OpticalTrain(cmd)
+        opt.cmds["!SIM.computing.background_fast_path"] = fast_path
+        n_fov_lists = []
+        generate_fovs_list = opt.fov_manager.generate_fovs_list
+
+        def counting_generate_fovs_list():
+            n_fov_lists.append(1)
+            return generate_fovs_list()
+
+        monkeypatch.setattr(opt.fov_manager, "generate_fovs_list",
+                            counting_generate_fovs_list)
+        opt.observe(src)
+        images += [opt.readout()[0][1].data]
+        assert len(n_fov_lists) == (0 if fast_path else 1)
+
+    assert np.all(images[0] == images[1])
+    assert np.all(images[1] == 2.0)
+
+
 @pytest.mark.usefixtures("obs_dict", "det_yaml")
 def test_setitem_in_optical_train(obs_dict, det_yaml):
     currsys = rc.__currsys__
@@ -13,7 +13,7 @@ import matplotlib.pyplot as plt
 from matplotlib.colors import LogNorm
 
 from scopesim.tests.mocks.py_objects.source_objects import _table_source, \
-    _image_source, _combined_source
+    _image_source, _combined_source, _cube_source
 from scopesim.tests.mocks.py_objects.header_objects import _basic_fov_header
 
 
@@ -84,6 +84,56 @@ class TestFieldOfViewExtractFrom:
         assert isinstance(the_fov.fields[0], Table)
         assert isinstance(the_fov.fields[1], fits.ImageHDU)
 
+    def test_integrates_cube_over_fov_wave_range(self, basic_fov_header):
+        src = _cube_source()
+        the_fov = fov.FieldOfView(basic_fov_header, (1, 2)*u.um, area=1*u.m**2)
+        the_fov.extract_from(src)
+        assert len(the_fov.fields) == 1
+        assert np.sum(the_fov.view()) == approx(50 * 50 * 0.975)
+
+    def test_table_positions_are_computed_once_per_footprint(
+            self, monkeypatch, basic_fov_header, table_source):
+        combine = scopesim.optics.fov_utils.combine_table_fields
+        calls = []
+
+        def counting_combine(*args, **kwargs):
+            calls.append(1)
+            return combine(*args, **kwargs)
+
+        monkeypatch.setattr(scopesim.optics.fov_utils, "combine_table_fields",
+                            counting_combine)
+        fovs = [fov.FieldOfView(basic_fov_header, (w, w + 0.1)*u.um,
+                                area=1*u.m**2) for w in [1.0, 1.5]]
+        fovs[1].hdu.header["CRPIX1D"] += 2
+        for the_fov in fovs:
+            the_fov.extract_from(table_source)
+
+        assert len(calls) == 1
+        tbls = [the_fov.fields[0] for the_fov in fovs]
+        xd, yd = scopesim.optics.fov_utils.sky2fp(fovs[1].hdu.header,
+                                                  np.asarray(tbls[1]["x"]),
+                                                  np.asarray(tbls[1]["y"]))
+        assert np.asarray(tbls[1]["x_mm"]) == approx(xd)
+        assert np.asarray(tbls[1]["y_mm"]) == approx(yd)
+        assert np.all(tbls[0]["x_mm"] != tbls[1]["x_mm"])
+        assert np.any(tbls[0]["flux"] != tbls[1]["flux"])
+
+    def test_table_positions_follow_changes_to_the_source(
+            self, basic_fov_header, table_source):
+        xs = []
+        for change in [None, "shift", "in_place"]:
+            if change == "shift":
+                table_source.shift(dx=0.2)
+            elif change == "in_place":
+                table_source.fields[0]["x"] += 0.1
+            the_fov = fov.FieldOfView(basic_fov_header, (1, 2)*u.um,
+                                      area=1*u.m**2)
+            the_fov.extract_from(table_source)
+            xs += [np.asarray(the_fov.fields[0]["x"])]
+
+        assert xs[1] - xs[0] == approx(0.2 / 3600)
+        assert xs[2] - xs[1] == approx(0.1 / 3600)
+
     def test_ignores_fields_outside_fov_boundary(self, basic_fov_header):
 
         src = _combined_source(dx=[200, 200, 200])
@@ -207,6 +257,45 @@ class TestIsFieldInFOV:
         assert scopesim.optics.fov_utils.is_field_in_fov(basic_fov_header, image_source.fields[0])
 
 
+@pytest.mark.usefixtures("basic_fov_header")
+class TestCullFaintSources:
+    def test_drops_faint_sources(self, basic_fov_header):
+        tbl = Table(names=["flux"], data=[[0.1, 5, 0.5, 10]])
+        bright, bg_hdu, n, flux = scopesim.optics.fov_utils.cull_faint_sources(
+            tbl, [1, 2, 3, 4], [1, 2, 3, 4], basic_fov_header, 1, mode="drop")
+        assert len(bright) == 2
+        assert bg_hdu is None
+        assert n == 2
+        assert flux == approx(0.6)
+
+    def test_background_conserves_flux(self, basic_fov_header):
+        n = 1000
+        xpix, ypix = np.random.random((2, n)) * 150
+        tbl = Table(names=["flux"], data=[np.random.random(n)])
+        bright, bg_hdu, n_culled, flux = \
+            scopesim.optics.fov_utils.cull_faint_sources(
+                tbl, xpix, ypix, basic_fov_header, 0.5, binning=7)
+        assert len(bright) + n_culled == n
+        assert bg_hdu.data.shape == (150, 150)
+        assert np.sum(bg_hdu.data) == approx(flux)
+        assert np.sum(bright["flux"]) + flux == approx(np.sum(tbl["flux"]))
+
+    def test_fov_reports_culled_sources(self, basic_fov_header, table_source):
+        the_fov = fov.FieldOfView(basic_fov_header, (1, 2)*u.um, area=1*u.m**2,
+                                  faint_source_culling="background",
+                                  minimum_pixel_flux=5)
+        the_fov.extract_from(table_source)
+        assert the_fov.meta["culled_sources"]["number"] == 2
+        assert len(the_fov.fields[0]) == 1
+        assert isinstance(the_fov.fields[1], fits.ImageHDU)
+        total = np.sum(the_fov.view())
+
+        the_fov = fov.FieldOfView(basic_fov_header, (1, 2)*u.um, area=1*u.m**2)
+        the_fov.extract_from(table_source)
+        assert "culled_sources" not in the_fov.meta
+        assert np.sum(the_fov.view()) == approx(total)
+
+
 class TestMakeFluxTable:
     def test_flux_in_equals_flux_out(self):
         pass
@@ -217,6 +306,72 @@ class TestCombineTableFields:
         pass
 
 
+@pytest.mark.usefixtures("basic_fov_header")
 class TestCombineImageHDUFields:
     def test_flux_in_equals_flux_out(self):
         pass
+
+    def test_reprojects_once_for_fovs_with_same_footprint(self, monkeypatch,
+                                                          basic_fov_header):
+        src = _image_source()
+        reproject = scopesim.optics.image_plane_utils.reproject_imagehdu
+        calls = []
+
+        def counting_reproject(*args, **kwargs):
+            calls.append(1)
+            return reproject(*args, **kwargs)
+
+        monkeypatch.setattr(scopesim.optics.image_plane_utils,
+                            "reproject_imagehdu", counting_reproject)
+        hdus = [scopesim.optics.fov_utils.combine_imagehdu_fields(
+                    basic_fov_header, src, [0], wave_min, wave_min + 0.1, 1)
+                for wave_min in [1.0, 1.5, 2.0]]
+
+        assert len(calls) == 1
+        fluxes = [src.photons_in_range(wave_min, wave_min + 0.1, 1)[0].value
+                  for wave_min in [1.0, 1.5, 2.0]]
+        assert np.sum(hdus[2].data) / np.sum(hdus[0].data) == \
+               approx(fluxes[2] / fluxes[0])
+
+    def test_does_not_alter_source_field(self, basic_fov_header):
+        src = _image_source()
+        header = src.fields[0].header.copy()
+        data = src.fields[0].data.copy()
+        scopesim.optics.fov_utils.combine_imagehdu_fields(basic_fov_header,
+                                                          src, [0], 1, 2, 1)
+        assert src.fields[0].header == header
+        assert np.all(src.fields[0].data == data)
+
+
+@pytest.mark.usefixtures("basic_fov_header")
+class TestExtractCubeSlab:
+    def test_integrates_flux_over_wave_range(self, basic_fov_header):
+        cube = _cube_source().fields[0]
+        slab = scopesim.optics.fov_utils.extract_cube_slab(
+            cube, basic_fov_header, 1.0, 1.5, area=2*u.m**2)
+        assert slab.data.shape == (50, 50)
+        assert np.all(slab.data == approx(2 * 0.5))
+
+    def test_slices_are_weighted_by_mean_throughput(self, basic_fov_header):
+        cube = _cube_source().fields[0]
+        throughput = (np.array([10000, 15000]), np.array([0., 1.]))
+        slab = scopesim.optics.fov_utils.extract_cube_slab(
+            cube, basic_fov_header, 1.0, 1.5, area=2*u.m**2,
+            throughput=throughput)
+        assert np.all(slab.data == approx(2 * 0.5 * 0.5))
+
+        slab = scopesim.optics.fov_utils.extract_cube_slab(
+            cube, basic_fov_header, 1.02, 1.07, throughput=throughput)
+        assert np.all(slab.data == approx(0.05 * 0.09))
+
+    def test_only_reads_fov_cutout_of_large_cube(self, basic_fov_header):
+        cube = _cube_source(n_pix=300).fields[0]
+        slab = scopesim.optics.fov_utils.extract_cube_slab(
+            cube, basic_fov_header, 1.0, 1.5)
+        assert slab.data.shape[0] < 80 and slab.data.shape[1] < 80
+
+    def test_returns_none_outside_wave_range(self, basic_fov_header):
+        cube = _cube_source().fields[0]
+        slab = scopesim.optics.fov_utils.extract_cube_slab(
+            cube, basic_fov_header, 2.0, 2.5)
+        assert slab is None
@@ -859,6 +859,33 @@ class TestSubPixelFractions:
         assert pytest.approx(ff == ff_exp)
 
 
+class TestSubPixelWeights:
+    def test_same_as_sub_pixel_fractions_for_many_points(self):
+        x = np.random.uniform(-5, 5, 50)
+        y = np.random.uniform(-5, 5, 50)
+        xx, yy, ff = imp_utils.sub_pixel_weights(x, y)
+        for ii in range(len(x)):
+            xx_i, yy_i, ff_i = imp_utils.sub_pixel_fractions(x[ii], y[ii])
+            assert np.all(xx[ii] == xx_i)
+            assert np.all(yy[ii] == yy_i)
+            assert ff[ii] == approx(ff_i)
+
+
+class TestPointsToImage:
+    def test_sums_fluxes_of_points_in_same_pixel(self):
+        image = imp_utils.points_to_image([1.2, 1.7, 3.1], [2.2, 2.9, 0.5],
+                                          [1, 2, 4], shape=(4, 5))
+        assert image[2, 1] == 3
+        assert image[0, 3] == 4
+        assert np.sum(image) == 7
+
+    def test_sub_pixel_splits_flux_and_drops_points_outside(self):
+        image = imp_utils.points_to_image([1.5, 10], [1.5, 1], [4, 1],
+                                          shape=(4, 4), sub_pixel=True)
+        assert np.all(image[1:3, 1:3] == 1)
+        assert np.sum(image) == 4
+
+
 @pytest.mark.usefixtures("image_hdu_square", "image_hdu_rect")
 class TestImagePlaneInit:
     def test_throws_error_when_initialised_with_nothing(self):
@@ -6,6 +6,7 @@ from pytest import approx
 import numpy as np
 from astropy import units as u
 from astropy.table import Table
+from synphot import SourceSpectrum, Empirical1D
 
 import scopesim as sim
 from scopesim import rc
@@ -15,7 +16,7 @@ from scopesim.optics.optical_train import OpticalTrain
 from scopesim.optics.optics_manager import OpticsManager
 from scopesim.optics.optical_element import OpticalElement
 from scopesim.commands.user_commands import UserCommands
-from scopesim.effects import Effect, DetectorList, DarkCurrent
+from scopesim.effects import Effect, DetectorList, DarkCurrent, SurfaceList
 from scopesim.utils import find_file
 
 from scopesim.tests.mocks.py_objects import source_objects as src_objs
@@ -196,6 +197,131 @@ class TestObserve:
             plt.show()
 
 
+    def test_streaming_source_chunks_add_up_to_whole_source(self, cmds,
+                                                            tbl_src, tmp_path):
+        filename = str(tmp_path / "catalogue.fits")
+        tbl = tbl_src.fields[0]
+        Table([tbl[col].value for col in tbl.colnames],
+              names=tbl.colnames).write(filename)
+        stream_src = sim.StreamingSource(filename, spectra=tbl_src.spectra,
+                                         chunk_size=1)
+
+        opt = OpticalTrain(cmds)
+        fovs = opt.fov_manager.fovs
+        opt._extract_chunks(stream_src, fovs)
+        stream_images = [np.copy(fov.data) for fov in fovs]
+
+        source = opt._apply_source_effects(deepcopy(tbl_src))
+        for fov, stream_image in zip(fovs, stream_images):
+            fov.fields = []
+            fov.extract_from(source)
+            assert np.allclose(stream_image, fov.view())
+        assert np.sum(stream_images) > 0
+
+    def test_fov_emission_is_dropped_if_a_fov_effect_fails(self, cmds,
+                                                           tbl_src,
+                                                           monkeypatch):
+        class FailingEffect:
+            def apply_to(self, obj):
+                raise ValueError("failing FOV effect")
+
+        calls = []
+        monkeypatch.setattr(SurfaceList, "prepare_fovs",
+                            lambda self, fovs=None: calls.append(fovs))
+        monkeypatch.setattr(OpticsManager, "fov_effects",
+                            property(lambda self: [FailingEffect(),
+                                                   SurfaceList()]))
+        opt = OpticalTrain(cmds)
+        with pytest.raises(ValueError):
+            opt.observe(tbl_src)
+        assert len(calls) == 2 and len(calls[0]) > 0
+        assert calls[-1] is None
+
+    def test_culled_sources_are_counted_over_all_chunks(self, cmds, tbl_src,
+                                                        tmp_path):
+        filename = str(tmp_path / "catalogue.fits")
+        tbl = tbl_src.fields[0]
+        Table([tbl[col].value for col in tbl.colnames],
+              names=tbl.colnames).write(filename)
+        stream_src = sim.StreamingSource(filename, spectra=tbl_src.spectra,
+                                         chunk_size=1)
+
+        opt = OpticalTrain(cmds)
+        fovs = opt.fov_manager.fovs
+        for fov in fovs:
+            fov.meta["faint_source_culling"] = "drop"
+            fov.meta["minimum_pixel_flux"] = 1e99
+        opt._extract_chunks(stream_src, fovs)
+        stream_culled = [fov.meta["culled_sources"] for fov in fovs
+                         if "culled_sources" in fov.meta]
+
+        source = opt._apply_source_effects(deepcopy(tbl_src))
+        for fov in fovs:
+            fov.fields = []
+            fov.meta.pop("culled_sources", None)
+            fov.extract_from(source)
+        culled = [fov.meta["culled_sources"] for fov in fovs
+                  if "culled_sources" in fov.meta]
+
+        assert sum(c["number"] for c in culled) == len(tbl)
+        for stream_c, c in zip(stream_culled, culled):
+            assert stream_c["number"] == c["number"]
+            assert stream_c["flux"] == approx(c["flux"])
+        assert stream_src.spectra[0] is tbl_src.spectra[0]
+
+    def test_culled_sources_are_not_summed_over_observations(self, cmds,
+                                                             tbl_src,
+                                                             monkeypatch):
+        monkeypatch.setattr(OpticsManager, "fov_effects",
+                            property(lambda self: []))
+        monkeypatch.setattr(OpticsManager, "image_plane_effects",
+                            property(lambda self: []))
+        opt = OpticalTrain(cmds)
+        # as with !SIM.computing.preload_field_of_views = True
+        opt.fov_manager._fovs_list = opt.fov_manager.generate_fovs_list()
+        opt.fov_manager.meta["preload_fovs"] = True
+        fovs = opt.fov_manager.fovs
+        for fov in fovs:
+            fov.meta["faint_source_culling"] = "drop"
+            fov.meta["minimum_pixel_flux"] = 1e99
+            # totals left over from a previous observation
+            fov.meta["culled_sources"] = {"number": 1000, "flux": 1e6}
+
+        opt.observe(tbl_src)
+        culled = [fov.meta["culled_sources"] for fov in fovs
+                  if "culled_sources" in fov.meta]
+
+        assert opt.fov_manager.fovs is fovs
+        assert sum(c["number"] for c in culled) == len(tbl_src.fields[0])
+        assert all(c["flux"] < 1e6 for c in culled)
+
+    def test_rebinned_spectra_give_the_same_fov_images(self, cmds, tbl_src):
+        # finely sampled spectra, as e.g. for R~100000 SEDs
+        wave = np.geomspace(4000, 30000, 100000)
+        tbl_src.spectra = [SourceSpectrum(Empirical1D, points=wave,
+                                          lookup_table=1 + np.sin(wave / 300))
+                           for _ in tbl_src.spectra]
+        opt = OpticalTrain(cmds)
+        fovs = opt.fov_manager.fovs
+        images = []
+        for flag in [False, True]:
+            rc.__currsys__["!SIM.computing.rebin_spectra"] = flag
+            try:
+                source = opt._apply_source_effects(deepcopy(tbl_src), fovs)
+            finally:
+                rc.__currsys__["!SIM.computing.rebin_spectra"] = False
+            n_waves = len(source.spectra[0].waveset)
+            for fov in fovs:
+                fov.fields = []
+                fov.extract_from(source)
+            images += [[np.copy(fov.view()) for fov in fovs]]
+
+        assert n_waves < len(wave) / 10
+        assert np.sum(images[1]) > 0
+        for image, rebinned_image in zip(*images):
+            assert np.allclose(image, rebinned_image, rtol=1e-3, atol=0)
+
+
 @pytest.mark.usefixtures("unity_cmds", "unity_src")
 class TestReadout:
     def test_readout_works_when_source_observed(self, unity_cmds, unity_src):
@@ -11,6 +11,7 @@ from astropy.io import ascii as ioascii
 from astropy import units as u
 
 from synphot import SpectralElement, SourceSpectrum
+from synphot.models import Empirical1D
 
 import scopesim.optics.radiometry_utils as rad_utils
 from scopesim import utils
@@ -80,6 +81,47 @@ class TestRadiometryTableAddSurfaceList:
         names = rad_table.table["name"]
         assert np.all(name in rad_table.surface for name in names)
 
+    def test_table_is_the_same_as_vstacked_tables(self, input_tables):
+        rad_table = opt_rad.RadiometryTable()
+        for tbl in input_tables:
+            rad_table.add_surface_list(tbl)
+        tbl_ref = rad_utils.combine_tables(input_tables)
+        assert rad_table.table.colnames == tbl_ref.colnames
+        for col in tbl_ref.colnames:
+            assert np.all(rad_table.table[col] == tbl_ref[col])
+
+    def test_prepended_tables_come_first(self, input_tables):
+        rad_table = opt_rad.RadiometryTable([input_tables[2]])
+        rad_table.add_surface_list(input_tables[:2], prepend=True)
+        tbl_ref = rad_utils.combine_tables(input_tables)
+        assert np.all(rad_table.table["name"] == tbl_ref["name"])
+
+    def test_table_is_only_rebuilt_after_changes(self, input_tables):
+        rad_table = opt_rad.RadiometryTable(input_tables)
+        tbl = rad_table.table
+        assert rad_table.table is tbl
+        rad_table.add_surface(opt_surf.SpectralSurface(), "new_surf", 3)
+        assert rad_table.table is not tbl
+        assert len(rad_table.table) == 20
+        assert rad_table.table["name"][3] == "new_surf"
+        assert list(rad_table.surfaces)[3] == "new_surf"
+
+    def test_column_dtypes_are_kept(self):
+        tbl = Table(names=["name", "temp", "n"],
+                    data=[["a", "b"], np.array([1., 2.], dtype=np.float32),
+                          np.array([1, 2], dtype=np.int16)])
+        rad_table = opt_rad.RadiometryTable([tbl])
+        assert rad_table.table["temp"].dtype == np.float32
+        assert rad_table.table["n"].dtype == np.int16
+
+    def test_table_view_is_read_only(self, input_tables):
+        rad_table = opt_rad.RadiometryTable(input_tables)
+        with pytest.raises(ValueError):
+            rad_table.table["temperature"][0] = 100
+        tbl = rad_table.table.copy()
+        tbl["temperature"][0] = 100
+        assert tbl["temperature"][0] == 100
+
 
 @pytest.mark.usefixtures("input_tables")
 class TestRadiometryTableAddSurface:
@@ -112,10 +154,12 @@ class TestRadiometryTableGetThroughput:
         thru = rt.get_throughput(start=1, end=3)
         assert isinstance(thru, SpectralElement)
 
-        if float(synphot_version()) < 0.2:
-            assert thru.model.n_submodels() == 2
-        else:
-            assert thru.model.n_submodels == 2
+        # the surfaces are combined into one flat Empirical1D curve
+        assert isinstance(thru.model, Empirical1D)
+        wave = np.linspace(0.5, 2.5, 11) * u.um
+        surfs = list(rt.surfaces.values())[1:3]
+        expected = surfs[0].reflection(wave) * surfs[1].reflection(wave)
+        assert np.allclose(thru(wave).value, expected.value)
 
     def test_return_none_for_empty_radiometry_table(self):
         rt = opt_rad.RadiometryTable()
@@ -136,11 +180,7 @@ class TestRadiometryTableGetEmission:
         etendue = 996 * u.m ** 2 * (0.004 * u.arcsec) ** 2
         emiss = rt.get_emission(etendue=etendue, start=1, end=3)
         assert isinstance(emiss, SourceSpectrum)
-
-        if float(synphot_version()) < 0.2:
-            assert emiss.model.n_submodels() == 9
-        else:
-            assert emiss.model.n_submodels == 9
+        assert isinstance(emiss.model, Empirical1D)
 
     def test_return_none_for_empty_radiometry_table(self):
         rt = opt_rad.RadiometryTable()
@@ -165,6 +205,25 @@ class TestCombineEmissions:
         combi = rad_utils.combine_emissions(tbl, dic, [0, 1, 2], etendue)
         assert isinstance(combi, SourceSpectrum)
 
+    def test_emission_is_attenuated_by_downstream_surfaces(self):
+        n = 11
+        surf = opt_surf.SpectralSurface(wavelength=np.linspace(1, 2, n) * u.um,
+                                        transmission=0.5*np.ones(n),
+                                        temperature=20*u.deg_C,
+                                        area=1*u.m**2,
+                                        angle=0*u.deg)
+        dic = {"surf" + str(i + 1): surf for i in range(3)}
+        tbl = ioascii.read(""" name action
+                surf1 transmission
+                surf2 transmission
+                surf3 transmission """)
+        etendue = 1 * u.m**2 * u.arcsec**2
+        combi = rad_utils.combine_emissions(tbl, dic, [0, 1, 2], etendue)
+
+        wave = np.linspace(1.1, 1.9, 9) * u.um
+        expected = surf.emission(wave).value * (0.25 + 0.5 + 1)
+        assert np.allclose(combi(wave).value, expected, rtol=1e-4)
+
     def test_returns_source_spectrum_for_full_path(self, input_tables):
         rt = opt_rad.RadiometryTable(tables=input_tables)
         row_list = np.arange(len(rt.table))
@@ -150,6 +150,27 @@ class TestSpectralSurfaceEmissionProperty:
                                  np.array([sr2arcsec]*n)))
 
 
+    def test_emission_is_reused_until_meta_changes(self):
+        n = 11
+        srf = opt_surf.SpectralSurface(wavelength=np.linspace(1, 2, n) * u.um,
+                                       transmission=0.5 * np.ones(n),
+                                       temperature=0*u.deg_C)
+        emission = srf.emission
+        assert srf.emission is emission
+
+        srf.meta["temperature"] = 20*u.deg_C
+        new_emission = srf.emission
+        assert new_emission is not emission
+        assert new_emission(1.5*u.um) > emission(1.5*u.um)
+
+    def test_clear_cache_rebuilds_emission(self):
+        srf = opt_surf.SpectralSurface(wavelength=[0.3, 3.0] * u.um,
+                                       transmission=[0.5, 0.5],
+                                       temperature=0*u.deg_C)
+        emission = srf.emission
+        srf.clear_cache()
+        assert srf.emission is not emission
+
 class TestSpectralSurfaceComplimentArray:
     @pytest.mark.parametrize("colname1, colname2, col1, col2, expected",
                              [("A", "B", [0.8]*u.um, [0.1]*u.um, [0.1]*u.um),
@@ -0,0 +1,97 @@
+import pytest
+from pytest import approx
+
+import numpy as np
+from astropy import units as u
+from synphot import SourceSpectrum, SpectralElement
+from synphot.models import Empirical1D, Gaussian1D
+
+from scopesim.source import SpectralLibrary
+from scopesim.source.source import Source
+from scopesim.source.source_utils import photons_in_range
+
+
+@pytest.fixture(scope="function")
+def spectra():
+    waves = np.linspace(8000, 25000, 501)
+    spectra = [SourceSpectrum(Empirical1D, points=waves,
+                              lookup_table=np.ones(501) * (ii + 1))
+               for ii in range(3)]
+    spectra += [SourceSpectrum(Gaussian1D, amplitude=1, mean=15000,
+                               stddev=500)]
+    return spectra
+
+
+@pytest.fixture(scope="function")
+def library(spectra):
+    return SpectralLibrary.from_spectra(spectra,
+                                        waves=np.linspace(7000, 26000, 3801))
+
+
+@pytest.mark.usefixtures("spectra", "library")
+class TestInit:
+    def test_initialises_with_arrays(self):
+        lib = SpectralLibrary(np.arange(10) * u.um, np.ones((5, 10)))
+        assert len(lib) == 5
+        assert lib.waves[-1] == approx(9E4)
+        assert lib.fluxes.dtype == np.float32
+
+    def test_throws_error_for_mismatched_shapes(self):
+        with pytest.raises(ValueError):
+            SpectralLibrary(np.arange(10), np.ones((5, 11)))
+
+    def test_from_spectra_uses_union_of_wavesets(self, spectra):
+        lib = SpectralLibrary.from_spectra(spectra[:3])
+        assert len(lib) == 3
+        assert len(lib.waves) == 501
+
+    def test_behaves_like_a_list_of_source_spectra(self, library):
+        assert isinstance(library[1], SourceSpectrum)
+        assert library[1](2 * u.um).value == approx(2)
+        assert len(list(library)) == 4
+        assert len(library[1:3]) == 2
+
+    def test_adding_libraries_stacks_the_fluxes(self, library, spectra):
+        new_lib = library + library
+        assert len(new_lib) == 8
+        assert len(library + spectra) == 8
+        assert len(library) == 4
+
+
+@pytest.mark.usefixtures("spectra", "library")
+class TestPhotonsInRange:
+    @pytest.mark.parametrize("wave_min, wave_max", [(1.4, 1.6),
+                                                    (0.91234, 2.1111),
+                                                    (1.5, 1.5001)])
+    def test_same_as_list_of_spectra(self, spectra, library, wave_min,
+                                     wave_max):
+        counts = photons_in_range(spectra, wave_min, wave_max)
+        lib_counts = library.photons_in_range(wave_min, wave_max)
+        assert lib_counts.unit == counts.unit
+        assert lib_counts.value == approx(counts.value, rel=1e-3)
+
+    def test_uses_area_indexes_and_bandpass(self, spectra, library):
+        bp = SpectralElement(Empirical1D, points=[13000, 17000],
+                             lookup_table=[0.5, 1])
+        kwargs = {"area": 2 * u.m**2, "bandpass": bp}
+        counts = photons_in_range([spectra[ii] for ii in [3, 0]], 1.4, 1.6,
+                                  **kwargs)
+        lib_counts = library.photons_in_range(1.4, 1.6, indexes=[3, 0],
+                                              **kwargs)
+        assert lib_counts.unit == u.ph / u.s
+        assert lib_counts.value == approx(counts.value, rel=1e-3)
+
+
+@pytest.mark.usefixtures("spectra", "library")
+class TestSourceWithLibrary:
+    def test_source_keeps_library(self, library):
+        src = Source(x=[0, 1, 2], y=[0, 0, 0], ref=[0, 1, 3], spectra=library)
+        assert isinstance(src.spectra, SpectralLibrary)
+
+    def test_photons_in_range_same_as_list_source(self, library, spectra):
+        kwargs = {"x": [0, 1, 2], "y": [0, 0, 0], "ref": [0, 1, 3]}
+        src_lib = Source(spectra=library, **kwargs)
+        src_list = Source(spectra=spectra, **kwargs)
+        counts = src_list.photons_in_range(1.4, 1.6, indexes=[3, 1])
+        lib_counts = src_lib.photons_in_range(1.4, 1.6, indexes=[3, 1])
+        assert lib_counts.value == approx(counts.value, rel=1e-3)
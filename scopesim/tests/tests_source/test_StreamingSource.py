@@ -0,0 +1,80 @@
+import os
+import pytest
+from pytest import approx
+
+import numpy as np
+from astropy import units as u
+from astropy.io import ascii as ioascii
+from astropy.table import Table, vstack
+from synphot import SourceSpectrum, SpectralElement
+from synphot.models import Empirical1D
+
+from scopesim import rc
+from scopesim.source.source import Source
+from scopesim.source.streaming_source import StreamingSource
+
+
+MOCK_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                        "../mocks/files/"))
+if MOCK_DIR not in rc.__search_path__:
+    rc.__search_path__.insert(0, MOCK_DIR)
+
+
+@pytest.fixture(scope="function")
+def spectra():
+    wave = np.linspace(0.5, 2.5, 11) * u.um
+    return [SourceSpectrum(Empirical1D, points=wave, lookup_table=np.ones(11)),
+            SourceSpectrum(Empirical1D, points=wave, lookup_table=np.ones(11))]
+
+
+@pytest.fixture(scope="function")
+def catalogue():
+    n = 25
+    return Table(names=["x", "y", "ref", "weight"],
+                 data=[np.linspace(-1, 1, n), np.linspace(1, -1, n),
+                       np.arange(n) % 2, np.ones(n)])
+
+
+@pytest.mark.usefixtures("spectra", "catalogue")
+class TestIterTables:
+    @pytest.mark.parametrize("ext", ["fits", "ecsv", "csv"])
+    def test_chunks_add_up_to_whole_catalogue(self, tmp_path, spectra,
+                                              catalogue, ext):
+        filename = str(tmp_path / "cat.{}".format(ext))
+        catalogue.write(filename)
+        src = StreamingSource(filename, spectra=spectra, chunk_size=10)
+        tables = list(src.iter_tables())
+
+        assert [len(tbl) for tbl in tables] == [10, 10, 5]
+        assert np.all(vstack(tables)["x"] == catalogue["x"])
+
+    def test_reads_comment_header_of_mock_table(self, spectra):
+        tbl = ioascii.read(os.path.join(MOCK_DIR, "test_table.tbl"))
+        src = StreamingSource("test_table.tbl", spectra=spectra, chunk_size=3)
+        tables = list(src.iter_tables())
+
+        assert sum(len(chunk) for chunk in tables) == len(tbl)
+        assert tables[-1].meta["x_unit"] == "arcsec"
+
+    def test_throws_error_for_missing_file(self, spectra):
+        with pytest.raises(ValueError):
+            StreamingSource("bogus.fits", spectra=spectra)
+
+
+@pytest.mark.usefixtures("spectra", "catalogue")
+class TestIter:
+    def test_yields_sources_sharing_the_spectra(self, tmp_path, spectra,
+                                                catalogue):
+        filename = str(tmp_path / "cat.fits")
+        catalogue.write(filename)
+        src = StreamingSource(filename, spectra=spectra, chunk_size=20)
+        src.add_bandpass(SpectralElement(Empirical1D, points=[5000, 25000],
+                                         lookup_table=[1, 1]))
+        chunks = list(src)
+
+        assert len(chunks) == 2
+        assert all(isinstance(chunk, Source) for chunk in chunks)
+        assert chunks[0].spectra[0] is chunks[1].spectra[0] is src.spectra[0]
+        assert chunks[1].bandpass is src.bandpass
+        assert chunks[1].photons_in_range(1, 2).value == approx([1E8, 1E8],
+                                                                rel=1e-3)
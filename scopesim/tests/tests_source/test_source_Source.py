@@ -14,12 +14,13 @@ from astropy import units as u
 from astropy import wcs
 
 from synphot import SourceSpectrum, SpectralElement
-from synphot.models import Empirical1D
+from synphot.models import Empirical1D, ConstFlux1D
 from synphot.units import PHOTLAM
 
 import scopesim as sim
-from scopesim.source import source_utils
+from scopesim.source import source_utils, SpectralLibrary
 from scopesim.source.source import Source
+from scopesim.tests.mocks.py_objects import source_objects as src_objs
 
 from scopesim.optics.image_plane import ImagePlane
 from scopesim.utils import convert_table_comments_to_dict
@@ -182,6 +183,46 @@ class TestSourceInit:
         assert isinstance(src.fields[0], Table)
 
 
+class TestSourceCube:
+    def test_initialises_with_cube_imagehdu(self):
+        src = src_objs._cube_source()
+        assert src.fields[0].header["NAXIS"] == 3
+        assert src.fields[0].header["CUNIT1"] == "DEG"
+
+    def test_cube_from_file_is_memory_mapped(self, tmp_path):
+        filename = str(tmp_path / "cube.fits")
+        src_objs._cube_source().fields[0].writeto(filename)
+        src = Source(cube=filename)
+        base = src.fields[0].data
+        while getattr(base, "base", None) is not None:
+            base = base.base
+        assert not isinstance(base, np.ndarray)
+
+    def test_does_not_alter_the_header_of_the_input_cube(self):
+        hdu = src_objs._cube_source().fields[0]
+        hdu.header["CUNIT1"] = "arcsec"
+        hdu.header["CDELT1"] = 0.2
+        src = Source(cube=hdu)
+        assert hdu.header["CUNIT1"] == "arcsec"
+        assert src.fields[0].header["CDELT1"] == approx(0.2 / 3600)
+
+    def test_missing_spatial_units_default_to_deg(self):
+        hdu = src_objs._cube_source().fields[0]
+        del hdu.header["CUNIT1"], hdu.header["CUNIT2"]
+        src = Source(cube=hdu)
+        assert src.fields[0].header["CUNIT2"] == "DEG"
+        assert src.fields[0].header["CDELT2"] == hdu.header["CDELT2"]
+
+    def test_throws_error_for_2d_cube(self, image_source):
+        with pytest.raises(ValueError):
+            Source(cube=image_source.fields[0])
+
+    def test_image_in_range_integrates_cube(self):
+        src = src_objs._cube_source()
+        im = src.image_in_range(1.0, 1.2, pixel_scale=0.2*u.arcsec)
+        assert np.sum(im.image) == approx(50 * 50 * 0.2)
+
+
 @pytest.mark.usefixtures("table_source", "image_source")
 class TestSourceAddition:
     def test_ref_column_always_references_correct_spectrum(self, table_source,
@@ -205,6 +246,122 @@ class TestSourceAddition:
         new_source = table_source + image_source
         assert new_source.fields[1].header["SPEC_REF"] == ""
 
+    def test_append_adds_spectra_once_for_many_fields(self, table_source,
+                                                      image_source):
+        multi_source = table_source + image_source
+        n_spec = len(multi_source.spectra)
+        image_source.append(multi_source)
+        assert len(image_source.spectra) == 1 + n_spec
+        assert image_source.fields[2].header["SPEC_REF"] == 1 + 3
+
+    def test_append_shares_data_but_not_refs(self, table_source,
+                                             image_source):
+        orig_refs = np.copy(table_source.fields[0]["ref"])
+        image_source.append(table_source)
+        new_tbl = image_source.fields[1]
+        assert np.all(table_source.fields[0]["ref"] == orig_refs)
+        assert np.shares_memory(new_tbl["x"], table_source.fields[0]["x"])
+
+    def test_add_is_lazy_and_leaves_parts_untouched(self, table_source,
+                                                    image_source):
+        new_source = table_source + image_source
+        assert len(new_source._parts) == 2
+        new_source.shift(dx=1)
+        assert len(new_source._parts) == 0
+        old_x = table_source.fields[0]["x"][0]
+        assert new_source.fields[0]["x"][0] == old_x + 1
+
+    def test_later_changes_to_the_parts_do_not_change_the_sum(
+            self, table_source, image_source):
+        old_x = np.copy(table_source.fields[0]["x"])
+        new_source = table_source + image_source
+        table_source.shift(dx=5)
+        table_source.fields += [deepcopy(image_source.fields[0])]
+        image_source.spectra += [image_source.spectra[0]]
+        assert len(new_source.fields) == 1 + len(image_source.fields)
+        assert len(new_source.spectra) == 3 + 1
+        assert np.all(new_source.fields[0]["x"] == old_x)
+
+    def test_sum_shares_column_data_with_the_parts(self, table_source,
+                                                   image_source):
+        new_source = table_source + image_source
+        new_source.fields[0]["x"][0] = 42
+        assert table_source.fields[0]["x"][0] == 42
+
+    def test_sum_of_many_sources_references_correct_spectra(self,
+                                                            table_source):
+        sources = [deepcopy(table_source) for _ in range(50)]
+        new_source = sum(sources)
+        refs = np.concatenate([field["ref"] for field in new_source.fields])
+        assert len(new_source.fields) == 50
+        assert len(new_source.spectra) == 50 * 3
+        last_refs = np.asarray(table_source.fields[0]["ref"][-3:]) + 49 * 3
+        assert np.all(refs[-3:] == last_refs)
+
+
+@pytest.mark.usefixtures("table_source", "image_source")
+class TestSourceDumpLoad:
+    def test_table_and_image_fields_survive_round_trip(self, table_source,
+                                                       image_source, tmp_path):
+        src = table_source + image_source
+        dirname = str(tmp_path / "src")
+        src.dump(dirname)
+        new_src = Source.load(dirname)
+
+        assert isinstance(new_src.fields[0], Table)
+        assert np.all(new_src.fields[0]["x"] == src.fields[0]["x"])
+        assert new_src.fields[0]["x"].unit == u.arcsec
+        assert np.all(new_src.fields[1].data == src.fields[1].data)
+        assert new_src.fields[1].header["SPEC_REF"] == 3
+        assert len(new_src.spectra) == len(src.spectra)
+
+    def test_spectra_give_same_photons_after_round_trip(self, table_source,
+                                                        tmp_path):
+        dirname = str(tmp_path / "src")
+        table_source.dump(dirname)
+        new_src = Source.load(dirname)
+        ph_old = table_source.photons_in_range(1, 2)
+        ph_new = new_src.photons_in_range(1, 2)
+        assert np.allclose(ph_old.value, ph_new.value)
+
+    def test_spectral_library_is_still_a_library_after_round_trip(
+            self, table_source, tmp_path):
+        table_source.spectra = SpectralLibrary.from_spectra(
+            table_source.spectra)
+        dirname = str(tmp_path / "src")
+        table_source.dump(dirname)
+        new_src = Source.load(dirname)
+        assert isinstance(new_src.spectra, SpectralLibrary)
+        assert np.all(new_src.spectra.fluxes == table_source.spectra.fluxes)
+        assert np.all(new_src.spectra.waves == table_source.spectra.waves)
+
+    def test_fields_are_memory_mapped_if_requested(self, table_source,
+                                                   image_source, tmp_path):
+        dirname = str(tmp_path / "src")
+        (table_source + image_source).dump(dirname)
+        new_src = Source.load(dirname, mmap_mode="r")
+        # read-only memmaps are passed through to the table columns
+        assert not new_src.fields[0]["x"].flags.writeable
+        assert isinstance(new_src.fields[1].data, np.memmap)
+
+    def test_bandpass_is_stored(self, table_source, tmp_path):
+        table_source.add_bandpass(SpectralElement(Empirical1D,
+                                                  points=[1, 2] * u.um,
+                                                  lookup_table=[0.5, 0.5]))
+        dirname = str(tmp_path / "src")
+        table_source.dump(dirname)
+        new_src = Source.load(dirname)
+        assert new_src.bandpass(1.5 * u.um).value == approx(0.5)
+
+    def test_legacy_pickle_files_can_still_be_loaded(self, table_source,
+                                                     tmp_path):
+        import pickle
+        fname = str(tmp_path / "src.pkl")
+        with open(fname, "wb") as fp1:
+            pickle.dump(table_source, fp1)
+        new_src = Source.load(fname)
+        assert np.all(new_src.fields[0]["ref"] == table_source.fields[0]["ref"])
+
 
 @pytest.mark.usefixtures("table_source", "image_source")
 class TestSourceImageInRange:
@@ -228,6 +385,53 @@ class TestSourceImageInRange:
         im = image_source.image_in_range(1*u.um, 2*u.um, pix_scl*u.arcsec)
         assert np.sum(im.image) == approx(im_sum)
 
+    def test_image_fields_are_reprojected_once(self, image_source):
+        im1 = image_source.image_in_range(1*u.um, 2*u.um, 0.3*u.arcsec)
+        new_hdu = list(image_source._image_cache.values())[0][1]
+        im2 = image_source.image_in_range(1*u.um, 1.5*u.um, 0.3*u.arcsec)
+        ph1 = image_source.photons_in_range(1*u.um, 2*u.um)[0].value
+        ph2 = image_source.photons_in_range(1*u.um, 1.5*u.um)[0].value
+
+        assert len(image_source._image_cache) == 1
+        assert list(image_source._image_cache.values())[0][1] is new_hdu
+        assert np.sum(im2.image) == approx(np.sum(im1.image) * ph2 / ph1)
+
+    def test_image_cache_is_limited_in_size(self, image_source):
+        old_size = sim.rc.__currsys__["!SIM.computing.source_cache_size"]
+        sim.rc.__currsys__["!SIM.computing.source_cache_size"] = 0
+        try:
+            for pix_scl in [0.1, 0.2, 0.3]:
+                image_source.image_in_range(1*u.um, 2*u.um, pix_scl*u.arcsec)
+        finally:
+            sim.rc.__currsys__["!SIM.computing.source_cache_size"] = old_size
+
+        assert len(image_source._image_cache) == 1
+        key = list(image_source._image_cache)[0]
+        assert key[3] == approx(0.3 / 3600)
+
+    def test_in_place_changes_to_image_data_are_seen(self, image_source):
+        im1 = image_source.image_in_range(1*u.um, 2*u.um, 0.3*u.arcsec)
+        sum1 = np.sum(im1.image)
+        image_source.fields[0].data *= 2
+        im2 = image_source.image_in_range(1*u.um, 2*u.um, 0.3*u.arcsec)
+        assert np.sum(im2.image) == approx(2 * sum1)
+
+    def test_image_cache_is_cleared_when_fields_or_spectra_change(
+            self, image_source):
+        image_source.image_in_range(1*u.um, 2*u.um, 0.3*u.arcsec)
+        assert len(image_source._image_cache) == 1
+        image_source.spectra = image_source.spectra
+        assert len(image_source._image_cache) == 0
+
+        image_source.image_in_range(1*u.um, 2*u.um, 0.3*u.arcsec)
+        image_source.fields = image_source.fields
+        assert len(image_source._image_cache) == 0
+
+    def test_sub_pixel_table_image_keeps_flux(self, table_source):
+        im = table_source.image_in_range(1*u.um, 2*u.um, sub_pixel=True)
+        im0 = table_source.image_in_range(1*u.um, 2*u.um, sub_pixel=False)
+        assert np.sum(im.image) == approx(np.sum(im0.image))
+
     def test_combines_more_that_one_field_into_image(self, image_source,
                                                      table_source):
         tbl = table_source.fields[0]
@@ -280,10 +484,44 @@ class TestSourcePhotonsInRange:
         assert np.all(np.isclose(ph.value, [4, 2]))
 
 
+@pytest.mark.usefixtures("table_source", "image_source")
+class TestSourceIsEmpty:
+    def test_empty_sky_is_empty(self):
+        from scopesim.source.source_templates import empty_sky
+        assert empty_sky().is_empty
+        assert not empty_sky(flux=1).is_empty
+        assert Source().is_empty
+
+    def test_sources_with_flux_are_not_empty(self, table_source,
+                                             image_source):
+        assert not table_source.is_empty
+        assert not image_source.is_empty
+        assert not src_objs._cube_source().is_empty
+
+    def test_zero_weights_and_zero_images_are_empty(self, table_source,
+                                                    image_source):
+        table_source.fields[0]["weight"] = 0
+        assert table_source.is_empty
+        image_source.fields[0].data *= 0
+        assert image_source.is_empty
+
+
+@pytest.mark.usefixtures("table_source", "image_source")
 class TestSourceShift:
     def test_that_it_does_what_it_should(self):
         pass
 
+    def test_shifts_table_fields_in_arcsec(self, table_source):
+        x0 = np.array(table_source.fields[0]["x"])
+        table_source.shift(dx=1, dy=0.5*u.arcmin)
+        assert np.all(table_source.fields[0]["x"] == x0 + 1)
+        assert table_source.fields[0]["y"][0] == approx(5 + 30)
+
+    def test_shifts_image_fields(self, image_source):
+        crval1 = image_source.fields[0].header["CRVAL1"]
+        image_source.shift(dx=3.6)
+        assert image_source.fields[0].header["CRVAL1"] == approx(crval1 + 0.001)
+
 
 class TestSourceRotate:
     def test_that_it_does_what_it_should(self):
@@ -350,6 +588,71 @@ class TestPhotonsInRange:
         assert counts.value == approx(expected)
 
 
+class TestRebinSpectra:
+    @staticmethod
+    def _fine_spectrum():
+        # R~100000 with a few narrow lines
+        wave = np.geomspace(0.5, 3, 180000) * u.um
+        lines = sum(np.exp(-0.5 * ((wave.value - w0) / 2e-4)**2)
+                    for w0 in [1.1, 1.6, 2.2])
+        return SourceSpectrum(Empirical1D, points=wave,
+                              lookup_table=(1 + 5 * lines) * PHOTLAM)
+
+    def test_drops_most_points_but_keeps_the_wave_edges(self):
+        spec = self._fine_spectrum()
+        edges = np.linspace(1, 2.5, 16)
+        new_spec = source_utils.rebin_spectra([spec], edges)[0]
+        new_waves = new_spec.waveset.to(u.um).value
+        assert len(new_waves) < len(spec.waveset) / 100
+        assert np.all(np.isin(np.round(edges, 6), np.round(new_waves, 6)))
+
+    @pytest.mark.parametrize("wave_min, wave_max", [(1, 2.5), (1.599, 1.6012),
+                                                    (1.3, 1.4)])
+    def test_flux_is_conserved_within_rel_error(self, wave_min, wave_max):
+        spec = self._fine_spectrum()
+        new_spec = source_utils.rebin_spectra([spec], [1, 2.5],
+                                              rel_error=1e-3)[0]
+        counts = source_utils.photons_in_range([spec], wave_min, wave_max)
+        new_counts = source_utils.photons_in_range([new_spec], wave_min,
+                                                   wave_max)
+        assert new_counts.value == approx(counts.value, rel=1e-3)
+
+    def test_grid_resolves_the_throughput_structure(self):
+        wave = np.geomspace(0.5, 3, 180000) * u.um
+        spec = SourceSpectrum(Empirical1D, points=wave,
+                              lookup_table=np.ones(180000) * PHOTLAM)
+        thru_wave = np.linspace(1, 2.5, 1501) * 1e4
+        thru = np.where(np.abs(thru_wave - 16000) < 500, 0.1, 0.9)
+        new_spec = source_utils.rebin_spectra([spec], [1, 2.5],
+                                              throughput=(thru_wave, thru))[0]
+        new_waves = new_spec.waveset.to(u.AA).value
+        assert len(new_waves) < 100
+        assert np.sum((new_waves > 15000) * (new_waves < 17000)) >= 4
+
+    def test_spectra_without_waveset_are_not_changed(self):
+        spec = SourceSpectrum(ConstFlux1D, amplitude=1)
+        assert source_utils.rebin_spectra([spec], [1, 2])[0] is spec
+
+    def test_scaled_spectra_are_rebinned(self):
+        spec = self._fine_spectrum() * 2
+        assert not isinstance(spec.model, Empirical1D)
+        new_spec = source_utils.rebin_spectra([spec], [1, 2.5])[0]
+        assert len(new_spec.waveset) < len(spec.waveset) / 100
+        counts = source_utils.photons_in_range([spec], 1.3, 1.4)
+        new_counts = source_utils.photons_in_range([new_spec], 1.3, 1.4)
+        assert new_counts.value == approx(counts.value, rel=1e-3)
+
+    def test_spectral_library_is_rebinned_on_one_grid(self):
+        spec = self._fine_spectrum()
+        lib = SpectralLibrary.from_spectra([spec, spec * 2])
+        new_lib = source_utils.rebin_spectra(lib, [1, 2.5])
+        assert isinstance(new_lib, SpectralLibrary)
+        assert len(new_lib.waves) < len(lib.waves) / 100
+        counts = lib.photons_in_range(1.5, 2)
+        assert new_lib.photons_in_range(1.5, 2).value == \
+               approx(counts.value, rel=1e-3)
+
+
 class TestMakeImageFromTable:
     def test_returned_object_is_image_hdu(self):
         hdu = source_utils.make_imagehdu_from_table(x=[0], y=[0], flux=[1])
@@ -403,6 +706,32 @@ class TestMakeImageFromTable:
         # plt.imshow(hdu.data)
         # plt.show()
 
+
+class TestMakeTableField:
+    def test_columns_have_canonical_units_and_types(self):
+        tbl = Table(names=["x", "y", "ref"],
+                    data=[[1, 2] * u.arcmin, [0, 1] * u.arcmin, [0, 1]])
+        field = source_utils.make_table_field(tbl, ref_offset=3)
+
+        assert np.all(field["x"] == [60, 120])
+        assert field["x"].unit == u.arcsec
+        assert field.meta["y_unit"] == "arcsec"
+        assert field["ref"].dtype == np.int32
+        assert np.all(field["ref"] == [3, 4])
+        assert field["weight"].dtype == np.float32
+
+    def test_input_table_is_not_altered(self):
+        tbl = Table(names=["x", "y", "ref"], data=[[1.], [0.], [0]])
+        source_utils.make_table_field(tbl, ref_offset=3)
+        assert tbl["ref"][0] == 0
+        assert "weight" not in tbl.colnames
+
+    def test_extra_columns_are_kept(self):
+        tbl = Table(names=["x", "y", "ref", "mag"],
+                    data=[[1.], [0.], [0], [21.]])
+        field = source_utils.make_table_field(tbl)
+        assert field["mag"][0] == 21
+
 #
 # class TestScaleImageHDU:
 #     def test_scaling_properly_for_si_photlam_in_header(self):
@@ -19,7 +19,9 @@ class TestStarField:
     def test_star_fiels_data(self):
         src = src_ts.star_field(100, 15, 25, 60)
         assert isinstance(src.fields[0], Table)
-        assert all(src.fields[0]["weight"] == 10**(-0.4 * src.fields[0]["mag"]))
+        # weights are stored as float32
+        assert src.fields[0]["weight"] == \
+               approx(10**(-0.4 * src.fields[0]["mag"]), rel=1e-6)
 
 
 def test_all_zero_spectra_line_up():
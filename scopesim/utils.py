@@ -1,6 +1,7 @@
 """
 Helper functions for ScopeSim
 """
+import hashlib
 import math
 import os
 import sys
@@ -508,6 +509,69 @@ def find_file(filename, path=None, silent=False):
     return None
 
 
+def content_hash(*items):
+    """
+    Returns a hex digest identifying the content of the items
+
+    Numpy arrays are hashed by their shape, dtype and raw data. All other items
+    are hashed by their ``repr``.
+
+    Parameters
+    ----------
+    items : any
+
+    Returns
+    -------
+    digest : str
+
+    """
+    sha = hashlib.sha1()
+    for item in items:
+        if isinstance(item, np.ndarray):
+            arr = np.ascontiguousarray(item)
+            sha.update(repr((arr.shape, arr.dtype.str)).encode())
+            sha.update(arr.tobytes())
+        else:
+            sha.update(repr(item).encode())
+
+    return sha.hexdigest()
+
+
+def cache_file_path(key, subdir="", suffix=""):
+    """
+    Returns the path for a content-addressed file in the disk cache
+
+    The cache directory is set by ``!SIM.file.cache_path``. This is None by
+    default, i.e. disk caching is turned off until the user sets a directory,
+    e.g. ``rc.__currsys__["!SIM.file.cache_path"] = "~/.scopesim_cache"``.
+
+    Parameters
+    ----------
+    key : str
+        Usually a digest from ``content_hash``
+    subdir : str
+        Sub-folder of the cache directory, e.g. ``"psfs"``
+    suffix : str
+        File extension, e.g. ``".npy"``
+
+    Returns
+    -------
+    filename : str, None
+        None if disk caching is turned off
+
+    """
+    cache_path = None
+    if "!SIM.file.cache_path" in rc.__currsys__:
+        cache_path = from_currsys("!SIM.file.cache_path")
+    if cache_path is None:
+        return None
+
+    cache_dir = os.path.join(os.path.expanduser(cache_path), subdir)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    return os.path.join(cache_dir, key + suffix)
+
+
 def zendist2airmass(zendist):
     """Convert zenith distance to airmass
 
@@ -773,6 +837,39 @@ def quantity_from_table(colname, table, default_unit=""):
     return col
 
 
+def array_from_table(colname, table, unit, default_unit=""):
+    """
+    Returns a table column as a plain float array in the requested unit
+
+    Unlike ``quantity_from_table``, no ``Quantity`` is made for the column. If
+    the column is already stored in ``unit`` (e.g. for the canonical Source
+    table fields) the column data is returned without a copy.
+
+    Parameters
+    ----------
+    colname : str
+    table : astropy.Table
+    unit : str, u.Unit
+        The unit of the returned array
+    default_unit : str, u.Unit
+        Used if no unit is found in the column or table.meta
+
+    Returns
+    -------
+    arr : np.ndarray
+
+    """
+    unit = u.Unit(unit)
+    col = table[colname]
+    col_unit = col.unit if col.unit is not None else \
+        unit_from_table(colname, table, default_unit)
+    arr = np.asarray(col, dtype=float)
+    if col_unit != unit:
+        arr = arr * col_unit.to(unit)
+
+    return arr
+
+
 def unit_from_table(colname, table, default_unit=""):
     """
     Looks for the unit for a column based on the meta dict keyword "<col>_unit"